@@ -1,8 +1,12 @@
 # backend/curation/admin.py
 from django.contrib import admin
-from .models import Interest, UserInterest, Article, Newsletter
+from .models import Interest, UserInterest, Article, Newsletter, LLMCacheEntry, LLMCacheCounter, LLMCall, InterestSection
 
 admin.site.register(Interest)
 admin.site.register(UserInterest)
 admin.site.register(Article) # Register Article
-admin.site.register(Newsletter) # Register Newsletter
\ No newline at end of file
+admin.site.register(Newsletter) # Register Newsletter
+admin.site.register(LLMCacheEntry)
+admin.site.register(LLMCacheCounter)
+admin.site.register(LLMCall)
+admin.site.register(InterestSection)
\ No newline at end of file
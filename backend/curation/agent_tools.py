@@ -1,6 +1,7 @@
 # backend/curation/agent_tools.py
 from langchain.tools import tool
-from .models import Article, UserInterest, Interest
+from .models import SUMMARY_READY, Article, UserInterest, Interest
+from .ranking import rank_articles_for_users
 from django.contrib.auth.models import User
 from django.db.models import Q
 from datetime import datetime, timedelta
@@ -14,7 +15,7 @@ def get_recent_summarized_articles_for_user_interests(user_id: int, days_back: i
         user_id (int): The ID of the user.
         days_back (int): How many days back to look for articles (default: 7).
     Returns:
-        list: A list of dictionaries, each containing 'title', 'summary', and 'url' of relevant articles.
+        list: A list of dictionaries, each containing 'id', 'title', 'summary', and 'url' of relevant articles.
     """
     try:
         user = User.objects.get(id=user_id)
@@ -24,18 +25,27 @@ def get_recent_summarized_articles_for_user_interests(user_id: int, days_back: i
         if not interest_ids:
             return []
 
-        # Filter articles by interests and time
-        cutoff_date = datetime.now() - timedelta(days=days_back)
-        articles = Article.objects.filter(
-            topics__id__in=interest_ids,
-            published_date__gte=cutoff_date,
-            summary__isnull=False # Only get articles that have been summarized
-        ).distinct().order_by('-published_date')[:10] # Limit for practical purposes
+        # Rank candidates by relevance and recency with the vector index when one is available
+        ranked = rank_articles_for_users({user.id: interest_ids}, limit=10, days_back=days_back)
+        if ranked is not None:
+            article_ids = ranked[user.id]
+            by_id = Article.objects.only('id', 'title', 'summary', 'ai_summary', 'url').in_bulk(article_ids)
+            articles = [by_id[article_id] for article_id in article_ids if article_id in by_id]
+        else:
+            # Filter articles by interests and time
+            cutoff_date = datetime.now() - timedelta(days=days_back)
+            articles = Article.objects.filter(
+                SUMMARY_READY, # Only get articles whose summary is ready
+                topics__id__in=interest_ids,
+                published_date__gte=cutoff_date,
+                canonical__isnull=True # Skip syndicated copies of articles already in the pool
+            ).distinct().order_by('-published_date')[:10] # Limit for practical purposes
 
         return [
             {
+                "id": article.id,
                 "title": article.title,
-                "summary": article.summary,
+                "summary": article.display_summary,
                 "url": article.url
             }
             for article in articles
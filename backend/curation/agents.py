@@ -1,30 +1,62 @@
 # backend/curation/agents.py
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI # For Gemini
-# OR from langchain_openai import OpenAI, ChatOpenAI # For OpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-
-# Import your custom tools
-from .agent_tools import get_recent_summarized_articles_for_user_interests, get_interest_details
+# LangChain and the Gemini client are imported on first use: web processes, management
+# commands and workers that never call the LLM don't pay for them at startup.
+import threading
+
 from django.conf import settings
-from .models import UserInterest # For getting user's interest names
-
-# Define the LLM (Large Language Model)
-# For Google Gemini:
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.7, google_api_key=settings.GOOGLE_API_KEY)
-# For OpenAI:
-# llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, openai_api_key=settings.OPENAI_API_KEY)
-
-# List of tools available to the agent
-tools = [
-    get_recent_summarized_articles_for_user_interests,
-    get_interest_details,
-    # You can add the summarize_text_gemini/openai as a tool if the agent needs to summarize on demand,
-    # but for this flow, we're assuming articles are pre-summarized.
-]
+from .models import Article, UserInterest # For getting user's interest names
+from .prompt_packing import estimate_tokens, pack_articles
+from .sections import newsletter_fingerprint
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """Returns the process-wide chat model, created on first use."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain_google_genai import ChatGoogleGenerativeAI # For Gemini
+                # OR from langchain_openai import OpenAI, ChatOpenAI # For OpenAI
+                from .langchain_cache import DjangoLLMCache
+                from .langchain_callbacks import GovernedRateLimiter, LLMMetricsCallback, RateGovernorCallback
+
+                # For Google Gemini (responses are cached by prompt + model parameters, see llm_cache.py):
+                _llm = ChatGoogleGenerativeAI(
+                    model="gemini-1.5-flash",
+                    temperature=0.7,
+                    max_output_tokens=settings.NEWSLETTER_MAX_OUTPUT_TOKENS, # Bounds generation time per newsletter
+                    google_api_key=settings.GOOGLE_API_KEY,
+                    cache=DjangoLLMCache() if settings.LLM_CACHE_ENABLED else None,
+                    # Shares the Gemini rate limit with ai_utils (see rate_limit.py); applied after the cache lookup
+                    rate_limiter=GovernedRateLimiter(),
+                    # Feed call outcomes back to the rate limit and record each call (see llm_metrics.py)
+                    callbacks=[RateGovernorCallback(), LLMMetricsCallback()],
+                )
+                # For OpenAI:
+                # _llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, openai_api_key=settings.OPENAI_API_KEY)
+    return _llm
+
+
+def set_llm(llm):
+    """Replaces the process-wide chat model (load tests use a fake one). Returns the previous model."""
+    global _llm
+    with _llm_lock:
+        previous, _llm = _llm, llm
+    return previous
+
+
+def get_tools():
+    """The tools available to the agent."""
+    from .agent_tools import get_recent_summarized_articles_for_user_interests, get_interest_details
+    return [
+        get_recent_summarized_articles_for_user_interests,
+        get_interest_details,
+        # You can add the summarize_text_gemini/openai as a tool if the agent needs to summarize on demand,
+        # but for this flow, we're assuming articles are pre-summarized.
+    ]
 
 def get_user_interest_names(user_id):
     """Helper to get a list of interest names for a user."""
@@ -39,6 +71,9 @@ def get_newsletter_generation_agent_executor(user_id):
     """
     Creates and returns an AgentExecutor configured to generate newsletters.
     """
+    from langchain.agents import AgentExecutor, create_react_agent
+    from langchain_core.prompts import PromptTemplate
+
     user_interest_names = get_user_interest_names(user_id)
     if not user_interest_names:
         return None # Or raise an error, or return a basic agent without specific interests
@@ -85,7 +120,8 @@ def get_newsletter_generation_agent_executor(user_id):
     )
 
     # Create the ReAct agent
-    agent = create_react_agent(llm, tools, base_prompt)
+    tools = get_tools()
+    agent = create_react_agent(get_llm().with_config(metadata={"llm_call_site": "agent"}), tools, base_prompt)
 
     # Create the AgentExecutor
     agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
@@ -94,10 +130,26 @@ def get_newsletter_generation_agent_executor(user_id):
 
 
 # --- Direct Chain for Newsletter Generation (Simpler alternative if agent is too complex initially) ---
+NEWSLETTER_PROMPT = """
+        Generate a personalized newsletter for the user interested in: {user_interests}.
+        Here are recent article summaries relevant to these topics:
+        {articles_summaries}
+
+        Combine these summaries into an engaging and concise newsletter.
+        Start with a friendly greeting.
+        For each interest, provide a brief section with key takeaways.
+        If there are no new articles for an interest, state 'No new updates'.
+        Conclude with a polite closing.
+        """
+
+
 def get_newsletter_generation_chain(user_id):
     """
     Creates a simpler LLMChain for newsletter generation without full agent reasoning.
     """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import PromptTemplate
+
     user_interest_names = get_user_interest_names(user_id)
     if not user_interest_names:
         return None
@@ -106,28 +158,69 @@ def get_newsletter_generation_chain(user_id):
     # You would call get_recent_summarized_articles_for_user_interests directly here.
 
     # 2. Define the prompt for the LLM
-    prompt = PromptTemplate.from_template(
-        """
-        Generate a personalized newsletter for the user interested in: {user_interests}.
-        Here are recent article summaries relevant to these topics:
-        {articles_summaries}
-
-        Combine these summaries into an engaging and concise newsletter.
-        Start with a friendly greeting.
-        For each interest, provide a brief section with key takeaways.
-        If there are no new articles for an interest, state 'No new updates'.
-        Conclude with a polite closing.
-        """
-    )
+    prompt = PromptTemplate.from_template(NEWSLETTER_PROMPT)
 
     # Create a simple chain
     chain = (
         {
             "user_interests": lambda x: ", ".join(x["user_interests"]),
-            "articles_summaries": RunnablePassthrough() # This expects pre-fetched summaries
+            "articles_summaries": lambda x: x["articles_summaries"] # Pre-fetched summaries, packed by prompt_packing
         }
         | prompt
-        | llm
+        | get_llm().with_config(metadata={"llm_call_site": "newsletter"}) # Call site label for llm_metrics
         | StrOutputParser()
     )
-    return chain
\ No newline at end of file
+    return chain
+
+
+def prepare_newsletter_inputs(user, days_back=7):
+    """
+    Gathers what the newsletter chain needs for `user`: the candidate articles packed into
+    the prompt's token budget (see prompt_packing.py), the fingerprint used to skip
+    unchanged newsletters and the chain input. Shared by the Celery task and the streaming
+    endpoint.
+    Returns a dict with 'article_ids' (the articles that made it into the prompt),
+    'fingerprint', 'chain_input' and 'packing' (prompt_packing stats plus 'prompt_tokens');
+    raises ValueError when the candidate articles cannot be gathered.
+    """
+    from .agent_tools import get_recent_summarized_articles_for_user_interests
+
+    relevant_articles_data = get_recent_summarized_articles_for_user_interests.invoke({
+        "user_id": user.id,
+        "days_back": days_back
+    })
+    if isinstance(relevant_articles_data, str): # The tool reports errors as text
+        raise ValueError(relevant_articles_data)
+
+    user_interests = list(user.user_interests.select_related('interest').order_by('interest__name'))
+    interest_ids = [ui.interest_id for ui in user_interests]
+    packing = pack_articles(relevant_articles_data, _interest_by_article(relevant_articles_data, interest_ids))
+    user_interest_names = [ui.interest.name for ui in user_interests]
+    packing["prompt_tokens"] = estimate_tokens(NEWSLETTER_PROMPT.format(
+        user_interests=", ".join(user_interest_names), articles_summaries=packing["text"]
+    ))
+    return {
+        "article_ids": packing["article_ids"],
+        "fingerprint": newsletter_fingerprint(
+            interest_ids, {a["id"]: a["summary"] for a in relevant_articles_data if a["id"] in packing["article_ids"]}
+        ),
+        "chain_input": {
+            "user_interests": user_interest_names,
+            "articles_summaries": packing["text"],
+        },
+        "packing": packing,
+    }
+
+
+def _interest_by_article(articles, interest_ids):
+    """Files each candidate under the first of the user's interests (in `interest_ids` order) it is tagged with."""
+    rank = {interest_id: position for position, interest_id in enumerate(interest_ids)}
+    interest_by_article = {}
+    tagged = Article.topics.through.objects.filter(
+        article_id__in=[a['id'] for a in articles], interest_id__in=interest_ids
+    ).values_list('article_id', 'interest_id')
+    for article_id, interest_id in tagged:
+        current = interest_by_article.get(article_id)
+        if current is None or rank[interest_id] < rank[current]:
+            interest_by_article[article_id] = interest_id
+    return interest_by_article
@@ -1,37 +1,202 @@
-import google.generativeai as genai
+import asyncio
+import json
+import weakref
+from functools import lru_cache
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings # To access GOOGLE_API_KEY from settings
+from . import llm_cache, llm_metrics
+from .rate_limit import governed_acall, governed_call
 
-# Configure Google Gemini API (ensure settings.GOOGLE_API_KEY is loaded)
-if hasattr(settings, 'GOOGLE_API_KEY') and settings.GOOGLE_API_KEY:
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
-else:
-    print("Warning: GOOGLE_API_KEY not found in settings. Gemini API calls will fail.")
+GEMINI_MODEL_NAME = 'gemini-1.5-flash' # Or 'gemini-1.5-pro'
+
+_llm_semaphores = weakref.WeakKeyDictionary() # Event loop -> semaphore bounding its in-flight LLM calls
+
+
+@lru_cache(maxsize=None)
+def _configured_genai():
+    """Imports and configures the Gemini SDK on first use, keeping it out of process startup."""
+    import google.generativeai as genai
+
+    # Configure Google Gemini API (ensure settings.GOOGLE_API_KEY is loaded)
+    if hasattr(settings, 'GOOGLE_API_KEY') and settings.GOOGLE_API_KEY:
+        genai.configure(api_key=settings.GOOGLE_API_KEY)
+    else:
+        print("Warning: GOOGLE_API_KEY not found in settings. Gemini API calls will fail.")
+    return genai
+
+
+@lru_cache(maxsize=None)
+def get_gemini_model(model_name=GEMINI_MODEL_NAME):
+    """Returns a GenerativeModel shared by every call in this process."""
+    return _configured_genai().GenerativeModel(model_name)
+
+
+def _summary_prompt(text, max_tokens):
+    # Prompt engineering is crucial here!
+    return f"Summarize the following article concisely, focusing on key information, in about {max_tokens} words. Avoid jargon. If the text is empty or irrelevant, return 'No relevant content to summarize.':\n\n{text}"
 
 def summarize_text_gemini(text, max_tokens=150):
     """Summarizes the given text using Google Gemini."""
     if not text:
         return ""
+    prompt = _summary_prompt(text, max_tokens)
+    cache_key = llm_cache.make_cache_key(GEMINI_MODEL_NAME, prompt)
+    cached = llm_cache.lookup(cache_key, 'summary')
+    if cached is not None:
+        llm_metrics.record_cache_hits('summary', GEMINI_MODEL_NAME, [prompt])
+        return cached
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash') # Or 'gemini-1.5-flash', 'gemini-1.5-pro'
-        # Prompt engineering is crucial here!
-        prompt = f"Summarize the following article concisely, focusing on key information, in about {max_tokens} words. Avoid jargon. If the text is empty or irrelevant, return 'No relevant content to summarize.':\n\n{text}"
-        response = model.generate_content(prompt)
+        model = get_gemini_model()
+        with llm_metrics.TrackedCall('summary', GEMINI_MODEL_NAME, prompt) as call:
+            response = call.response = governed_call(call.timed(model.generate_content), prompt)
+            if response.candidates:
+                call.completion = response.candidates[0].content.parts[0].text.strip()
         if response.candidates:
-            summary = response.candidates[0].content.parts[0].text
-            return summary.strip()
+            summary = call.completion
+            llm_cache.store(cache_key, summary, 'summary', GEMINI_MODEL_NAME)
+            return summary
         return "No summary generated."
     except Exception as e:
         print(f"Error summarizing with Gemini: {e}")
         # You might want to log the error more robustly
         return "Error generating summary."
 
+def llm_concurrency_limit():
+    """
+    Returns the semaphore bounding in-flight async LLM calls on the running event loop
+    (LLM_MAX_CONCURRENCY), so a burst of requests queues here instead of overrunning the API.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+async def summarize_text_gemini_async(text, max_tokens=150):
+    """Async summarize_text_gemini: awaits Gemini instead of blocking a thread. Shares its cache entries."""
+    if not text:
+        return ""
+    prompt = _summary_prompt(text, max_tokens)
+    cache_key = llm_cache.make_cache_key(GEMINI_MODEL_NAME, prompt)
+    cached = await sync_to_async(llm_cache.lookup)(cache_key, 'summary')
+    if cached is not None:
+        await sync_to_async(llm_metrics.record_cache_hits)('summary', GEMINI_MODEL_NAME, [prompt])
+        return cached
+    try:
+        async with llm_concurrency_limit(), llm_metrics.TrackedCall('summary', GEMINI_MODEL_NAME, prompt) as call:
+            response = call.response = await governed_acall(call.atimed(get_gemini_model().generate_content_async), prompt)
+            if response.candidates:
+                call.completion = response.candidates[0].content.parts[0].text.strip()
+        if response.candidates:
+            summary = call.completion
+            await sync_to_async(llm_cache.store)(cache_key, summary, 'summary', GEMINI_MODEL_NAME)
+            return summary
+        return "No summary generated."
+    except Exception as e:
+        print(f"Error summarizing with Gemini: {e}")
+        return "Error generating summary."
+
+
+async def _summarize_texts_concurrently(texts, max_tokens):
+    return await asyncio.gather(*(summarize_text_gemini_async(text, max_tokens) for text in texts))
+
+
+def summarize_texts_individually(texts, max_tokens=150):
+    """
+    Summarizes each text with its own Gemini call, with up to LLM_MAX_CONCURRENCY calls in
+    flight at once. For callers in sync code, e.g. Celery tasks.
+    """
+    if not texts:
+        return []
+    return async_to_sync(_summarize_texts_concurrently)(texts, max_tokens)
+
+
+def _parse_batch_summaries(raw_text, count):
+    """Parses the JSON reply of a batch summary prompt into a list of `count` summaries (None where missing)."""
+    summaries = [None] * count
+    # Tolerate code fences or chatter around the JSON array; decoding stops at the array's end
+    start = raw_text.find("[")
+    if start == -1:
+        return summaries
+    try:
+        items, _ = json.JSONDecoder().raw_decode(raw_text, start)
+    except ValueError:
+        return summaries
+    if not isinstance(items, list):
+        return summaries
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("id")
+        summary = item.get("summary")
+        if isinstance(index, int) and 0 <= index < count and isinstance(summary, str) and summary.strip():
+            summaries[index] = summary.strip()
+    return summaries
+
+
+def summarize_texts_gemini(texts, max_tokens=150):
+    """
+    Summarizes several texts with a single Gemini call.
+    Returns a list aligned with `texts`; an entry is None when the model's reply
+    for that text could not be parsed, so the caller can fall back to summarize_text_gemini.
+    A failed call (throttling, RateLimitTimeout, network errors) raises instead: falling
+    back to one call per text is the wrong answer to a provider that is refusing traffic.
+    Texts are cached under the same key as summarize_text_gemini, so identical
+    bodies are only ever sent once, whichever path summarizes them.
+    """
+    if not texts:
+        return []
+
+    prompts = [_summary_prompt(text, max_tokens) for text in texts]
+    keys = [llm_cache.make_cache_key(GEMINI_MODEL_NAME, prompt) for prompt in prompts]
+    cached = llm_cache.lookup_many(keys, 'summary')
+    llm_metrics.record_cache_hits('summary', GEMINI_MODEL_NAME, [p for p, k in zip(prompts, keys) if k in cached])
+
+    # Send each distinct uncached text once
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in pending:
+            pending[key] = text
+    if not pending:
+        return [cached[key] for key in keys]
+
+    articles_block = "\n\n".join(
+        f"<article id=\"{index}\">\n{text}\n</article>" for index, text in enumerate(pending.values())
+    )
+    prompt = (
+        f"Summarize each of the following {len(pending)} articles concisely, focusing on key information, "
+        f"in about {max_tokens} words each. Avoid jargon. If an article is empty or irrelevant, "
+        "use 'No relevant content to summarize.' as its summary.\n"
+        'Reply with only a JSON array of objects of the form {"id": <article id>, "summary": "<summary>"}, '
+        "one per article.\n\n"
+        f"{articles_block}"
+    )
+    with llm_metrics.TrackedCall('summary_batch', GEMINI_MODEL_NAME, prompt) as call:
+        response = call.response = governed_call(
+            call.timed(get_gemini_model().generate_content),
+            prompt,
+            generation_config={"response_mime_type": "application/json"},
+        )
+        call.completion = response.candidates[0].content.parts[0].text if response.candidates else None
+    if response.candidates:
+        parsed = _parse_batch_summaries(call.completion, len(pending))
+    else:
+        parsed = [None] * len(pending) # Blocked reply: each text gets its own chance
+
+    fresh = {key: summary for key, summary in zip(pending, parsed) if summary is not None}
+    llm_cache.store_many(fresh, 'summary', GEMINI_MODEL_NAME)
+    cached.update(fresh)
+    return [cached.get(key) for key in keys]
+
+
 def generate_newsletter_section_gemini(topic, articles_summaries, max_tokens=300):
-    """Generates a newsletter section based on a topic and article summaries."""
+    """Generates a newsletter section based on a topic and article summaries. Returns None if the call fails."""
     if not articles_summaries:
         return f"No new updates on {topic} for this newsletter period."
 
     summaries_text = "\n\n".join(articles_summaries)
-    model = genai.GenerativeModel('gemini-1.5-flash')
     prompt = f"""
     Generate a concise and engaging newsletter section about the topic: "{topic}".
     Integrate insights from the following article summaries.
@@ -42,11 +207,68 @@ def generate_newsletter_section_gemini(topic, articles_summaries, max_tokens=300
     Article Summaries:
     {summaries_text}
     """
+    cache_key = llm_cache.make_cache_key(GEMINI_MODEL_NAME, prompt)
+    cached = llm_cache.lookup(cache_key, 'section')
+    if cached is not None:
+        llm_metrics.record_cache_hits('section', GEMINI_MODEL_NAME, [prompt])
+        return cached
     try:
-        response = model.generate_content(prompt)
+        model = get_gemini_model()
+        with llm_metrics.TrackedCall('section', GEMINI_MODEL_NAME, prompt) as call:
+            response = call.response = governed_call(call.timed(model.generate_content), prompt)
+            if response.candidates:
+                call.completion = response.candidates[0].content.parts[0].text.strip()
         if response.candidates:
-            return response.candidates[0].content.parts[0].text.strip()
-        return "Could not generate content for this section."
+            section = call.completion
+            llm_cache.store(cache_key, section, 'section', GEMINI_MODEL_NAME)
+            return section
+        print(f"Gemini returned no content for the '{topic}' section.")
+        return None
     except Exception as e:
         print(f"Error generating newsletter section with Gemini: {e}")
-        return "Error generating newsletter content."
\ No newline at end of file
+        return None
+
+def generate_newsletter_intro_gemini(username, interest_names, max_tokens=60):
+    """
+    Generates a short personalized greeting and closing for an assembled newsletter.
+    Returns an (intro, outro) tuple, falling back to a plain template if the call fails.
+    """
+    fallback = (
+        f"Hello {username},\n\nHere are the latest updates on {', '.join(interest_names)}.",
+        "Thanks for reading, see you in the next edition!",
+    )
+    prompt = f"""
+    Write a friendly one-paragraph greeting and a one-sentence polite closing for a newsletter
+    addressed to "{username}", who follows these topics: {', '.join(interest_names)}.
+    Keep each under {max_tokens} words.
+    Reply with only a JSON object of the form {{"intro": "<greeting>", "outro": "<closing>"}}.
+    """
+    cache_key = llm_cache.make_cache_key(GEMINI_MODEL_NAME, prompt)
+    cached = llm_cache.lookup(cache_key, 'intro')
+    raw_text = cached
+    if raw_text is not None:
+        llm_metrics.record_cache_hits('intro', GEMINI_MODEL_NAME, [prompt])
+    else:
+        try:
+            with llm_metrics.TrackedCall('intro', GEMINI_MODEL_NAME, prompt) as call:
+                response = call.response = governed_call(
+                    call.timed(get_gemini_model().generate_content),
+                    prompt,
+                    generation_config={"response_mime_type": "application/json"},
+                )
+                call.completion = response.candidates[0].content.parts[0].text if response.candidates else None
+            if not response.candidates:
+                return fallback
+            raw_text = call.completion
+        except Exception as e:
+            print(f"Error generating newsletter intro with Gemini: {e}")
+            return fallback
+
+    try:
+        parts = json.loads(raw_text[raw_text.find("{"):raw_text.rfind("}") + 1])
+        intro, outro = parts["intro"].strip(), parts["outro"].strip()
+    except (ValueError, KeyError, AttributeError):
+        return fallback
+    if cached is None:
+        llm_cache.store(cache_key, raw_text, 'intro', GEMINI_MODEL_NAME)
+    return intro, outro
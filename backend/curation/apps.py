@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CurationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'curation'
+
+    def ready(self):
+        from . import signals # noqa: F401 Registers the cache invalidation receivers
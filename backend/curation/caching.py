@@ -0,0 +1,40 @@
+# backend/curation/caching.py
+import time
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import CacheVersion
+
+INTEREST_CATALOG_VERSION_NAME = 'interest-catalog'
+INTEREST_CATALOG_TIMEOUT = 24 * 3600 # Payloads are keyed by version, so this only bounds memory use
+
+
+def get_interest_catalog_version():
+    """
+    Returns the current catalog version: one primary-key-sized query, shared by every
+    process, so a bump in one web worker is seen by all of them on their next request.
+    """
+    version = CacheVersion.objects.filter(name=INTEREST_CATALOG_VERSION_NAME).values_list('version', flat=True).first()
+    if version is None:
+        # Start from a timestamp so a recreated row never reuses an older version's payload
+        version = CacheVersion.objects.get_or_create(
+            name=INTEREST_CATALOG_VERSION_NAME, defaults={'version': time.time_ns()}
+        )[0].version
+    return version
+
+
+def bump_interest_catalog_version():
+    """Invalidates every cached catalog payload by moving to a new version."""
+    if not CacheVersion.objects.filter(name=INTEREST_CATALOG_VERSION_NAME).update(version=F('version') + 1):
+        get_interest_catalog_version() # Row missing; any fresh version will do
+
+
+def get_interest_catalog(version, build):
+    """Returns the catalog payload for `version`, calling `build()` and caching it on a miss."""
+    key = f'curation:interest-catalog:{version}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, timeout=INTEREST_CATALOG_TIMEOUT)
+    return payload
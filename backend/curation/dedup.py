@@ -0,0 +1,113 @@
+# backend/curation/dedup.py
+import hashlib
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 2 # NewsAPI bodies are short snippets; bigrams keep near-copies within a few bits
+
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return words
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+def simhash(text):
+    """Returns the 64-bit SimHash (unsigned) of `text` over word shingles."""
+    weights = Counter(
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in _shingles(text)
+    )
+    if not weights:
+        return 0
+    total = sum(weights.values())
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        ones = sum(weight for value, weight in weights.items() if value >> bit & 1)
+        if ones * 2 > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def to_signed(value):
+    """Maps an unsigned 64-bit fingerprint into BigIntegerField range."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# " - Reuters", " | CNBC": syndicated copies of a headline differ only in the publisher tag
+_PUBLISHER_SUFFIX = re.compile(r"\s+[-|\u2013\u2014]\s+[^-|\u2013\u2014]{1,40}$")
+# NewsAPI cuts `content` at about 200 characters and appends "… [+1234 chars]"; the count differs per copy
+_TRUNCATION_TAIL = re.compile(r"\s*(?:\u2026|\.\.\.)?\s*\[\+\d+ chars\]\s*$")
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _fingerprint_text(title, description, content):
+    """Joins the fields SimHash looks at, without the parts that change between syndicated copies."""
+    title = _PUBLISHER_SUFFIX.sub("", title or "")
+    content = _TAGS.sub(" ", content or "")
+    content, truncated = _TRUNCATION_TAIL.subn("", content)
+    if truncated:
+        content = content.rsplit(" ", 1)[0] # The last word may be cut off mid-way
+    return " ".join(filter(None, [title, description, content]))
+
+
+def article_fingerprint(article):
+    """SimHash of an article's title, description and content, ignoring publisher tags and truncation markers."""
+    return simhash(_fingerprint_text(article.title, article.summary, article.full_text))
+
+
+class SimHashIndex:
+    """
+    In-memory LSH index of recent fingerprints. Fingerprints are split into
+    max_distance + 1 bands; two fingerprints within max_distance bits must agree
+    exactly on at least one band, so a lookup only compares against articles that
+    share a band instead of the whole window.
+    """
+
+    def __init__(self, max_distance=8):
+        self.max_distance = max_distance
+        self._band_count = max_distance + 1
+        self._band_bits = SIMHASH_BITS // self._band_count
+        self._bands = defaultdict(list) # (band number, band value) -> [(fingerprint, ref)]
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self._band_bits) - 1
+        return [(band, fingerprint >> (band * self._band_bits) & mask) for band in range(self._band_count)]
+
+    def add(self, fingerprint, ref):
+        for key in self._band_keys(fingerprint):
+            self._bands[key].append((fingerprint, ref))
+
+    def find(self, fingerprint):
+        """Returns the ref of the closest indexed fingerprint within max_distance, or None."""
+        best_ref, best_distance = None, self.max_distance + 1
+        for key in self._band_keys(fingerprint):
+            for other, ref in self._bands.get(key, ()):
+                distance = (fingerprint ^ other).bit_count()
+                if distance < best_distance:
+                    best_ref, best_distance = ref, distance
+        return best_ref
+
+
+def load_recent_index():
+    """Builds a SimHashIndex over recent canonical articles; refs are article ids."""
+    from .models import Article
+
+    index = SimHashIndex(settings.NEAR_DUPLICATE_MAX_DISTANCE)
+    cutoff_date = timezone.now() - timedelta(days=settings.NEAR_DUPLICATE_WINDOW_DAYS)
+    recent = Article.objects.filter(
+        published_date__gte=cutoff_date, canonical__isnull=True, simhash__isnull=False
+    ).values_list('id', 'simhash')
+    for article_id, fingerprint in recent.iterator():
+        index.add(to_unsigned(fingerprint), article_id)
+    return index
@@ -0,0 +1,86 @@
+# backend/curation/fake_llm.py
+"""
+Stand-in LLMs for load tests and benchmarks. They answer after a fixed latency without
+any network traffic, so runs measure our own overhead and concurrency, not the API's.
+"""
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+FAKE_NEWSLETTER = (
+    "Hello there,\n\nHere is what happened this week in the topics you follow. "
+    "Each section below sums up the key takeaways from the most relevant articles.\n\n"
+    "Thanks for reading, see you in the next edition!"
+)
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Chat model that replies with `reply` after `latency` seconds, streamed in `chunks` pieces."""
+    reply: str = FAKE_NEWSLETTER
+    latency: float = 1.0 # Seconds for the whole reply
+    chunks: int = 8 # Gemini streams a sentence or so per chunk, not single tokens
+
+    @property
+    def _llm_type(self):
+        return "fake-streaming-chat"
+
+    def _pieces(self):
+        words = re.findall(r"\S+\s*", self.reply)
+        size = max(1, -(-len(words) // self.chunks))
+        return ["".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        pieces = self._pieces()
+        for piece in pieces:
+            time.sleep(self.latency / len(pieces))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        pieces = self._pieces()
+        for piece in pieces:
+            await asyncio.sleep(self.latency / len(pieces))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+def _fake_gemini_text(prompt):
+    """Answers the prompt shapes ai_utils sends: batch summaries, intro/outro JSON, or plain text."""
+    article_ids = re.findall(r'<article id="(\d+)">', prompt)
+    if article_ids:
+        return json.dumps([{"id": int(i), "summary": f"Fake summary of article {i}."} for i in article_ids])
+    if '"intro"' in prompt:
+        return json.dumps({"intro": "Hello there!", "outro": "See you next time."})
+    return f"Fake reply to a {len(prompt)} character prompt."
+
+
+def _fake_gemini_response(text):
+    part = SimpleNamespace(text=text)
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class FakeGeminiModel:
+    """Duck-typed google.generativeai.GenerativeModel with generate_content(_async)."""
+
+    def __init__(self, latency=1.0):
+        self.latency = latency
+
+    def generate_content(self, prompt, generation_config=None):
+        time.sleep(self.latency)
+        return _fake_gemini_response(_fake_gemini_text(prompt))
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        await asyncio.sleep(self.latency)
+        return _fake_gemini_response(_fake_gemini_text(prompt))
@@ -0,0 +1,76 @@
+# backend/curation/fake_newsapi.py
+"""
+Stand-in for NewsAPI in benchmarks. FakeNewsAPIAdapter is a requests transport adapter:
+mounted on the session from services.get_http_session(), it answers /v2/everything
+queries locally with generated articles, so the real fetch code runs without a network.
+Articles are derived from the keyword, their position and a seed, so runs are repeatable.
+"""
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+_SYLLABLES = ("ka", "lo", "mi", "re", "su", "ta", "ve", "no", "pi", "dra", "xen", "qua", "bor", "lin", "tek", "sol")
+# Distinct filler words, so generated articles are not near-duplicates of each other (see dedup.py)
+_rng = random.Random(0)
+VOCABULARY = sorted({"".join(_rng.choices(_SYLLABLES, k=_rng.randint(2, 4))) for _ in range(4000)})
+
+
+class FakeNewsAPIAdapter(BaseAdapter):
+    """
+    Answers NewsAPI requests with up to `articles_per_keyword` articles mentioning the
+    queried keyword, after `latency` seconds. A share of them (`undescribed_ratio`) comes
+    without a description, like real NewsAPI results, and so needs an AI summary.
+    """
+
+    def __init__(self, articles_per_keyword=50, latency=0.0, undescribed_ratio=0.5, seed=0):
+        super().__init__()
+        self.articles_per_keyword = articles_per_keyword
+        self.latency = latency
+        self.undescribed_ratio = undescribed_ratio
+        self.seed = seed
+        self.now = datetime.now(timezone.utc)
+        self._requests = itertools.count()
+        self.requests = 0
+
+    def _article(self, keyword, position):
+        rng = random.Random(f"{self.seed}:{keyword}:{position}")
+        words = lambda count: " ".join(rng.choices(VOCABULARY, k=count))
+        slug = "-".join(keyword.lower().split())
+        published = self.now - timedelta(minutes=rng.randint(0, 24 * 60))
+        return {
+            "source": {"id": None, "name": f"Fake Source {rng.randint(1, 20)}"},
+            "author": None,
+            "title": f"{keyword}: {words(8)}",
+            "description": None if rng.random() < self.undescribed_ratio else f"{words(12)} {keyword} {words(12)}.",
+            "url": f"https://fake-news.invalid/{slug}/{self.seed}/{position}",
+            "urlToImage": None,
+            "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "content": f"{words(60)} {keyword} {words(60)}.",
+        }
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.latency:
+            time.sleep(self.latency)
+        self.requests = next(self._requests) + 1
+        query = parse_qs(urlparse(request.url).query)
+        keyword = query.get('q', [''])[0].strip('"')
+        count = min(int(query.get('pageSize', ['100'])[0]), self.articles_per_keyword)
+        articles = [self._article(keyword, position) for position in range(count)]
+
+        response = Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        response._content = json.dumps({"status": "ok", "totalResults": len(articles), "articles": articles}).encode()
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
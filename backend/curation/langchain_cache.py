@@ -0,0 +1,45 @@
+# backend/curation/langchain_cache.py
+# Kept apart from llm_cache.py so the Gemini helpers can use the cache without importing LangChain
+import json
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+from .llm_cache import lookup, make_cache_key, store
+from .models import LLMCacheEntry
+
+
+class DjangoLLMCache(BaseCache):
+    """LangChain cache backed by LLMCacheEntry, so chain and agent calls share the same store."""
+
+    namespace = 'chain'
+
+    def _key(self, prompt, llm_string):
+        # llm_string already encodes the model name and its parameters
+        return make_cache_key(llm_string, prompt)
+
+    def lookup(self, prompt, llm_string):
+        cached = lookup(self._key(prompt, llm_string), self.namespace)
+        if cached is None:
+            return None
+        try:
+            return [
+                # generation_info marks the hit for llm_metrics
+                ChatGeneration(message=AIMessage(content=item["text"]), generation_info={"cache_hit": True})
+                if item.get("chat") else Generation(text=item["text"], generation_info={"cache_hit": True})
+                for item in json.loads(cached)
+            ]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring unreadable LLM cache entry: {e}")
+            return None
+
+    def update(self, prompt, llm_string, return_val):
+        payload = json.dumps([
+            {"text": generation.text, "chat": isinstance(generation, ChatGeneration)}
+            for generation in return_val
+        ])
+        store(self._key(prompt, llm_string), payload, self.namespace, llm_string[:100])
+
+    def clear(self, **kwargs):
+        LLMCacheEntry.objects.filter(namespace=self.namespace).delete()
@@ -0,0 +1,140 @@
+# backend/curation/langchain_callbacks.py
+import contextvars
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import get_buffer_string
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from .llm_metrics import record_call
+from .rate_limit import get_governor, is_rate_limit_error
+
+# When the current LangChain call got its rate limit token; RateGovernorCallback measures
+# latency from here, so waiting for the token doesn't count as a slow call
+_token_taken_at = contextvars.ContextVar('llm_token_taken_at', default=None)
+
+
+class GovernedRateLimiter(BaseRateLimiter):
+    """
+    Puts LangChain model calls behind the rate governor (see rate_limit.py). Passed as the
+    model's rate_limiter, which LangChain applies after the cache lookup, so replies
+    served by DjangoLLMCache never take a token or wait for one.
+    """
+
+    def acquire(self, *, blocking=True):
+        governor = get_governor()
+        if governor is not None:
+            if not blocking:
+                if not governor.try_acquire():
+                    return False
+            else:
+                governor.acquire()
+        _token_taken_at.set(time.monotonic())
+        return True
+
+    async def aacquire(self, *, blocking=True):
+        governor = get_governor()
+        if governor is not None:
+            if not blocking:
+                if not governor.try_acquire():
+                    return False
+            else:
+                await governor.acquire_async()
+        _token_taken_at.set(time.monotonic())
+        return True
+
+
+class RateGovernorCallback(BaseCallbackHandler):
+    """
+    Reports how LangChain model calls went to the rate governor: throttling, and latency
+    from the moment GovernedRateLimiter handed out the call's token. For streams, latency
+    is time to the first token, since a long reply is not congestion. Cache hits took no
+    token and report nothing. Sync, so LangChain runs it in the context the limiter set
+    (in an executor thread for async calls, keeping Redis off the event loop).
+    """
+
+    def __init__(self):
+        self._runs = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._runs.add(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._runs.add(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._runs:
+            self._runs.discard(run_id)
+            self._record_latency()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if run_id not in self._runs:
+            return
+        self._runs.discard(run_id)
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        if not (generation and (generation.generation_info or {}).get('cache_hit')):
+            self._record_latency()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.discard(run_id)
+        governor = get_governor()
+        if governor is not None and is_rate_limit_error(error):
+            governor.record(throttled=True)
+
+    def _record_latency(self):
+        taken_at = _token_taken_at.get()
+        governor = get_governor()
+        if taken_at is None or governor is None:
+            return
+        _token_taken_at.set(None)
+        governor.record(latency=time.monotonic() - taken_at)
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Records LangChain model calls with llm_metrics. The call site comes from the run's
+    'llm_call_site' metadata (set by the builders in agents.py), token counts from the
+    reply's usage metadata; replies served by DjangoLLMCache count as cache hits. Latency
+    runs from the start event, so it includes any wait for the rate governor.
+    Sync on purpose: sync calls (Celery tasks) write the row on their own thread and
+    database connection, async calls have LangChain run it in an executor thread.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, serialized, "\n".join(get_buffer_string(m) for m in messages), metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, serialized, "\n".join(prompts), metadata)
+
+    def _start(self, run_id, serialized, prompt, metadata):
+        metadata = metadata or {}
+        self._calls[run_id] = {
+            "call_site": metadata.get('llm_call_site', 'chain'),
+            "model_name": metadata.get('ls_model_name') or (serialized or {}).get('name') or "unknown",
+            "prompt": prompt,
+            "started": time.perf_counter(),
+        }
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+        record_call(
+            call["call_site"], call["model_name"], call["prompt"], time.perf_counter() - call["started"],
+            completion=generation.text if generation else "",
+            prompt_tokens=usage.get('input_tokens'),
+            completion_tokens=usage.get('output_tokens'),
+            cache_hit=bool(generation and (generation.generation_info or {}).get('cache_hit')),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is not None:
+            record_call(
+                call["call_site"], call["model_name"], call["prompt"], time.perf_counter() - call["started"], error=error,
+            )
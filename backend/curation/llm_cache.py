@@ -0,0 +1,111 @@
+# backend/curation/llm_cache.py
+import hashlib
+import json
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMCacheEntry, LLMCacheCounter
+
+_writes_since_prune = 0
+_prune_lock = threading.Lock()
+
+
+def make_cache_key(model_name, prompt, **params):
+    """Returns the content address (sha256 hex) of an LLM call."""
+    payload = json.dumps({"model": model_name, "prompt": prompt, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _record(namespace, hits=0, misses=0):
+    if not (hits or misses):
+        return
+    updated = LLMCacheCounter.objects.filter(namespace=namespace).update(
+        hits=F('hits') + hits, misses=F('misses') + misses
+    )
+    if not updated:
+        LLMCacheCounter.objects.get_or_create(namespace=namespace)
+        LLMCacheCounter.objects.filter(namespace=namespace).update(
+            hits=F('hits') + hits, misses=F('misses') + misses
+        )
+
+
+def lookup_many(keys, namespace):
+    """
+    Looks up several cache keys at once. Returns a dict of key -> cached response
+    for the keys that were found and have not expired.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not settings.LLM_CACHE_ENABLED or not keys:
+        return {}
+    found = dict(
+        LLMCacheEntry.objects.filter(key__in=keys, expires_at__gt=timezone.now()).values_list('key', 'response')
+    )
+    _record(namespace, hits=len(found), misses=len(keys) - len(found))
+    return found
+
+
+def lookup(key, namespace):
+    """Returns the cached response for `key`, or None on a miss."""
+    return lookup_many([key], namespace).get(key)
+
+
+def store_many(entries, namespace, model_name):
+    """Stores a dict of key -> response. Existing keys are refreshed."""
+    global _writes_since_prune
+    if not settings.LLM_CACHE_ENABLED or not entries:
+        return
+    expires_at = timezone.now() + timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS)
+    LLMCacheEntry.objects.bulk_create(
+        [
+            LLMCacheEntry(key=key, namespace=namespace, model_name=model_name, response=response, expires_at=expires_at)
+            for key, response in entries.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['key'],
+        update_fields=['response', 'expires_at'],
+    )
+
+    with _prune_lock:
+        _writes_since_prune += len(entries)
+        should_prune = _writes_since_prune >= settings.LLM_CACHE_PRUNE_INTERVAL
+        if should_prune:
+            _writes_since_prune = 0
+    if should_prune:
+        prune()
+
+
+def store(key, response, namespace, model_name):
+    """Stores a single response."""
+    store_many({key: response}, namespace, model_name)
+
+
+def prune():
+    """Deletes expired entries, then the oldest ones beyond LLM_CACHE_MAX_ENTRIES. Returns rows deleted."""
+    deleted, _ = LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+    cutoff = (
+        LLMCacheEntry.objects.order_by('-created_at')
+        .values_list('created_at', flat=True)[settings.LLM_CACHE_MAX_ENTRIES:settings.LLM_CACHE_MAX_ENTRIES + 1]
+        .first()
+    )
+    if cutoff is not None:
+        evicted, _ = LLMCacheEntry.objects.filter(created_at__lte=cutoff).delete()
+        deleted += evicted
+    return deleted
+
+
+def get_stats():
+    """Returns hit/miss counters per namespace plus the number of stored entries."""
+    namespaces = {
+        counter.namespace: {
+            "hits": counter.hits,
+            "misses": counter.misses,
+            "hit_rate": round(counter.hits / (counter.hits + counter.misses), 3) if counter.hits + counter.misses else 0.0,
+        }
+        for counter in LLMCacheCounter.objects.order_by('namespace')
+    }
+    return {"entries": LLMCacheEntry.objects.count(), "namespaces": namespaces}
+
@@ -0,0 +1,279 @@
+# backend/curation/llm_metrics.py
+"""
+Instrumentation for LLM calls. Every Gemini call from ai_utils and every LangChain model
+call (through LLMMetricsCallback) is recorded as an LLMCall row: call site, model, Celery
+task, latency, prompt/completion tokens, cache status and failure. get_stats() turns the
+rows into latency histograms, percentiles, token totals and cost per call site, model and
+task; the `llm_metrics` command and the admin-only /api/llm-metrics/ endpoint show them.
+"""
+import hashlib
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import LLMCall
+from .prompt_packing import estimate_tokens
+
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000) # Bucket upper bounds; slower calls count in 'le_inf'
+PRUNE_EVERY = 500 # Writes between deletions of rows older than LLM_METRICS_RETENTION_DAYS
+
+_writes_since_prune = 0
+_prune_lock = threading.Lock()
+
+
+def _current_task_name():
+    from celery import current_task
+
+    return current_task.name if current_task and current_task.request.id else ""
+
+
+def _new_call(call_site, model_name, prompt, latency, completion=None, prompt_tokens=None,
+              completion_tokens=None, cache_hit=False, error=None, attempts=1, task=""):
+    estimated = False
+    if cache_hit:
+        prompt_tokens = completion_tokens = 0
+    else:
+        if prompt_tokens is None:
+            prompt_tokens, estimated = estimate_tokens(prompt), True
+        if completion_tokens is None:
+            completion_tokens, estimated = estimate_tokens(completion or ""), True
+    return LLMCall(
+        call_site=call_site,
+        model_name=model_name[:100],
+        task=task[:100],
+        cache_hit=cache_hit,
+        error=f"{type(error).__name__}: {error}"[:200] if error is not None else "",
+        attempts=attempts,
+        latency_ms=round(latency * 1000),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        tokens_estimated=estimated,
+        prompt_key=hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        prompt_preview=" ".join(prompt.split())[:200],
+    )
+
+
+def _save(calls):
+    """Writes recorded calls. Never raises: losing a metric must not fail the call it describes."""
+    global _writes_since_prune
+    try:
+        LLMCall.objects.bulk_create(calls)
+        with _prune_lock:
+            _writes_since_prune += len(calls)
+            should_prune = _writes_since_prune >= PRUNE_EVERY
+            if should_prune:
+                _writes_since_prune = 0
+        if should_prune:
+            prune()
+    except Exception as e:
+        print(f"Could not record LLM call metrics: {e}")
+
+
+def record_call(call_site, model_name, prompt, latency, **outcome):
+    """
+    Stores one LLM call. `outcome` may hold the completion text, prompt_tokens and
+    completion_tokens from the provider, cache_hit, the error raised and attempts. Token
+    counts the provider did not report are estimated from the text; cache hits cost none.
+    """
+    if settings.LLM_METRICS_ENABLED:
+        _save([_new_call(call_site, model_name, prompt, latency, task=_current_task_name(), **outcome)])
+
+
+def record_cache_hits(call_site, model_name, prompts):
+    """Stores one cache hit per prompt, in a single write."""
+    if settings.LLM_METRICS_ENABLED and prompts:
+        task = _current_task_name()
+        _save([_new_call(call_site, model_name, prompt, 0.0, cache_hit=True, task=task) for prompt in prompts])
+
+
+def gemini_usage(response):
+    """Returns (prompt_tokens, completion_tokens) from a Gemini reply's usage metadata, or (None, None)."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None, None
+    return getattr(usage, 'prompt_token_count', None), getattr(usage, 'candidates_token_count', None)
+
+
+class TrackedCall:
+    """
+    Records one Gemini call when its `with` (or `async with`) block exits, as a failure if
+    the block raised. Wrap the provider function with timed()/atimed() so latency covers
+    the request itself, not rate limit waits, and retries are counted; set `response` and
+    `completion` once the reply is in.
+    """
+
+    def __init__(self, call_site, model_name, prompt):
+        self.call_site = call_site
+        self.model_name = model_name
+        self.prompt = prompt
+        self.latency = 0.0
+        self.attempts = 0
+        self.response = None
+        self.completion = None
+
+    def timed(self, fn):
+        def wrapper(*args, **kwargs):
+            self.attempts += 1
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.latency = time.perf_counter() - started
+        return wrapper
+
+    def atimed(self, fn):
+        async def wrapper(*args, **kwargs):
+            self.attempts += 1
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.latency = time.perf_counter() - started
+        return wrapper
+
+    def record(self, error=None):
+        prompt_tokens, completion_tokens = gemini_usage(self.response)
+        record_call(
+            self.call_site, self.model_name, self.prompt, self.latency,
+            completion=self.completion, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            error=error, attempts=max(self.attempts, 1),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.record(error=exc)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await sync_to_async(self.record)(error=exc)
+
+
+def prune():
+    """Deletes calls older than LLM_METRICS_RETENTION_DAYS. Returns rows deleted."""
+    cutoff = timezone.now() - timedelta(days=settings.LLM_METRICS_RETENTION_DAYS)
+    deleted, _ = LLMCall.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _cost(prompt_tokens, completion_tokens):
+    return round(
+        (prompt_tokens * settings.LLM_PRICE_PER_MILLION_PROMPT_TOKENS
+         + completion_tokens * settings.LLM_PRICE_PER_MILLION_COMPLETION_TOKENS) / 1_000_000,
+        6,
+    )
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _histogram(sorted_values):
+    counts = {}
+    remaining = iter(sorted_values)
+    value = next(remaining, None)
+    for bound in LATENCY_BUCKETS_MS:
+        count = 0
+        while value is not None and value <= bound:
+            count += 1
+            value = next(remaining, None)
+        counts[f"le_{bound}"] = count
+    counts["le_inf"] = (1 if value is not None else 0) + sum(1 for _ in remaining)
+    return counts
+
+
+def _totals(rows):
+    calls = rows['calls']
+    return {
+        "calls": calls,
+        "failures": rows['failures'],
+        "cache_hits": rows['cache_hits'],
+        "cache_hit_rate": round(rows['cache_hits'] / calls, 3) if calls else 0.0,
+        "prompt_tokens": rows['prompt_tokens'] or 0,
+        "completion_tokens": rows['completion_tokens'] or 0,
+        "cost_usd": _cost(rows['prompt_tokens'] or 0, rows['completion_tokens'] or 0),
+    }
+
+
+_AGGREGATES = {
+    "calls": Count('id'),
+    "failures": Count('id', filter=~Q(error="")),
+    "cache_hits": Count('id', filter=Q(cache_hit=True)),
+    "prompt_tokens": Sum('prompt_tokens'),
+    "completion_tokens": Sum('completion_tokens'),
+}
+
+
+def get_stats(hours=24, call_site=None, slowest=10):
+    """
+    Summarizes the calls of the last `hours` hours (optionally one call site).
+
+    Returns a dict with 'overall' totals, 'call_sites' (per call site and model: totals,
+    latency p50/p95/p99/max and a latency histogram of the calls that reached the API),
+    'tasks' (totals per Celery task, '' being web requests) and the `slowest` calls.
+    Latencies are in milliseconds, costs in USD at the LLM_PRICE_PER_MILLION_* settings.
+    """
+    calls = LLMCall.objects.filter(created_at__gte=timezone.now() - timedelta(hours=hours))
+    if call_site:
+        calls = calls.filter(call_site=call_site)
+
+    latencies = {}
+    for site, model_name, latency_ms in (
+        calls.filter(cache_hit=False).order_by('latency_ms').values_list('call_site', 'model_name', 'latency_ms')
+    ):
+        latencies.setdefault((site, model_name), []).append(latency_ms)
+
+    call_sites = []
+    for rows in calls.values('call_site', 'model_name').annotate(**_AGGREGATES).order_by('call_site', 'model_name'):
+        values = latencies.get((rows['call_site'], rows['model_name']), [])
+        call_sites.append({
+            "call_site": rows['call_site'],
+            "model": rows['model_name'],
+            **_totals(rows),
+            "latency_ms": {
+                "mean": round(statistics.fmean(values)) if values else None,
+                "p50": _percentile(values, 0.50),
+                "p95": _percentile(values, 0.95),
+                "p99": _percentile(values, 0.99),
+                "max": values[-1] if values else None,
+                "histogram": _histogram(values),
+            },
+        })
+
+    tasks = [
+        {"task": rows['task'], **_totals(rows)}
+        for rows in calls.values('task').annotate(**_AGGREGATES).order_by('task')
+    ]
+    slowest_calls = [
+        {
+            "call_site": call.call_site,
+            "model": call.model_name,
+            "task": call.task,
+            "latency_ms": call.latency_ms,
+            "prompt_tokens": call.prompt_tokens,
+            "completion_tokens": call.completion_tokens,
+            "error": call.error,
+            "prompt_key": call.prompt_key[:12],
+            "prompt_preview": call.prompt_preview,
+            "created_at": call.created_at.isoformat(),
+        }
+        for call in calls.filter(cache_hit=False).order_by('-latency_ms')[:slowest]
+    ]
+    return {
+        "hours": hours,
+        "overall": _totals(calls.aggregate(**_AGGREGATES)),
+        "call_sites": call_sites,
+        "tasks": tasks,
+        "slowest": slowest_calls,
+    }
@@ -0,0 +1,179 @@
+# backend/curation/management/commands/benchmark_pipeline.py
+import contextlib
+import io
+import math
+import os
+import random
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from curation import agents, ai_utils, services, tasks
+from curation.fake_llm import FakeGeminiModel, FakeStreamingChatModel
+from curation.fake_newsapi import FakeNewsAPIAdapter
+from curation.langchain_callbacks import LLMMetricsCallback
+from curation.models import Article, Interest, LLMCall, Newsletter, UserInterest
+from curation.services import NEWS_API_BASE_URL
+from newsletter_agent.celery import app
+
+MAX_PAGE_SIZE = 100 # NewsAPI returns at most this many articles per keyword
+
+
+class QueryCounter:
+    """connection.execute_wrapper that counts and times queries (CaptureQueriesContext keeps only the last 9000)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the pipeline end to end in a throwaway test database: "
+        "fetch_and_save_articles_task against a fake NewsAPI, drain_summary_backlog_task and "
+        "generate_all_newsletters_task against fake LLMs, with Celery tasks run eagerly. "
+        "Reports wall time, throughput, SQL queries and LLM calls per stage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=10000, help="Articles NewsAPI returns in total.")
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--interests', type=int, default=200)
+        parser.add_argument('--interests-per-user', type=int, default=3)
+        parser.add_argument('--undescribed', type=float, default=0.5, help="Share of articles without a description.")
+        parser.add_argument('--newsapi-latency', type=float, default=0.05, help="Fake NewsAPI seconds per request.")
+        parser.add_argument('--newsapi-rate', type=float,
+                            help="NEWS_API_RATE_LIMIT_PER_SECOND (0 disables the limit); the setting by default.")
+        parser.add_argument('--llm-latency', type=float, default=0.0, help="Fake LLM seconds per call.")
+        parser.add_argument('--ingest-mode', choices=['bulk', 'row'], default='bulk',
+                            help="INGEST_BULK_MODE; 'row' saves articles one by one.")
+        parser.add_argument('--generation-mode', choices=['per_user', 'shared_sections'], help="NEWSLETTER_GENERATION_MODE.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if math.ceil(options['articles'] / max(options['interests'], 1)) > MAX_PAGE_SIZE:
+            raise CommandError(f"At most {MAX_PAGE_SIZE} articles per interest; use more --interests.")
+
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with self.fakes(options):
+                self._seed(options)
+                self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    @contextlib.contextmanager
+    def fakes(self, options):
+        """Runs Celery eagerly against a fake NewsAPI and fake LLMs, in whatever database is current."""
+        per_keyword = math.ceil(options['articles'] / max(options['interests'], 1))
+        eager = app.conf.task_always_eager, app.conf.task_eager_propagates
+        app.conf.task_always_eager = app.conf.task_eager_propagates = True
+        original_llm = agents.set_llm(FakeStreamingChatModel(latency=options['llm_latency'], callbacks=[LLMMetricsCallback()]))
+
+        session = services.get_http_session()
+        original_adapters = session.adapters.copy()
+        session.mount(NEWS_API_BASE_URL, FakeNewsAPIAdapter(
+            articles_per_keyword=per_keyword, latency=options['newsapi_latency'],
+            undescribed_ratio=options['undescribed'], seed=options['seed'],
+        ))
+        overrides = {
+            'INGEST_BULK_MODE': options['ingest_mode'] == 'bulk',
+            'LLM_RATE_LIMIT_ENABLED': False, # The fakes have no quota to protect
+            'RANKING_INDEX_DIR': tempfile.mkdtemp(),
+        }
+        if options['newsapi_rate'] is not None:
+            overrides['NEWS_API_RATE_LIMIT_PER_SECOND'] = options['newsapi_rate']
+        if options['generation_mode']:
+            overrides['NEWSLETTER_GENERATION_MODE'] = options['generation_mode']
+        try:
+            with override_settings(**overrides), \
+                    mock.patch.object(ai_utils, 'get_gemini_model', lambda *a: FakeGeminiModel(latency=options['llm_latency'])):
+                yield
+        finally:
+            session.adapters = original_adapters
+            agents.set_llm(original_llm)
+            app.conf.task_always_eager, app.conf.task_eager_propagates = eager
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        Interest.objects.bulk_create([Interest(name=f"Topic {i:03d}") for i in range(options['interests'])])
+        interest_ids = list(Interest.objects.values_list('id', flat=True))
+        User.objects.bulk_create([User(username=f"bench-{i}") for i in range(options['users'])], batch_size=1000)
+        user_ids = list(User.objects.filter(username__startswith="bench-").values_list('id', flat=True))
+        per_user = min(options['interests_per_user'], len(interest_ids))
+        UserInterest.objects.bulk_create(
+            [UserInterest(user_id=user_id, interest_id=interest_id)
+             for user_id in user_ids for interest_id in rng.sample(interest_ids, per_user)],
+            batch_size=1000,
+        )
+        self.stdout.write(
+            f"Seeded {len(interest_ids)} interests and {len(user_ids)} users "
+            f"({per_user} interests each) in {time.perf_counter() - started:.2f}s."
+        )
+
+    def _run(self, options):
+        """Runs the three stages and prints a table of them. Returns the per-stage results by name."""
+        ingest = self._stage("fetch_and_save_articles", tasks.fetch_and_save_articles_task.delay,
+                             lambda: Article.objects.count(), "articles")
+
+        def summarize():
+            # Beat would run the drain every SUMMARY_DRAIN_INTERVAL_SECONDS; here it runs back to back
+            while tasks.drain_summary_backlog_task.delay().get():
+                pass
+
+        done = lambda: Article.objects.filter(summary_state=Article.SummaryState.DONE).count()
+        summary = self._stage("summarize", summarize, done, "articles")
+        newsletters = self._stage("generate_all_newsletters", tasks.generate_all_newsletters_task.delay,
+                                  lambda: Newsletter.objects.count(), "newsletters")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{'stage':<26} {'wall s':>8} {'items':>8} {'items/s':>9} {'queries':>9} {'q/item':>7} {'SQL s':>7} {'LLM calls':>10}"
+        ))
+        for name, result in (("fetch_and_save_articles", ingest), ("summarize", summary), ("generate_all_newsletters", newsletters)):
+            items = result['items']
+            self.stdout.write(
+                f"{name:<26} {result['seconds']:>8.2f} {items:>8} {items / result['seconds'] if result['seconds'] else 0:>9.1f} "
+                f"{result['queries']:>9} {result['queries'] / items if items else 0:>7.1f} "
+                f"{result['query_seconds']:>7.2f} {result['llm_calls']:>10}"
+            )
+        total = sum(result['seconds'] for result in (ingest, summary, newsletters))
+        self.stdout.write(self.style.SUCCESS(f"Pipeline total: {total:.2f}s"))
+        return {"fetch_and_save_articles": ingest, "summarize": summary, "generate_all_newsletters": newsletters}
+
+    def _stage(self, name, run, count, unit):
+        """Runs one stage with task output silenced. Returns wall seconds, items produced, queries and LLM calls."""
+        items_before, llm_calls_before = count(), LLMCall.objects.count()
+        output = io.StringIO()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries), contextlib.redirect_stdout(output):
+            started = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - started
+        items = count() - items_before
+        self.stdout.write(f"{name}: {items} {unit} in {seconds:.2f}s")
+        if self.verbosity > 1:
+            self.stdout.write(output.getvalue())
+        return {
+            "seconds": seconds,
+            "items": items,
+            "queries": queries.count,
+            "query_seconds": queries.seconds,
+            "llm_calls": LLMCall.objects.count() - llm_calls_before,
+        }
@@ -0,0 +1,85 @@
+# backend/curation/management/commands/check_import_time.py
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Heavy modules that must only be imported when an LLM call or ranking build needs them
+DEFERRED_MODULES = ('langchain', 'langchain_core', 'langchain_google_genai', 'google.generativeai', 'numpy')
+
+_SETUP = "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'newsletter_agent.settings'); "
+TARGETS = {
+    # What `manage.py <command>` loads before the command itself runs
+    'manage': ['manage.py', 'check'],
+    # A WSGI web process up to its first resolved request
+    'web': ['-c', _SETUP + "from newsletter_agent.wsgi import application; "
+                          "from django.urls import get_resolver; get_resolver().url_patterns"],
+    # A Celery worker importing every app's tasks
+    'worker': ['-c', _SETUP + "import django; django.setup(); "
+                             "from newsletter_agent.celery import app; app.loader.import_default_modules()"],
+}
+
+
+def _parse_importtime(stderr):
+    """Returns [(module, self_us, cumulative_us, is_top_level)] from `python -X importtime` output."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        imports.append((name.strip(), int(self_us), int(cumulative_us), not name[1:].startswith(" ")))
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures startup import time of manage.py, a web process and a Celery worker with "
+        "`python -X importtime`, and fails if LangChain, Gemini or NumPy load at startup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), action='append', help="Repeatable; all by default.")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per target; the fastest is reported.")
+        parser.add_argument('--top', type=int, default=10, help="Slowest top-level imports to list.")
+        parser.add_argument('--budget-ms', type=float, help="Fail if a target's total import time exceeds this.")
+
+    def handle(self, *args, **options):
+        failures = []
+        for target in options['target'] or sorted(TARGETS):
+            runs = [self._run(target) for _ in range(max(options['repeat'], 1))]
+            wall_seconds, imports = min(runs, key=lambda run: sum(i[2] for i in run[1] if i[3]))
+            total_ms = sum(i[2] for i in imports if i[3]) / 1000
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{target}: {total_ms:.0f} ms importing {len(imports)} modules ({wall_seconds:.2f}s wall)"
+            ))
+            top_level = sorted((i for i in imports if i[3]), key=lambda i: i[2], reverse=True)
+            for name, _, cumulative_us, _ in top_level[:options['top']]:
+                self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+            eager = sorted({
+                name for name, _, _, _ in imports
+                if any(name == module or name.startswith(module + ".") for module in DEFERRED_MODULES)
+            })
+            if eager:
+                failures.append(f"{target} imports {', '.join(eager[:5])}{'...' if len(eager) > 5 else ''} at startup")
+            if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+                failures.append(f"{target} takes {total_ms:.0f} ms, over the {options['budget_ms']:.0f} ms budget")
+
+        if failures:
+            raise CommandError("; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("No deferred module is imported at startup."))
+
+    def _run(self, target):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', *TARGETS[target]],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        wall_seconds = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f"{target} failed to start:\n{result.stderr[-2000:]}")
+        return wall_seconds, _parse_importtime(result.stderr)
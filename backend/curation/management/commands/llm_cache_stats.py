@@ -0,0 +1,26 @@
+# backend/curation/management/commands/llm_cache_stats.py
+from django.core.management.base import BaseCommand
+
+from curation import llm_cache
+
+
+class Command(BaseCommand):
+    help = "Shows LLM response cache hit/miss counters and optionally prunes expired or excess entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help="Evict expired entries and enforce LLM_CACHE_MAX_ENTRIES first.")
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            deleted = llm_cache.prune()
+            self.stdout.write(f"Pruned {deleted} cache entries.")
+
+        stats = llm_cache.get_stats()
+        self.stdout.write(f"Stored entries: {stats['entries']}")
+        total_hits = 0
+        for namespace, counters in stats['namespaces'].items():
+            total_hits += counters['hits']
+            self.stdout.write(
+                f"  {namespace:<10} hits={counters['hits']:<8} misses={counters['misses']:<8} hit rate={counters['hit_rate']:.1%}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"LLM calls saved by the cache: {total_hits}"))
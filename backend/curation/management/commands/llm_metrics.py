@@ -0,0 +1,105 @@
+# backend/curation/management/commands/llm_metrics.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from curation import llm_metrics
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:,}"
+
+
+def _change(before, after):
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before:+.1%}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows recorded LLM calls per call site and model (latency percentiles and histogram, "
+        "tokens, cache hits, failures, cost), per Celery task, and the slowest prompts. "
+        "Save a run with --json and pass it to --compare later to measure an optimization against it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help="Window to summarize.")
+        parser.add_argument('--call-site', help="Only this call site, e.g. summary, section, intro, newsletter, agent.")
+        parser.add_argument('--slowest', type=int, default=5, help="Slowest calls to list.")
+        parser.add_argument('--json', action='store_true', help="Print the raw stats as JSON (a baseline for --compare).")
+        parser.add_argument('--compare', metavar='BASELINE', help="JSON file from an earlier --json run.")
+        parser.add_argument('--prune', action='store_true', help="Delete calls older than LLM_METRICS_RETENTION_DAYS first.")
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            self.stdout.write(f"Pruned {llm_metrics.prune()} recorded calls.")
+
+        stats = llm_metrics.get_stats(hours=options['hours'], call_site=options['call_site'], slowest=options['slowest'])
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+
+        overall = stats['overall']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Last {stats['hours']:g}h: {overall['calls']} calls, {overall['failures']} failed, "
+            f"{overall['cache_hit_rate']:.1%} cache hits, {overall['prompt_tokens']:,} prompt + "
+            f"{overall['completion_tokens']:,} completion tokens, ${overall['cost_usd']:.4f}"
+        ))
+        self.stdout.write(
+            f"  {'call site':<14} {'model':<22} {'calls':>6} {'fail':>5} {'hit%':>6} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'tok in':>9} {'tok out':>8} {'cost $':>9}"
+        )
+        for site in stats['call_sites']:
+            latency = site['latency_ms']
+            self.stdout.write(
+                f"  {site['call_site']:<14} {site['model'][:22]:<22} {site['calls']:>6} {site['failures']:>5} "
+                f"{site['cache_hit_rate']:>6.1%} {_ms(latency['p50']):>8} {_ms(latency['p95']):>8} "
+                f"{_ms(latency['p99']):>8} {site['prompt_tokens']:>9,} {site['completion_tokens']:>8,} "
+                f"{site['cost_usd']:>9.4f}"
+            )
+            buckets = "  ".join(f"{bucket[3:]}:{count}" for bucket, count in latency['histogram'].items() if count)
+            if buckets:
+                self.stdout.write(f"  {'':<14} latency ms <= {buckets}")
+
+        if stats['tasks']:
+            self.stdout.write(self.style.MIGRATE_HEADING("Per task:"))
+            for task in stats['tasks']:
+                self.stdout.write(
+                    f"  {task['task'] or '(web request)':<45} {task['calls']:>6} calls "
+                    f"{task['prompt_tokens'] + task['completion_tokens']:>10,} tokens ${task['cost_usd']:.4f}"
+                )
+
+        if stats['slowest']:
+            self.stdout.write(self.style.MIGRATE_HEADING("Slowest calls:"))
+            for call in stats['slowest']:
+                self.stdout.write(
+                    f"  {call['latency_ms']:>7,} ms  {call['call_site']:<14} {call['prompt_tokens']:>6} tok  "
+                    f"[{call['prompt_key']}] {call['prompt_preview'][:80]}"
+                )
+
+        if options['compare']:
+            self._compare(options['compare'], stats)
+
+    def _compare(self, path, stats):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read baseline {path}: {e}")
+
+        before = {(s['call_site'], s['model']): s for s in baseline.get('call_sites', [])}
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Against {path}:"))
+        for site in stats['call_sites']:
+            old = before.get((site['call_site'], site['model']))
+            if old is None:
+                self.stdout.write(f"  {site['call_site']:<14} new call site")
+                continue
+            calls, old_calls = max(site['calls'], 1), max(old['calls'], 1)
+            self.stdout.write(
+                f"  {site['call_site']:<14} p50 {_change(old['latency_ms']['p50'], site['latency_ms']['p50'])}, "
+                f"p95 {_change(old['latency_ms']['p95'], site['latency_ms']['p95'])}, "
+                f"tokens/call {_change((old['prompt_tokens'] + old['completion_tokens']) / old_calls, (site['prompt_tokens'] + site['completion_tokens']) / calls)}, "
+                f"cost/call {_change(old['cost_usd'] / old_calls, site['cost_usd'] / calls)}, "
+                f"cache hits {old['cache_hit_rate']:.1%} -> {site['cache_hit_rate']:.1%}"
+            )
@@ -0,0 +1,115 @@
+# backend/curation/management/commands/load_test_newsletter_stream.py
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from curation import agents
+from curation.fake_llm import FakeStreamingChatModel
+from curation.models import Article, Interest, UserInterest
+from curation.views import AsyncUserNewsletterStreamView, UserNewsletterStreamView
+
+STREAM_PATH = '/api/user-newsletters/stream/'
+
+
+def _summarize(label, timings, elapsed, stdout):
+    """timings: list of (seconds to first token, seconds to done) per request."""
+    first = sorted(t[0] for t in timings)
+    total = sorted(t[1] for t in timings)
+    stdout.write(
+        f"{label:<6} {len(timings)} requests in {elapsed:.2f}s = {len(timings) / elapsed:.1f} req/s | "
+        f"first token p50 {statistics.median(first) * 1000:.0f} ms, p95 {first[int(len(first) * 0.95) - 1] * 1000:.0f} ms | "
+        f"complete p50 {statistics.median(total):.2f}s"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests on-demand newsletter streaming against a fake LLM in a throwaway test "
+        "database: the sync view on a fixed pool of worker threads (like a WSGI server) "
+        "versus the async view with every request in flight on one event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per mode.")
+        parser.add_argument('--latency', type=float, default=1.0, help="Fake LLM seconds per newsletter.")
+        parser.add_argument('--threads', type=int, default=8, help="Worker threads for the sync view.")
+        parser.add_argument('--concurrency', type=int, default=200, help="LLM_MAX_CONCURRENCY for the async view.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            # A file, not shared-cache memory: worker threads write concurrently
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'load_test.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        original_llm = agents.set_llm(FakeStreamingChatModel(latency=options['latency']))
+        try:
+            count = options['requests']
+            tokens = self._seed(count * 2)
+            # Warm up imports and the first query outside the timed runs
+            self._consume_sync(UserNewsletterStreamView.as_view(), RequestFactory(), tokens.pop())
+
+            sync_tokens, async_tokens = tokens[:count], tokens[count:2 * count]
+            started = time.perf_counter()
+            view = UserNewsletterStreamView.as_view()
+            factory = RequestFactory()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                sync_timings = list(pool.map(lambda token: self._consume_sync(view, factory, token), sync_tokens))
+            _summarize('sync', sync_timings, time.perf_counter() - started, self.stdout)
+
+            with override_settings(LLM_MAX_CONCURRENCY=options['concurrency']):
+                started = time.perf_counter()
+                async_timings = asyncio.run(self._run_async(async_tokens))
+                _summarize('async', async_timings, time.perf_counter() - started, self.stdout)
+        finally:
+            agents.set_llm(original_llm)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _seed(self, user_count):
+        interest = Interest.objects.create(name="Load Test")
+        article = Article.objects.create(
+            title="Load test article", url="https://load-test.invalid/1", source="seed",
+            published_date=timezone.now(), summary="A summarized article for the load test.",
+        )
+        article.topics.add(interest)
+        User.objects.bulk_create([User(username=f"load-test-{i}") for i in range(user_count + 1)])
+        users = list(User.objects.filter(username__startswith="load-test-"))
+        UserInterest.objects.bulk_create([UserInterest(user=user, interest=interest) for user in users])
+        Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+        return list(Token.objects.values_list('key', flat=True))
+
+    def _consume_sync(self, view, factory, token):
+        started = time.perf_counter()
+        first_token = None
+        response = view(factory.post(STREAM_PATH, headers={'Authorization': f'Token {token}'}))
+        for chunk in response.streaming_content:
+            if first_token is None and chunk.startswith(b'event: token'):
+                first_token = time.perf_counter() - started
+        response.close()
+        return first_token or 0.0, time.perf_counter() - started
+
+    async def _run_async(self, tokens):
+        view = AsyncUserNewsletterStreamView.as_view()
+        factory = AsyncRequestFactory()
+
+        async def consume(token):
+            # Like Django's ASGIHandler, give each request its own thread for sync database work
+            async with ThreadSensitiveContext():
+                started = time.perf_counter()
+                first_token = None
+                response = await view(factory.post(STREAM_PATH, headers={'Authorization': f'Token {token}'}))
+                async for chunk in response.streaming_content:
+                    if first_token is None and chunk.startswith(b'event: token'):
+                        first_token = time.perf_counter() - started
+                return first_token or 0.0, time.perf_counter() - started
+
+        return await asyncio.gather(*(consume(token) for token in tokens))
@@ -0,0 +1,97 @@
+# backend/curation/matching.py
+from collections import deque
+import threading
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+class InterestMatcher:
+    """
+    Aho-Corasick automaton over interest names.
+    Finds every interest mentioned in a text in one pass over the text, however
+    many interests there are. Only whole-word matches count, so "AI" does not
+    match inside "said".
+    """
+
+    def __init__(self, interests_map):
+        """
+        Args:
+            interests_map (dict): Maps lowercased interest names to Interest objects.
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # Per state: list of (pattern length, interest)
+        for name, interest in interests_map.items():
+            name = name.strip().lower()
+            if name:
+                self._add(name, interest)
+        self._build_failure_links()
+
+    def _add(self, pattern, interest):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), interest))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                # Inherit the matches of the longest proper suffix
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def match(self, text):
+        """Returns the interests mentioned in `text` as whole words, in order of first mention."""
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        found = {}
+        state = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            if i < last and _is_word_char(text[i + 1]):
+                continue
+            for length, interest in output[state]:
+                start = i - length + 1
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                found.setdefault(interest.pk, interest)
+        return list(found.values())
+
+
+_cached_key = None
+_cached_matcher = None
+_cache_lock = threading.Lock()
+
+
+def get_interest_matcher(interests_map):
+    """
+    Returns an InterestMatcher for `interests_map`, reusing the one built for the
+    previous ingest run as long as the set of interests has not changed.
+    """
+    global _cached_key, _cached_matcher
+    key = tuple(sorted((name, interest.pk) for name, interest in interests_map.items()))
+    with _cache_lock:
+        if key != _cached_key:
+            _cached_matcher = InterestMatcher(interests_map)
+            _cached_key = key
+        return _cached_matcher
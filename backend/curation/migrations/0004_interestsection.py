@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0003_llm_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(max_length=64)),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('articles', models.ManyToManyField(related_name='sections', to='curation.article')),
+                ('interest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='curation.interest')),
+            ],
+            options={
+                'unique_together': {('run_id', 'interest')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0004_interestsection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsletter',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0006_article_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-published_date', '-id'], name='article_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('summary__isnull', False)), fields=['-published_date', 'id'], name='article_summarized_recent_idx'),
+        ),
+        # The auto-created topics through table can't declare Meta.indexes; this makes
+        # "articles for these interests" a covering index range scan.
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS article_topics_interest_idx ON curation_article_topics (interest_id, article_id);',
+            reverse_sql='DROP INDEX IF EXISTS article_topics_interest_idx;',
+        ),
+        migrations.AddIndex(
+            model_name='newsletter',
+            index=models.Index(fields=['user', '-generation_date'], name='newsletter_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:40
+
+from django.db import migrations
+
+SQLITE_FORWARDS = [
+    # External-content FTS5 table: stores only the inverted index, rows stay in curation_article
+    """CREATE VIRTUAL TABLE IF NOT EXISTS curation_article_fts USING fts5(
+        title, summary, full_text,
+        content='curation_article', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    # Triggers keep the index current on every write, including bulk_create/bulk_update from ingest
+    """CREATE TRIGGER IF NOT EXISTS curation_article_fts_ai AFTER INSERT ON curation_article BEGIN
+        INSERT INTO curation_article_fts(rowid, title, summary, full_text)
+        VALUES (new.id, new.title, new.summary, new.full_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS curation_article_fts_ad AFTER DELETE ON curation_article BEGIN
+        INSERT INTO curation_article_fts(curation_article_fts, rowid, title, summary, full_text)
+        VALUES ('delete', old.id, old.title, old.summary, old.full_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS curation_article_fts_au AFTER UPDATE OF title, summary, full_text ON curation_article BEGIN
+        INSERT INTO curation_article_fts(curation_article_fts, rowid, title, summary, full_text)
+        VALUES ('delete', old.id, old.title, old.summary, old.full_text);
+        INSERT INTO curation_article_fts(rowid, title, summary, full_text)
+        VALUES (new.id, new.title, new.summary, new.full_text);
+    END""",
+    "INSERT INTO curation_article_fts(curation_article_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS curation_article_fts_au",
+    "DROP TRIGGER IF EXISTS curation_article_fts_ad",
+    "DROP TRIGGER IF EXISTS curation_article_fts_ai",
+    "DROP TABLE IF EXISTS curation_article_fts",
+]
+
+POSTGRES_FORWARDS = [
+    # Generated column: Postgres maintains it on every insert/update, the ORM never selects it
+    """ALTER TABLE curation_article ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(full_text, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS curation_article_search_idx ON curation_article USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS curation_article_search_idx",
+    "ALTER TABLE curation_article DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0007_query_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARDS, 'postgresql': POSTGRES_FORWARDS}),
+            _run({'sqlite': SQLITE_BACKWARDS, 'postgresql': POSTGRES_BACKWARDS}),
+        ),
+    ]
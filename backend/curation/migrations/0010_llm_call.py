@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0009_article_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('call_site', models.CharField(max_length=30)),
+                ('model_name', models.CharField(max_length=100)),
+                ('task', models.CharField(blank=True, max_length=100)),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('latency_ms', models.PositiveIntegerField()),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('tokens_estimated', models.BooleanField(default=False)),
+                ('prompt_key', models.CharField(max_length=64)),
+                ('prompt_preview', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['call_site', 'created_at'], name='curation_ll_call_si_c83223_idx')],
+            },
+        ),
+    ]
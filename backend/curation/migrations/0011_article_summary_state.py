@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:32
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def summary_window_start():
+    # Newsletters use the last 7 days (sections.get_recent_articles_for_interest), the
+    # ranking index the last RANKING_WINDOW_DAYS; older articles are never shown again
+    return timezone.now() - timedelta(days=max(7, settings.RANKING_WINDOW_DAYS))
+
+
+def skip_existing_articles(apps, schema_editor):
+    """
+    Existing summaries may be descriptions or AI output; either way they stay in `summary` as the
+    fallback. Canonical articles still inside the newsletter and ranking windows stay PENDING so
+    the drain gives them AI summaries; older ones and near-duplicates are settled as SKIPPED.
+    """
+    Article = apps.get_model('curation', 'Article')
+    Article.objects.filter(
+        models.Q(canonical__isnull=False)
+        | models.Q(summary__isnull=False, published_date__lt=summary_window_start())
+    ).update(summary_state='skipped')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0010_llm_call'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_summarized_recent_idx',
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='ai_summary',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='summary_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='summary_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='summary_state',
+            field=models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('done', 'Done'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=12),
+        ),
+        migrations.RunPython(skip_existing_articles, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('ai_summary__isnull', False), ('summary__isnull', False), _connector='OR'), fields=['-published_date', 'id'], name='article_summarized_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['summary_state', '-published_date'], name='article_summary_state_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0012_cache_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='article_summarized_recent_idx',
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:50
+
+from django.db import migrations
+
+# 0011 altered curation_article, which SQLite does by copying the table, and that dropped the
+# FTS triggers from 0008. Any later migration that alters curation_article on SQLite drops
+# them again and must recreate them the same way.
+
+SQLITE_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS curation_article_fts_au",
+    "DROP TRIGGER IF EXISTS curation_article_fts_ad",
+    "DROP TRIGGER IF EXISTS curation_article_fts_ai",
+    "DROP TABLE IF EXISTS curation_article_fts",
+]
+
+SQLITE_FORWARDS = SQLITE_TRIGGERS + [
+    """CREATE VIRTUAL TABLE curation_article_fts USING fts5(
+        title, summary, ai_summary, full_text,
+        content='curation_article', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER curation_article_fts_ai AFTER INSERT ON curation_article BEGIN
+        INSERT INTO curation_article_fts(rowid, title, summary, ai_summary, full_text)
+        VALUES (new.id, new.title, new.summary, new.ai_summary, new.full_text);
+    END""",
+    """CREATE TRIGGER curation_article_fts_ad AFTER DELETE ON curation_article BEGIN
+        INSERT INTO curation_article_fts(curation_article_fts, rowid, title, summary, ai_summary, full_text)
+        VALUES ('delete', old.id, old.title, old.summary, old.ai_summary, old.full_text);
+    END""",
+    """CREATE TRIGGER curation_article_fts_au AFTER UPDATE OF title, summary, ai_summary, full_text ON curation_article BEGIN
+        INSERT INTO curation_article_fts(curation_article_fts, rowid, title, summary, ai_summary, full_text)
+        VALUES ('delete', old.id, old.title, old.summary, old.ai_summary, old.full_text);
+        INSERT INTO curation_article_fts(rowid, title, summary, ai_summary, full_text)
+        VALUES (new.id, new.title, new.summary, new.ai_summary, new.full_text);
+    END""",
+    # Indexes everything written while the triggers were missing
+    "INSERT INTO curation_article_fts(curation_article_fts) VALUES ('rebuild')",
+]
+
+# Back to the 0008 index, triggers included
+SQLITE_BACKWARDS = SQLITE_TRIGGERS + [
+    """CREATE VIRTUAL TABLE curation_article_fts USING fts5(
+        title, summary, full_text,
+        content='curation_article', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER curation_article_fts_ai AFTER INSERT ON curation_article BEGIN
+        INSERT INTO curation_article_fts(rowid, title, summary, full_text)
+        VALUES (new.id, new.title, new.summary, new.full_text);
+    END""",
+    """CREATE TRIGGER curation_article_fts_ad AFTER DELETE ON curation_article BEGIN
+        INSERT INTO curation_article_fts(curation_article_fts, rowid, title, summary, full_text)
+        VALUES ('delete', old.id, old.title, old.summary, old.full_text);
+    END""",
+    """CREATE TRIGGER curation_article_fts_au AFTER UPDATE OF title, summary, full_text ON curation_article BEGIN
+        INSERT INTO curation_article_fts(curation_article_fts, rowid, title, summary, full_text)
+        VALUES ('delete', old.id, old.title, old.summary, old.full_text);
+        INSERT INTO curation_article_fts(rowid, title, summary, full_text)
+        VALUES (new.id, new.title, new.summary, new.full_text);
+    END""",
+    "INSERT INTO curation_article_fts(curation_article_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS curation_article_search_idx",
+    "ALTER TABLE curation_article DROP COLUMN IF EXISTS search_vector",
+]
+
+POSTGRES_FORWARDS = POSTGRES_DROP + [
+    # The AI summary weighs as much as NewsAPI's description
+    """ALTER TABLE curation_article ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(ai_summary, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(full_text, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX curation_article_search_idx ON curation_article USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARDS = POSTGRES_DROP + [
+    """ALTER TABLE curation_article ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(full_text, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX curation_article_search_idx ON curation_article USING GIN (search_vector)",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0013_drop_article_summarized_recent_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARDS, 'postgresql': POSTGRES_FORWARDS}),
+            _run({'sqlite': SQLITE_BACKWARDS, 'postgresql': POSTGRES_BACKWARDS}),
+        ),
+    ]
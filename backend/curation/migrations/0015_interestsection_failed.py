@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0014_article_search_index_ai_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interestsection',
+            name='failed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:40
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def pend_recent_articles(apps, schema_editor):
+    """
+    Databases that ran 0011 before it left recent articles PENDING have every article with a
+    summary marked SKIPPED. Hands the canonical ones still inside the newsletter and ranking
+    windows back to the summary drain; only 0011 ever set SKIPPED on a canonical article.
+    """
+    Article = apps.get_model('curation', 'Article')
+    window_start = timezone.now() - timedelta(days=max(7, settings.RANKING_WINDOW_DAYS))
+    Article.objects.filter(
+        summary_state='skipped', canonical__isnull=True, ai_summary__isnull=True,
+        published_date__gte=window_start,
+    ).update(summary_state='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('curation', '0015_interestsection_failed'),
+    ]
+
+    operations = [
+        migrations.RunPython(pend_recent_articles, migrations.RunPython.noop),
+    ]
@@ -26,28 +26,142 @@ class UserInterest(models.Model):
 
 
 class Article(models.Model):
+    class SummaryState(models.TextChoices):
+        PENDING = 'pending' # Waiting for the summary drain, see summaries.py
+        IN_PROGRESS = 'in_progress' # Claimed by a drain run
+        DONE = 'done'
+        FAILED = 'failed' # Gave up after SUMMARY_MAX_ATTEMPTS; the description is shown instead
+        SKIPPED = 'skipped' # Near-duplicates, and articles older than the summary windows when states were added (0011)
+
     title = models.CharField(max_length=255)
     url = models.URLField(max_length=500, unique=True)
     source = models.CharField(max_length=100)
     published_date = models.DateTimeField()
-    summary = models.TextField(blank=True, null=True) # AI-generated summary
+    summary = models.TextField(blank=True, null=True) # Description from NewsAPI
+    ai_summary = models.TextField(blank=True, null=True) # AI-generated summary
+    summary_state = models.CharField(max_length=12, choices=SummaryState.choices, default=SummaryState.PENDING)
+    summary_attempts = models.PositiveSmallIntegerField(default=0)
+    summary_claimed_at = models.DateTimeField(blank=True, null=True) # Lets a later drain reclaim work from a dead worker
     full_text = models.TextField(blank=True, null=True) # Optional, store full text for AI processing if needed
     topics = models.ManyToManyField(Interest, related_name='articles') # Relate to interests
+    updated_at = models.DateTimeField(auto_now=True, db_index=True) # Drives ETag/Last-Modified on the article list
+    simhash = models.BigIntegerField(blank=True, null=True) # Near-duplicate fingerprint, see dedup.py
+    canonical = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, blank=True, null=True, related_name='duplicates'
+    ) # Set on syndicated copies; only canonical articles are summarized and sent
 
     class Meta:
         ordering = ['-published_date']
+        indexes = [
+            # Article list cursor pagination
+            models.Index(fields=['-published_date', '-id'], name='article_published_idx'),
+            # The summary drain claims the newest pending articles
+            models.Index(fields=['summary_state', '-published_date'], name='article_summary_state_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def display_summary(self):
+        """The AI summary, falling back to the description until there is one."""
+        return self.ai_summary or self.summary
+
+
+# Articles ready for newsletters: AI-summarized, or summarizing gave up or was skipped and the
+# description is shown instead. Pending and in-progress articles wait for the summary drain.
+SUMMARY_READY = (
+    models.Q(summary_state=Article.SummaryState.DONE)
+    | models.Q(summary_state__in=[Article.SummaryState.FAILED, Article.SummaryState.SKIPPED], summary__isnull=False)
+)
+
+
 class Newsletter(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='newsletters')
     generation_date = models.DateTimeField(auto_now_add=True)
     content = models.TextField() # The full AI-generated newsletter text
     articles_included = models.ManyToManyField(Article, related_name='newsletters') # Articles summarized in this newsletter
+    fingerprint = models.CharField(max_length=64, blank=True, default='') # Hash of interest ids, article ids and their summaries, see sections.newsletter_fingerprint
 
     class Meta:
         ordering = ['-generation_date']
+        indexes = [
+            models.Index(fields=['user', '-generation_date'], name='newsletter_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"Newsletter for {self.user.username} on {self.generation_date.strftime('%Y-%m-%d')}"
+
+class LLMCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True) # sha256 of model, prompt and parameters
+    namespace = models.CharField(max_length=50) # Call site, e.g. 'summary', 'section', 'chain'
+    model_name = models.CharField(max_length=100)
+    response = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = "LLM cache entries"
+
+    def __str__(self):
+        return f"{self.namespace} cache entry {self.key[:12]}"
+
+
+class LLMCacheCounter(models.Model):
+    namespace = models.CharField(max_length=50, unique=True)
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.namespace}: {self.hits} hits / {self.misses} misses"
+
+
+class LLMCall(models.Model):
+    """One LLM call (or cache hit) as recorded by llm_metrics.py."""
+    call_site = models.CharField(max_length=30) # 'summary', 'summary_batch', 'section', 'intro', 'newsletter', 'agent'
+    model_name = models.CharField(max_length=100)
+    task = models.CharField(max_length=100, blank=True) # Celery task that made the call; blank for web requests
+    cache_hit = models.BooleanField(default=False)
+    error = models.CharField(max_length=200, blank=True) # Exception type and message; blank on success
+    attempts = models.PositiveSmallIntegerField(default=1) # Throttled calls are retried, see rate_limit.py
+    latency_ms = models.PositiveIntegerField() # Last attempt only, excluding rate limit waits
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    tokens_estimated = models.BooleanField(default=False) # No usage metadata in the reply; counted from characters
+    prompt_key = models.CharField(max_length=64) # sha256 of the prompt, groups repeated prompts
+    prompt_preview = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['call_site', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.call_site} call to {self.model_name} ({self.latency_ms} ms)"
+
+
+class InterestSection(models.Model):
+    """A newsletter section for one interest, generated once per run and shared by every subscriber."""
+    run_id = models.CharField(max_length=64)
+    interest = models.ForeignKey(Interest, on_delete=models.CASCADE, related_name='sections')
+    content = models.TextField()
+    articles = models.ManyToManyField(Article, related_name='sections')
+    failed = models.BooleanField(default=False) # Generation gave up for this run; subscribers leave the interest out
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ('run_id', 'interest')
+
+    def __str__(self):
+        return f"{self.interest.name} section for run {self.run_id}"
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter for a cached payload (see caching.py). Kept in the database so every
+    process sees a bump, whatever cache backend holds the payloads.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField()
 
     def __str__(self):
-        return f"Newsletter for {self.user.username} on {self.generation_date.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"{self.name} v{self.version}"
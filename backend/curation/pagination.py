@@ -0,0 +1,22 @@
+# backend/curation/pagination.py
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class ArticleCursorPagination(CursorPagination):
+    """Newest-first cursor pagination; cost per page stays flat however large the archive grows."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-published_date', '-id') # id breaks ties between articles published at the same moment
+
+
+class NewsletterPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ArticleSearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
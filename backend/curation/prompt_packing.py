@@ -0,0 +1,114 @@
+# backend/curation/prompt_packing.py
+import math
+
+from django.conf import settings
+
+CHARS_PER_TOKEN = 4 # Rough average for English text with Gemini/GPT tokenizers
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about 4 characters per token); no tokenizer round trip."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def trim_to_tokens(text, max_tokens):
+    """Cuts `text` at a word boundary so it fits in about `max_tokens` tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(max_tokens * CHARS_PER_TOKEN - 1, 0)
+    cut = text[:limit]
+    if " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip(" ,;:") + "…"
+
+
+def format_article(article, summary=None):
+    summary = article['summary'] if summary is None else summary
+    return f"Title: {article['title']}\nSummary: {summary}\nURL: {article['url']}"
+
+
+def _fit(article, allowance, min_tokens):
+    """Returns the article's prompt entry trimmed to `allowance` tokens, or None if it can't fit usefully."""
+    entry = format_article(article)
+    tokens = estimate_tokens(entry)
+    if tokens <= allowance:
+        return entry, tokens, False
+    overhead = estimate_tokens(format_article(article, summary=""))
+    summary_allowance = allowance - overhead
+    if summary_allowance < min_tokens:
+        return None
+    entry = format_article(article, trim_to_tokens(article['summary'], summary_allowance))
+    return entry, estimate_tokens(entry), True
+
+
+def pack_articles(articles, interest_by_article, budget=None):
+    """
+    Packs ranked candidate articles into the newsletter prompt within a token budget.
+
+    Args:
+        articles (list): Candidate dicts with 'id', 'title', 'summary' and 'url', best first.
+        interest_by_article (dict): Article id -> the user interest it is filed under.
+        budget (int): Token budget for the article block (NEWSLETTER_PROMPT_TOKEN_BUDGET by default).
+
+    Every summary is first capped at NEWSLETTER_PROMPT_ITEM_MAX_TOKENS. The budget is then
+    split evenly between the interests that have candidates, so one busy topic can't crowd
+    out the others, and each interest takes its best articles until its share is spent.
+    Unused shares go to the remaining articles in rank order, trimming a summary to fit when
+    at least NEWSLETTER_PROMPT_ITEM_MIN_TOKENS of it would survive; the rest are dropped.
+
+    Returns a dict with 'entries' (formatted articles kept, in rank order), 'text' (the
+    entries joined), 'article_ids' (kept), 'tokens' (estimated) and 'trimmed' / 'dropped' counts.
+    """
+    budget = settings.NEWSLETTER_PROMPT_TOKEN_BUDGET if budget is None else budget
+    max_item_tokens = settings.NEWSLETTER_PROMPT_ITEM_MAX_TOKENS
+    min_tokens = settings.NEWSLETTER_PROMPT_ITEM_MIN_TOKENS
+    separator_tokens = estimate_tokens("\n\n---\n\n")
+
+    capped = []
+    trimmed_ids = set()
+    for article in articles:
+        summary = article['summary'] or ""
+        if estimate_tokens(summary) > max_item_tokens:
+            summary = trim_to_tokens(summary, max_item_tokens)
+            trimmed_ids.add(article['id'])
+        capped.append({**article, 'summary': summary})
+
+    groups = {}
+    for article in capped:
+        groups.setdefault(interest_by_article.get(article['id']), []).append(article)
+    share = budget // len(groups) if groups else 0
+
+    entries = {}
+    spent = 0
+    for group in groups.values():
+        group_spent = 0
+        for article in group:
+            fitted = _fit(article, share - group_spent - separator_tokens, min_tokens)
+            if fitted is None or fitted[2]:
+                break # Trimming for fit only happens with the leftover budget below
+            entries[article['id']] = fitted[0]
+            group_spent += fitted[1] + separator_tokens
+        spent += group_spent
+
+    for article in capped:
+        if article['id'] in entries:
+            continue
+        fitted = _fit(article, budget - spent - separator_tokens, min_tokens)
+        if fitted is None:
+            continue
+        entries[article['id']], tokens, was_trimmed = fitted
+        spent += tokens + separator_tokens
+        if was_trimmed:
+            trimmed_ids.add(article['id'])
+
+    kept_ids = [article['id'] for article in capped if article['id'] in entries]
+    kept_entries = [entries[article_id] for article_id in kept_ids]
+    text = "\n\n---\n\n".join(kept_entries)
+    return {
+        "text": text,
+        "entries": kept_entries,
+        "article_ids": kept_ids,
+        "tokens": estimate_tokens(text),
+        "trimmed": len(trimmed_ids & set(kept_ids)),
+        "dropped": len(articles) - len(kept_ids),
+    }
@@ -0,0 +1,276 @@
+# backend/curation/ranking.py
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+MANIFEST_NAME = "manifest.json"
+KEPT_BUILDS = 2 # Older builds stay on disk briefly so workers holding their mmap keep working
+
+_loaded_index = None
+_load_lock = threading.Lock()
+_warned_missing = False
+
+
+def _tokens(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def hashed_term_counts(text, dim):
+    """Maps each word of `text` to one of `dim` buckets (the hashing trick) and counts them."""
+    counts = {}
+    for token in _tokens(text):
+        bucket = zlib.crc32(token.encode("utf-8")) % dim
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def _tfidf_rows(term_counts, idf):
+    """Returns L2-normalized, log-scaled TF-IDF rows (float32) for a list of term counts."""
+    matrix = np.zeros((len(term_counts), len(idf)), dtype=np.float32)
+    for row, counts in enumerate(term_counts):
+        if counts:
+            buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            matrix[row, buckets] = np.log1p(tf) * idf[buckets]
+    _normalize_rows(matrix)
+    return matrix
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _index_dir():
+    return str(settings.RANKING_INDEX_DIR)
+
+
+def _read_manifest(root):
+    with open(os.path.join(root, MANIFEST_NAME)) as handle:
+        return json.load(handle)
+
+
+def _windowed_articles():
+    from .models import SUMMARY_READY, Article
+
+    cutoff_date = timezone.now() - timedelta(days=settings.RANKING_WINDOW_DAYS)
+    return Article.objects.filter(SUMMARY_READY, published_date__gte=cutoff_date, canonical__isnull=True)
+
+
+def _source_signature():
+    """
+    Cheap summary of what a build is made from: the windowed articles (count, newest id,
+    last update, which moves when an AI summary lands) and the interest catalog version.
+    """
+    from .caching import get_interest_catalog_version
+
+    state = _windowed_articles().aggregate(count=Count('id'), last_id=Max('id'), last_update=Max('updated_at'))
+    return f"{state['count']}:{state['last_id']}:{state['last_update']}:{get_interest_catalog_version()}"
+
+
+def build_ranking_index(force=False):
+    """
+    Vectorizes the recent summarized canonical articles and writes the ranking index to
+    RANKING_INDEX_DIR as .npy files (one new build directory, then an atomic manifest
+    swap). Rows are sorted newest first so a days_back window is a prefix of every array.
+    Unless `force`, nothing is rebuilt while the articles and interests are unchanged and
+    the current build is less than half RANKING_INDEX_MAX_AGE_SECONDS old.
+    Returns the new build's manifest, or None if the build was skipped.
+    """
+    from .models import Article, Interest
+
+    root = _index_dir()
+    source = _source_signature()
+    if not force:
+        try:
+            current = _read_manifest(root)
+        except (OSError, ValueError):
+            current = None
+        if (current and current.get("source") == source
+                and time.time() - current["built_at"] < settings.RANKING_INDEX_MAX_AGE_SECONDS / 2):
+            return None
+
+    dim = settings.RANKING_VECTOR_DIM
+    articles = list(
+        _windowed_articles()
+        .annotate(text=Coalesce('ai_summary', 'summary'))
+        .order_by('-published_date', '-id')
+        .values_list('id', 'title', 'text', 'published_date')
+    )
+    interests = list(Interest.objects.order_by('id').values_list('id', 'name', 'description'))
+    interest_columns = {interest_id: column for column, (interest_id, _, _) in enumerate(interests)}
+
+    topic_bits = np.zeros((len(articles), max(len(interests), 1)), dtype=np.uint8)
+    row_of = {article_id: row for row, (article_id, _, _, _) in enumerate(articles)}
+    topic_pairs = Article.topics.through.objects.filter(article_id__in=row_of).values_list('article_id', 'interest_id')
+    for article_id, interest_id in topic_pairs.iterator():
+        topic_bits[row_of[article_id], interest_columns[interest_id]] = 1
+
+    article_counts = [hashed_term_counts(f"{title} {summary}", dim) for _, title, summary, _ in articles]
+    document_frequency = np.zeros(dim, dtype=np.float32)
+    for counts in article_counts:
+        document_frequency[list(counts)] += 1
+    idf = (np.log((1 + len(articles)) / (1 + document_frequency)) + 1).astype(np.float32)
+    vectors = _tfidf_rows(article_counts, idf)
+
+    # An interest's profile is its name/description plus the centroid of the articles tagged with it
+    interest_vectors = _tfidf_rows(
+        [hashed_term_counts(f"{name} {description or ''}", dim) for _, name, description in interests], idf
+    )
+    tagged = topic_bits[:, :len(interests)].T.astype(np.float32)
+    interest_vectors += _normalize_rows(tagged @ vectors)
+    _normalize_rows(interest_vectors)
+
+    build_name = f"build-{time.time_ns()}"
+    build_dir = os.path.join(root, build_name)
+    os.makedirs(build_dir)
+    np.save(os.path.join(build_dir, "vectors.npy"), vectors)
+    np.save(os.path.join(build_dir, "ids.npy"), np.array([a[0] for a in articles], dtype=np.int64))
+    np.save(
+        os.path.join(build_dir, "published.npy"),
+        np.array([a[3].timestamp() for a in articles], dtype=np.float64),
+    )
+    np.save(os.path.join(build_dir, "topics.npy"), np.packbits(topic_bits, axis=1))
+    np.save(os.path.join(build_dir, "interest_vectors.npy"), interest_vectors)
+    np.save(os.path.join(build_dir, "interest_ids.npy"), np.array([i[0] for i in interests], dtype=np.int64))
+
+    manifest = {
+        "build": build_name,
+        "built_at": time.time(),
+        "dim": dim,
+        "articles": len(articles),
+        "interests": len(interests),
+        "source": source,
+    }
+    manifest_tmp = os.path.join(root, f"{MANIFEST_NAME}.{build_name}.tmp")
+    with open(manifest_tmp, "w") as handle:
+        json.dump(manifest, handle)
+    os.replace(manifest_tmp, os.path.join(root, MANIFEST_NAME))
+
+    old_builds = sorted(name for name in os.listdir(root) if name.startswith("build-") and name != build_name)
+    for name in old_builds[:max(len(old_builds) - (KEPT_BUILDS - 1), 0)]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return manifest
+
+
+class RankingIndex:
+    """
+    Read-only view of one index build. Arrays are memory-mapped, so every worker process
+    shares the page cache instead of holding its own copy.
+    """
+
+    def __init__(self, root, manifest):
+        self.manifest = manifest
+        build_dir = os.path.join(root, manifest["build"])
+
+        def load(name):
+            return np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.vectors = load("vectors")
+        self.ids = load("ids")
+        self.published = load("published")
+        self._negated_published = -np.asarray(self.published) # Ascending, for searchsorted
+        self.topics = load("topics")
+        self.interest_vectors = load("interest_vectors")
+        self.interest_columns = {int(interest_id): column for column, interest_id in enumerate(load("interest_ids"))}
+
+    def is_stale(self):
+        return time.time() - self.manifest["built_at"] > settings.RANKING_INDEX_MAX_AGE_SECONDS
+
+    def rank(self, interest_ids_by_user, limit=10, days_back=7, now=None):
+        """
+        Scores every windowed article for every user in one matrix product and returns
+        {user_id: [article_id, ...]} (best first). Score is cosine similarity to the
+        user's interest profile blended with an exponential recency decay; only articles
+        tagged with one of the user's interests are eligible.
+        """
+        user_ids = list(interest_ids_by_user)
+        results = {user_id: [] for user_id in user_ids}
+        now = now if now is not None else time.time()
+        # Rows are newest first, so the window is a prefix
+        window = int(np.searchsorted(self._negated_published, -(now - days_back * 86400), side="right"))
+        if not user_ids or window == 0:
+            return results
+
+        selection = np.zeros((len(self.interest_columns), len(user_ids)), dtype=np.float32)
+        for user_column, user_id in enumerate(user_ids):
+            for interest_id in interest_ids_by_user[user_id]:
+                column = self.interest_columns.get(interest_id)
+                if column is not None:
+                    selection[column, user_column] = 1
+        if not selection.any():
+            return results
+
+        profiles = self.interest_vectors.T @ selection # dim x users
+        norms = np.linalg.norm(profiles, axis=0)
+        np.divide(profiles, norms, out=profiles, where=norms > 0)
+
+        tagged = np.unpackbits(self.topics[:window], axis=1, count=len(self.interest_columns))
+        eligible = (tagged @ selection) > 0 # window x users
+
+        weight = settings.RANKING_RECENCY_WEIGHT
+        half_life = settings.RANKING_RECENCY_HALF_LIFE_HOURS * 3600
+        recency = np.exp2(-(now - self.published[:window]) / half_life).astype(np.float32)
+        scores = (1 - weight) * (self.vectors[:window] @ profiles) + weight * recency[:, None]
+        scores[~eligible] = -np.inf
+
+        top = min(limit, window)
+        if top < window:
+            best = np.argpartition(-scores, top - 1, axis=0)[:top]
+        else:
+            best = np.broadcast_to(np.arange(window)[:, None], (window, len(user_ids)))
+        for user_column, user_id in enumerate(user_ids):
+            rows = best[:, user_column]
+            column_scores = scores[rows, user_column]
+            order = np.argsort(-column_scores, kind="stable")
+            results[user_id] = [int(self.ids[rows[i]]) for i in order if math.isfinite(column_scores[i])]
+        return results
+
+
+def get_ranking_index():
+    """
+    Returns the current RankingIndex, or None if ranking is disabled or no fresh build
+    exists. The loaded build is reused until the manifest points at a newer one.
+    """
+    global _loaded_index, _warned_missing
+    if not settings.RANKING_ENABLED:
+        return None
+    root = _index_dir()
+    try:
+        manifest = _read_manifest(root)
+    except (OSError, ValueError):
+        if not _warned_missing:
+            _warned_missing = True
+            print(f"No ranking index in {root}; candidates fall back to the newest-first SQL query. "
+                  "RANKING_INDEX_DIR must be on storage shared with the ingest workers that build it.")
+        return None
+
+    with _load_lock:
+        if _loaded_index is None or _loaded_index.manifest["build"] != manifest["build"]:
+            try:
+                _loaded_index = RankingIndex(root, manifest)
+            except OSError:
+                return None
+        index = _loaded_index
+    return None if index.is_stale() else index
+
+
+def rank_articles_for_users(interest_ids_by_user, limit=10, days_back=7):
+    """Ranked candidate article ids per user, or None when no usable index is available."""
+    index = get_ranking_index()
+    if index is None:
+        return None
+    return index.rank(interest_ids_by_user, limit=limit, days_back=days_back)
@@ -0,0 +1,293 @@
+# backend/curation/rate_limit.py
+"""
+Cluster-wide rate governor for LLM calls.
+
+Every Gemini call, from ai_utils or a LangChain chain, first takes a token from a shared
+token bucket. With Redis the bucket is shared by all web and worker processes; without
+it each process has its own. The bucket's refill rate adapts AIMD-style: each fast,
+successful call raises it by a small step up to the provider quota. A 429 or a call
+slower than LLM_RATE_LIMIT_LATENCY_TARGET halves it, at most once per cooldown so one
+burst of errors counts once. Throttled calls are retried after a jittered backoff, so
+callers that failed together don't retry together.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from django.conf import settings
+
+ADDITIVE_STEP_FRACTION = 0.02 # Of the quota, added to the rate per successful call
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN_SECONDS = 2.0
+BUCKET_KEY = "llm-rate-limit:gemini"
+BUCKET_TTL_SECONDS = 3600
+
+# Refills the bucket at its current rate, then takes one token if there is one.
+# Returns the seconds to wait before a token will be available (0 = taken).
+# Uses the Redis server clock so workers with skewed clocks agree.
+_TAKE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at', 'rate')
+local capacity = tonumber(ARGV[2])
+local rate = tonumber(state[3]) or tonumber(ARGV[1])
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now), 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return tostring(wait)
+"""
+
+# Applies one AIMD step to the shared rate and returns the new rate.
+_ADJUST_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or tonumber(ARGV[2])
+local min_rate, max_rate = tonumber(ARGV[3]), tonumber(ARGV[4])
+if ARGV[1] == 'decrease' then
+    local decreased_at = tonumber(redis.call('HGET', KEYS[1], 'decreased_at')) or 0
+    if now - decreased_at >= tonumber(ARGV[6]) then
+        rate = math.max(min_rate, rate * tonumber(ARGV[5]))
+        redis.call('HSET', KEYS[1], 'decreased_at', tostring(now))
+    end
+else
+    rate = math.min(max_rate, rate + tonumber(ARGV[5]))
+end
+redis.call('HSET', KEYS[1], 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+return tostring(rate)
+"""
+
+
+class RateLimitTimeout(Exception):
+    """No LLM call slot became free within LLM_RATE_LIMIT_MAX_WAIT seconds."""
+
+
+def backoff_delay(attempt, base, cap):
+    """
+    Exponential backoff with equal jitter: half of min(cap, base * 2**attempt) is fixed and
+    half is random, so retries never come back immediately and never come back together.
+    """
+    ceiling = min(cap, base * 2 ** attempt)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def is_rate_limit_error(exc):
+    """True for provider throttling: HTTP 429 / gRPC RESOURCE_EXHAUSTED."""
+    return getattr(exc, 'code', None) == 429 or type(exc).__name__ in ('ResourceExhausted', 'TooManyRequests')
+
+
+class LocalTokenBucket:
+    """In-process token bucket with the same behaviour as the Redis one; for tests and Redis-less setups."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._decreased_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def adjust(self, signal, step, min_rate, max_rate):
+        with self._lock:
+            if signal == 'decrease':
+                now = time.monotonic()
+                if now - self._decreased_at >= DECREASE_COOLDOWN_SECONDS:
+                    self.rate = max(min_rate, self.rate * DECREASE_FACTOR)
+                    self._decreased_at = now
+            else:
+                self.rate = min(max_rate, self.rate + step)
+            return self.rate
+
+
+class RedisTokenBucket:
+    """
+    Token bucket whose state (tokens, rate) lives in one Redis hash shared by every process.
+    While Redis is unreachable, calls go through a per-process LocalTokenBucket instead, so
+    an outage degrades to per-process limiting rather than failing every LLM call.
+    """
+
+    def __init__(self, client, rate, capacity, key=BUCKET_KEY):
+        from redis.exceptions import RedisError
+
+        self.client = client
+        self.initial_rate = rate
+        self.capacity = capacity
+        self.key = key
+        self._take = client.register_script(_TAKE_SCRIPT)
+        self._adjust = client.register_script(_ADJUST_SCRIPT)
+        self._redis_error = RedisError
+        self._fallback = LocalTokenBucket(rate, capacity)
+        self._failing = False
+
+    def _run(self, fallback, script, keys, args):
+        try:
+            result = float(script(keys=keys, args=args))
+        except self._redis_error as e:
+            if not self._failing:
+                print(f"Warning: LLM rate limit Redis unavailable ({e}); limiting per process until it is back.")
+                self._failing = True
+            return fallback()
+        if self._failing:
+            print("LLM rate limit Redis is back; limiting cluster-wide again.")
+            self._failing = False
+        return result
+
+    def take(self):
+        return self._run(
+            self._fallback.take,
+            self._take, [self.key], [self.initial_rate, self.capacity, BUCKET_TTL_SECONDS],
+        )
+
+    def adjust(self, signal, step, min_rate, max_rate):
+        factor_or_step = DECREASE_FACTOR if signal == 'decrease' else step
+        return self._run(
+            lambda: self._fallback.adjust(signal, step, min_rate, max_rate),
+            self._adjust, [self.key],
+            [signal, self.initial_rate, min_rate, max_rate, factor_or_step,
+             DECREASE_COOLDOWN_SECONDS, BUCKET_TTL_SECONDS],
+        )
+
+
+class RateGovernor:
+    """Gates LLM calls on a token bucket and feeds call outcomes back into its rate."""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.max_rate = settings.LLM_RATE_LIMIT_PER_SECOND
+        self.min_rate = settings.LLM_RATE_LIMIT_MIN_PER_SECOND
+        self.step = self.max_rate * ADDITIVE_STEP_FRACTION
+        self.latency_target = settings.LLM_RATE_LIMIT_LATENCY_TARGET
+
+    def _next_wait(self, deadline):
+        wait = self.bucket.take()
+        if wait <= 0:
+            return 0.0
+        if time.monotonic() + wait > deadline:
+            raise RateLimitTimeout(f"No LLM call slot within {settings.LLM_RATE_LIMIT_MAX_WAIT}s.")
+        return wait * random.uniform(1.0, 1.2) # Spread waiters that were refused together
+
+    def try_acquire(self):
+        """Takes a token if one is free right now; never waits."""
+        return self.bucket.take() <= 0
+
+    def acquire(self):
+        """Blocks until the bucket hands out a token."""
+        deadline = time.monotonic() + settings.LLM_RATE_LIMIT_MAX_WAIT
+        while (wait := self._next_wait(deadline)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """acquire() for event loops; the Redis round trip runs off the loop."""
+        deadline = time.monotonic() + settings.LLM_RATE_LIMIT_MAX_WAIT
+        while (wait := await asyncio.to_thread(self._next_wait, deadline)) > 0:
+            await asyncio.sleep(wait)
+
+    def record(self, latency=None, throttled=False):
+        """Reports a finished call: throttling or a slow reply decreases the rate, anything else increases it."""
+        congested = throttled or (latency is not None and latency > self.latency_target)
+        try:
+            return self.bucket.adjust('decrease' if congested else 'increase', self.step, self.min_rate, self.max_rate)
+        except Exception as e: # Losing one adjustment is harmless; failing the LLM call over it is not
+            print(f"Could not adjust LLM rate limit: {e}")
+            return None
+
+    def call(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) behind the bucket, retrying throttled calls with jittered backoff."""
+        for attempt in range(settings.LLM_RATE_LIMIT_RETRIES + 1):
+            self.acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self.record(throttled=True)
+                if attempt == settings.LLM_RATE_LIMIT_RETRIES:
+                    raise
+                time.sleep(backoff_delay(attempt, base=1.0, cap=30.0))
+            else:
+                self.record(latency=time.monotonic() - started)
+                return result
+
+    async def acall(self, fn, *args, **kwargs):
+        """call() for coroutine functions."""
+        for attempt in range(settings.LLM_RATE_LIMIT_RETRIES + 1):
+            await self.acquire_async()
+            started = time.monotonic()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                await asyncio.to_thread(self.record, throttled=True)
+                if attempt == settings.LLM_RATE_LIMIT_RETRIES:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, base=1.0, cap=30.0))
+            else:
+                await asyncio.to_thread(self.record, latency=time.monotonic() - started)
+                return result
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def _build_bucket():
+    rate, capacity = settings.LLM_RATE_LIMIT_PER_SECOND, settings.LLM_RATE_LIMIT_BURST
+    if settings.LLM_RATE_LIMIT_REDIS_URL:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(settings.LLM_RATE_LIMIT_REDIS_URL, socket_timeout=2)
+            client.ping()
+            return RedisTokenBucket(client, rate, capacity)
+        except Exception as e:
+            print(f"Warning: LLM rate limit Redis unavailable ({e}); limiting per process instead.")
+    return LocalTokenBucket(rate, capacity)
+
+
+def get_governor():
+    """Returns the process-wide RateGovernor, or None when LLM_RATE_LIMIT_ENABLED is off."""
+    global _governor
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        return None
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = RateGovernor(_build_bucket())
+    return _governor
+
+
+def governed_call(fn, *args, **kwargs):
+    """Runs fn behind the process governor (or directly when rate limiting is off)."""
+    governor = get_governor()
+    if governor is None:
+        return fn(*args, **kwargs)
+    return governor.call(fn, *args, **kwargs)
+
+
+async def governed_acall(fn, *args, **kwargs):
+    """Awaits fn behind the process governor (or directly when rate limiting is off)."""
+    governor = await asyncio.to_thread(get_governor) # First use may connect to Redis
+    if governor is None:
+        return await fn(*args, **kwargs)
+    return await governor.acall(fn, *args, **kwargs)
@@ -0,0 +1,96 @@
+# backend/curation/search.py
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Article
+
+# Column weights for bm25(): title matters most, then the summaries, then body
+SQLITE_RANK = "bm25(curation_article_fts, 10.0, 5.0, 5.0, 1.0)"
+
+
+def _fts5_match_expression(query):
+    """Turns free text into an FTS5 expression matching all terms; quoting keeps user input out of FTS5 syntax."""
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{term}"' for term in terms)
+
+
+class ArticleSearchResults:
+    """
+    Lazily evaluated, relevance-ranked search results backed by the database's native
+    full-text index (SQLite FTS5 or a Postgres tsvector GIN index, see migrations 0008 and 0014).
+    Other databases fall back to unranked, newest-first icontains matching.
+    Supports len() and slicing, so Django's Paginator (and DRF pagination) can page it.
+    """
+
+    def __init__(self, query):
+        self.query = query.strip()
+        self._count = None
+
+    def _match_sql(self):
+        """Returns (FROM/WHERE SQL, params, rank expression, id column) for the current database, or None."""
+        if connection.vendor == 'sqlite':
+            return (
+                "FROM curation_article_fts WHERE curation_article_fts MATCH %s",
+                [_fts5_match_expression(self.query)],
+                SQLITE_RANK,
+                "rowid",
+            )
+        if connection.vendor == 'postgresql':
+            return (
+                "FROM curation_article, websearch_to_tsquery('english', %s) query WHERE search_vector @@ query",
+                [self.query],
+                "-ts_rank_cd(search_vector, query)",
+                "id",
+            )
+        return None
+
+    def _fallback_queryset(self):
+        """Articles containing every term in a title or summary; a table scan, so only for databases without an index."""
+        matches = Q()
+        for term in re.findall(r"\w+", self.query):
+            matches &= Q(title__icontains=term) | Q(summary__icontains=term) | Q(ai_summary__icontains=term)
+        return Article.objects.defer('full_text').filter(matches).order_by('-published_date', '-id')
+
+    def _is_empty_query(self):
+        return not re.search(r"\w", self.query)
+
+    def count(self):
+        if self._count is None:
+            if self._is_empty_query():
+                self._count = 0
+            elif self._match_sql() is None:
+                self._count = self._fallback_queryset().count()
+            else:
+                from_where, params, _, _ = self._match_sql()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT COUNT(*) {from_where}", params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        offset = key.start or 0
+        if key.stop is None or self._is_empty_query():
+            return []
+        limit = key.stop - offset
+        if limit <= 0:
+            return []
+
+        if self._match_sql() is None:
+            return list(self._fallback_queryset()[offset:key.stop])
+        from_where, params, rank, id_column = self._match_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {id_column} {from_where} ORDER BY {rank} LIMIT %s OFFSET %s",
+                params + [limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+        articles = Article.objects.defer('full_text').in_bulk(ids)
+        return [articles[article_id] for article_id in ids if article_id in articles]
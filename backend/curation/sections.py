@@ -0,0 +1,158 @@
+# backend/curation/sections.py
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .ai_utils import generate_newsletter_section_gemini
+from .prompt_packing import pack_articles
+from .models import SUMMARY_READY, Article, Interest, InterestSection, Newsletter
+
+
+class SectionGenerationError(Exception):
+    """The LLM call for a shared section failed, or already failed for good earlier in the run."""
+
+
+def get_recent_articles_for_interest(interest, days_back=7):
+    """Returns the newest summarized articles tagged with `interest`."""
+    cutoff_date = timezone.now() - timedelta(days=days_back)
+    return list(
+        Article.objects.filter(
+            SUMMARY_READY,
+            topics=interest,
+            published_date__gte=cutoff_date,
+            canonical__isnull=True,
+        )
+        .only('id', 'title', 'summary', 'ai_summary', 'url')
+        .order_by('-published_date')[:settings.NEWSLETTER_SECTION_ARTICLES]
+    )
+
+
+def build_interest_section(interest, run_id, days_back=7):
+    """
+    Returns the section for `interest` in run `run_id`, generating it with one LLM call
+    the first time it is asked for. Later callers in the same run reuse the stored row.
+    Raises SectionGenerationError if the call fails, so no failure text is shared, and
+    without another call once the run has marked the section failed.
+    """
+    section = InterestSection.objects.filter(run_id=run_id, interest=interest).first()
+    if section is not None and section.failed:
+        raise SectionGenerationError(f"The '{interest.name}' section already failed in run {run_id}.")
+    if section is not None:
+        return section
+
+    articles = get_recent_articles_for_interest(interest, days_back)
+    packing = pack_articles(
+        [{"id": a.id, "title": a.title, "summary": a.display_summary, "url": a.url} for a in articles],
+        {a.id: interest.id for a in articles},
+    )
+    kept_ids = set(packing["article_ids"])
+    articles = [a for a in articles if a.id in kept_ids]
+    content = generate_newsletter_section_gemini(interest.name, packing["entries"])
+    if content is None:
+        raise SectionGenerationError(f"Could not generate the '{interest.name}' section for run {run_id}.")
+
+    try:
+        with transaction.atomic():
+            section = InterestSection.objects.create(run_id=run_id, interest=interest, content=content)
+            section.articles.set(articles)
+    except IntegrityError:
+        # Another worker stored this section first; use theirs
+        section = InterestSection.objects.get(run_id=run_id, interest=interest)
+    return section
+
+
+def mark_section_failed(interest, run_id):
+    """Records that `interest`'s section could not be generated in run `run_id`, unless one was stored meanwhile."""
+    InterestSection.objects.get_or_create(run_id=run_id, interest=interest, defaults={'failed': True})
+
+
+def _section_or_none(interest, run_id, days_back):
+    try:
+        return build_interest_section(interest, run_id, days_back)
+    except SectionGenerationError as e:
+        print(f"{e} Leaving it out.")
+        mark_section_failed(interest, run_id) # The interest's other subscribers won't call again
+        return None
+
+
+def get_sections_for_interests(interests, run_id, days_back=7):
+    """
+    Returns the run's sections for `interests` (in order), building any that are missing.
+    Sections that failed for the run are None; each is attempted at most once more here.
+    """
+    existing = {
+        section.interest_id: section
+        for section in InterestSection.objects.filter(run_id=run_id, interest__in=interests)
+        .prefetch_related('articles')
+    }
+    sections = []
+    for interest in interests:
+        section = existing.get(interest.id)
+        if section is None:
+            section = _section_or_none(interest, run_id, days_back)
+        sections.append(None if section is None or section.failed else section)
+    return sections
+
+
+def assemble_newsletter(intro, interests, sections, outro):
+    """Joins a personalized intro/outro and the shared per-interest sections into one newsletter."""
+    parts = [intro]
+    for interest, section in zip(interests, sections):
+        parts.append(f"## {interest.name}\n\n{section.content}")
+    parts.append(outro)
+    return "\n\n".join(parts)
+
+
+def prune_old_sections(max_age=timedelta(days=2)):
+    """Deletes sections from runs older than `max_age`. Returns the number deleted."""
+    deleted, _ = InterestSection.objects.filter(created_at__lt=timezone.now() - max_age).delete()
+    return deleted
+
+
+def interests_with_subscribers():
+    """Returns the interests that at least one user follows."""
+    return Interest.objects.filter(userinterest__isnull=False).distinct()
+
+
+def newsletter_fingerprint(interest_ids, summaries):
+    """
+    Hashes a user's interest ids and candidate articles, given as {article id: summary shown};
+    equal fingerprints mean nothing new to send. An AI summary replacing an article's
+    description changes the fingerprint.
+    """
+    digest = hashlib.sha256("interests:{}|articles:".format(",".join(str(i) for i in sorted(interest_ids))).encode("utf-8"))
+    for article_id in sorted(summaries):
+        digest.update(f"{article_id}\x1f{summaries[article_id] or ''}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_unchanged_newsletter(user, fingerprint):
+    """True when skipping is enabled and the user's latest newsletter has the same fingerprint."""
+    if not settings.NEWSLETTER_SKIP_UNCHANGED:
+        return False
+    last_fingerprint = (
+        Newsletter.objects.filter(user=user)
+        .order_by('-generation_date')
+        .values_list('fingerprint', flat=True)
+        .first()
+    )
+    return last_fingerprint == fingerprint
+
+
+def no_new_articles_content(username):
+    """The newsletter sent when none of a user's interests has recent articles."""
+    return (
+        f"Hello {username},\n\nThere are no new articles relevant to your interests in the past 7 days. "
+        "Please check back later or update your interests!"
+    )
+
+
+def save_newsletter(user, content, fingerprint, article_ids):
+    """Stores a finished newsletter and links the articles it was built from."""
+    with transaction.atomic():
+        newsletter = Newsletter.objects.create(user=user, content=content, fingerprint=fingerprint)
+        newsletter.articles_included.set(article_ids)
+    return newsletter
@@ -33,9 +33,14 @@ class UserInterestsUpdateSerializer(serializers.Serializer):
         child=serializers.IntegerField(), required=False, default=[]
     )
 
+class UserInterestsReplaceSerializer(serializers.Serializer):
+    interest_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=True)
+
 # backend/curation/serializers.py
 # ...
 class ArticleSerializer(serializers.ModelSerializer):
+    summary = serializers.CharField(source='display_summary', read_only=True) # AI summary, else the description
+
     class Meta:
         model = Article
         fields = ['id', 'title', 'url','published_date','summary']
@@ -46,3 +51,12 @@ class NewsletterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Newsletter
         fields = ['id', 'user', 'content', 'generation_date', 'articles_included']
+
+class NewsletterListSerializer(serializers.ModelSerializer):
+    """Lightweight list representation; `preview` and `article_count` are annotated by the view."""
+    preview = serializers.CharField(read_only=True)
+    article_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Newsletter
+        fields = ['id', 'generation_date', 'preview', 'article_count']
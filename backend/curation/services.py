@@ -1,16 +1,109 @@
 import os
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.db import transaction
 from .models import Article, Interest
+from .matching import get_interest_matcher
+from .dedup import article_fingerprint, load_recent_index, to_signed
 
 
 
 NEWS_API_BASE_URL = "https://newsapi.org/v2/everything"
 
+_http_session = None
+_rate_limiter = None
+_init_lock = threading.Lock()
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host so we stay under a per-second limit."""
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def get_http_session():
+    """Returns the process-wide requests session with pooled keep-alive connections."""
+    global _http_session
+    if _http_session is None:
+        with _init_lock:
+            if _http_session is None:
+                pool_size = max(settings.NEWS_API_FETCH_WORKERS, 1)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _http_session = session
+    return _http_session
+
+
+def get_rate_limiter():
+    """Returns the process-wide per-host rate limiter for outgoing API calls."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _init_lock:
+            if _rate_limiter is None:
+                _rate_limiter = HostRateLimiter(settings.NEWS_API_RATE_LIMIT_PER_SECOND)
+    return _rate_limiter
+
+
+def _fetch_keyword(keyword, from_date, to_date, language, page_size):
+    """Fetches a single keyword from NewsAPI. Returns a (possibly empty) list of articles."""
+    quoted_keyword = f'"{keyword}"' if ' ' in keyword else keyword
+    params = {
+        'q': quoted_keyword,
+        'from': from_date,
+        'to': to_date,
+        'language': language,
+        'sortBy': 'relevancy',
+        'pageSize': min(page_size, 100),
+        'apiKey': settings.NEWS_API_KEY,
+    }
+
+    try:
+        get_rate_limiter().wait(NEWS_API_BASE_URL)
+        response = get_http_session().get(NEWS_API_BASE_URL, params=params, timeout=settings.NEWS_API_TIMEOUT)
+        print(f"📤 Request for '{keyword}' → {response.url}")
+        response.raise_for_status()
+
+        data = response.json()
+        if data.get('status') == 'ok':
+            articles = data.get('articles', [])
+            print(f"✅ Found {len(articles)} articles for keyword: {keyword}")
+            return articles
+        print(f"⚠️ NewsAPI error for keyword '{keyword}': {data.get('message', 'Unknown error')}")
+
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Request error for keyword '{keyword}': {e}")
+    except ValueError as e:
+        print(f"❌ JSON error for keyword '{keyword}': {e}")
+    return []
+
+
 def fetch_articles_from_newsapi(keywords, from_date=None, to_date=None, language='en', page_size=100):
     """
     Fetches articles from NewsAPI.org for each keyword individually.
+    Keywords are fetched concurrently on a bounded worker pool that shares one
+    keep-alive session, so a run takes about as long as the slowest keyword.
     :return: List of unique article dictionaries.
     """
     if not settings.NEWS_API_KEY:
@@ -26,54 +119,82 @@ def fetch_articles_from_newsapi(keywords, from_date=None, to_date=None, language
     from_date = (datetime.now() - timedelta(days=7)).isoformat()
     to_date = datetime.now().isoformat()
 
-    all_articles = []
-    seen_urls = set()  # To prevent duplicates
-
-    for keyword in keywords:
-        quoted_keyword = f'"{keyword}"' if ' ' in keyword else keyword
-        params = {
-            'q': quoted_keyword,
-            'from': from_date,
-            'to': to_date,
-            'language': language,
-            'sortBy': 'relevancy',
-            'pageSize': min(page_size, 100),
-            'apiKey': settings.NEWS_API_KEY,
-        }
-
-        try:
-            response = requests.get(NEWS_API_BASE_URL, params=params)
-            print(f"📤 Request for '{keyword}' → {response.url}")
-            response.raise_for_status()
-
-            data = response.json()
-            if data.get('status') == 'ok':
-                articles = data.get('articles', [])
-                print(f"✅ Found {len(articles)} articles for keyword: {keyword}")
-                for article in articles:
-                    url = article.get('url')
-                    if url and url not in seen_urls:
-                        all_articles.append(article)
-                        seen_urls.add(url)
-            else:
-                print(f"⚠️ NewsAPI error for keyword '{keyword}': {data.get('message', 'Unknown error')}")
+    workers = max(1, min(settings.NEWS_API_FETCH_WORKERS, len(keywords)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='newsapi') as executor:
+        results = executor.map(
+            lambda keyword: _fetch_keyword(keyword, from_date, to_date, language, page_size),
+            keywords,
+        )
 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request error for keyword '{keyword}': {e}")
-        except ValueError as e:
-            print(f"❌ JSON error for keyword '{keyword}': {e}")
+        all_articles = []
+        seen_urls = set()  # To prevent duplicates
+        # executor.map keeps keyword order, so dedupe stays deterministic
+        for articles in results:
+            for article in articles:
+                url = article.get('url')
+                if url and url not in seen_urls:
+                    all_articles.append(article)
+                    seen_urls.add(url)
 
     print(f"🔄 Total unique articles fetched: {len(all_articles)}")
     return all_articles
 
 
 
+def _build_article(article_data):
+    """Builds an unsaved Article from a NewsAPI payload, or returns None if it can't be used."""
+    url = article_data.get('url')
+    if not url:
+        return None
+
+    published_at_str = article_data.get('publishedAt')
+    if not published_at_str:
+        return None
+
+    try:
+        published_date = datetime.fromisoformat(published_at_str.replace('Z', '+00:00'))
+    except ValueError:
+        print(f"Could not parse date: {published_at_str}")
+        return None
+
+    return Article(
+        title=article_data.get('title', 'No Title'),
+        url=url,
+        source=article_data.get('source', {}).get('name', 'Unknown Source'),
+        published_date=published_date,
+        summary=article_data.get('description', ''),
+        full_text=article_data.get('content', '')
+    )
+
+
+def _match_topics(article, matcher):
+    """Returns the interests whose names appear as whole words in the article's text."""
+    article_text = article.title + " " + (article.summary or "") + " " + (article.full_text or "")
+    return matcher.match(article_text)
+
+
+def _chunked(items, size):
+    """Yields successive lists of at most `size` items."""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _read_ids(urls, batch_size):
+    """Maps URLs to ids. bulk_create(ignore_conflicts=True) does not set primary keys, so they are read back."""
+    ids_by_url = {}
+    for batch in _chunked(urls, batch_size):
+        ids_by_url.update(Article.objects.filter(url__in=batch).values_list('url', 'id'))
+    return ids_by_url
+
+
 def save_articles_to_db(articles_data, interests_map=None):
     from .models import Article, Interest
-    from datetime import datetime
 
     if interests_map is None:
         interests_map = {interest.name.lower(): interest for interest in Interest.objects.all()}
+    matcher = get_interest_matcher(interests_map)
+    duplicate_index = load_recent_index() if settings.NEAR_DUPLICATE_DETECTION else None
 
     saved_count = 0
 
@@ -83,41 +204,37 @@ def save_articles_to_db(articles_data, interests_map=None):
             continue
 
         try:
-            published_at_str = article_data.get('publishedAt')
-            if not published_at_str:
-                continue
-
-            try:
-                published_date = datetime.fromisoformat(published_at_str.replace('Z', '+00:00'))
-            except ValueError:
-                print(f"Could not parse date: {published_at_str}")
+            article = _build_article(article_data)
+            if article is None:
                 continue
 
-            article = Article(
-                title=article_data.get('title', 'No Title'),
-                url=url,
-                source=article_data.get('source', {}).get('name', 'Unknown Source'),
-                published_date=published_date,
-                summary=article_data.get('description', ''),
-                full_text=article_data.get('content', '')
-            )
+            fingerprint = None
+            if duplicate_index is not None:
+                fingerprint = article_fingerprint(article)
+                article.simhash = to_signed(fingerprint)
+                article.canonical_id = duplicate_index.find(fingerprint)
+            if article.canonical_id:
+                article.summary_state = Article.SummaryState.SKIPPED # Readers use the original's summary
             article.save()
 
             # Match interests
-            article_text = (article.title + " " + (article.summary or "") + " " + (article.full_text or "")).lower()
-            article_topics = [
-                interest_obj
-                for interest_name, interest_obj in interests_map.items()
-                if interest_name in article_text
-            ]
-            article.topics.set(article_topics)
-
-            # ✅ DEFERRED IMPORT to avoid circular import issue
-            from .tasks import summarize_article_task
-            summarize_article_task.delay(article.id)
+            topics = _match_topics(article, matcher)
+            article.topics.set(topics)
+
+            if article.canonical_id:
+                # Syndicated copy: make sure the original reaches these interests too
+                Article.topics.through.objects.bulk_create(
+                    [Article.topics.through(article_id=article.canonical_id, interest_id=t.id) for t in topics],
+                    ignore_conflicts=True,
+                )
+                saved_count += 1
+                print(f"Saved new article: {article.title} as a duplicate of article {article.canonical_id}.")
+                continue
+            if duplicate_index is not None:
+                duplicate_index.add(fingerprint, article.id)
 
             saved_count += 1
-            print(f"Saved new article: {article.title} and queued for summarization.")
+            print(f"Saved new article: {article.title}, pending summarization.")
 
         except Exception as e:
             print(f"Error saving article {url}: {e}")
@@ -127,3 +244,85 @@ def save_articles_to_db(articles_data, interests_map=None):
     return saved_count
 
 
+def bulk_save_articles_to_db(articles_data, interests_map=None):
+    """
+    Set-based version of save_articles_to_db.
+    Checks existing URLs in one query per batch, inserts with bulk_create, writes
+    the Article-Interest rows in bulk. Summaries are left to drain_summary_backlog_task.
+    :return: Number of new articles saved.
+    """
+    if interests_map is None:
+        interests_map = {interest.name.lower(): interest for interest in Interest.objects.all()}
+    matcher = get_interest_matcher(interests_map)
+
+    batch_size = settings.INGEST_BULK_BATCH_SIZE
+
+    candidates = {}
+    for article_data in articles_data:
+        url = article_data.get('url')
+        if not url or url in candidates:
+            continue
+        article = _build_article(article_data)
+        if article is not None:
+            candidates[url] = article
+
+    if not candidates:
+        print("Finished saving articles. Total new articles saved: 0")
+        return 0
+
+    existing_urls = set()
+    for urls in _chunked(candidates, batch_size):
+        existing_urls.update(Article.objects.filter(url__in=urls).values_list('url', flat=True))
+
+    new_articles = [article for url, article in candidates.items() if url not in existing_urls]
+    if not new_articles:
+        print("Finished saving articles. Total new articles saved: 0")
+        return 0
+
+    # Cluster syndicated copies under a canonical article. Index refs are ids for
+    # stored articles and URLs for articles from this batch.
+    canonical_refs = {}
+    if settings.NEAR_DUPLICATE_DETECTION:
+        duplicate_index = load_recent_index()
+        for article in new_articles:
+            fingerprint = article_fingerprint(article)
+            article.simhash = to_signed(fingerprint)
+            ref = duplicate_index.find(fingerprint)
+            if ref is None:
+                duplicate_index.add(fingerprint, article.url)
+            else:
+                canonical_refs[article.url] = ref
+    originals = [a for a in new_articles if a.url not in canonical_refs]
+    duplicates = [a for a in new_articles if a.url in canonical_refs]
+
+    Through = Article.topics.through
+    with transaction.atomic():
+        # Originals go first so in-batch duplicates can point at their ids
+        Article.objects.bulk_create(originals, batch_size=batch_size, ignore_conflicts=True)
+        ids_by_url = _read_ids((a.url for a in originals), batch_size)
+
+        for article in duplicates:
+            ref = canonical_refs[article.url]
+            article.canonical_id = ref if isinstance(ref, int) else ids_by_url.get(ref)
+            if article.canonical_id:
+                article.summary_state = Article.SummaryState.SKIPPED
+        Article.objects.bulk_create(duplicates, batch_size=batch_size, ignore_conflicts=True)
+        ids_by_url.update(_read_ids((a.url for a in duplicates), batch_size))
+
+        topic_rows = []
+        for article in new_articles:
+            article_id = ids_by_url.get(article.url)
+            if article_id is None:
+                continue
+            for interest in _match_topics(article, matcher):
+                topic_rows.append(Through(article_id=article_id, interest_id=interest.id))
+                if article.canonical_id:
+                    # Make sure the original reaches this interest too
+                    topic_rows.append(Through(article_id=article.canonical_id, interest_id=interest.id))
+        Through.objects.bulk_create(topic_rows, batch_size=batch_size, ignore_conflicts=True)
+
+    saved_count = sum(1 for a in new_articles if a.url in ids_by_url)
+    duplicate_count = sum(1 for a in duplicates if a.url in ids_by_url)
+    print(f"Finished saving articles. Total new articles saved: {saved_count} "
+          f"({duplicate_count} near-duplicates, {saved_count - duplicate_count} pending summarization).")
+    return saved_count
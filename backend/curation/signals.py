@@ -0,0 +1,13 @@
+# backend/curation/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_interest_catalog_version
+from .models import Interest
+
+
+@receiver(post_save, sender=Interest)
+@receiver(post_delete, sender=Interest)
+def invalidate_interest_catalog(sender, **kwargs):
+    # QuerySet.update() and bulk_create() skip signals; call bump_interest_catalog_version() after those
+    bump_interest_catalog_version()
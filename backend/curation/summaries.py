@@ -0,0 +1,128 @@
+# backend/curation/summaries.py
+"""
+AI summary state machine. New canonical articles are stored as PENDING; the periodic
+drain_summary_backlog_task claims them in batches (PENDING -> IN_PROGRESS) and each
+batch ends as DONE, back to PENDING for another attempt, or FAILED after
+SUMMARY_MAX_ATTEMPTS. Claims use SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+drains never hand out the same article; claims older than SUMMARY_CLAIM_TIMEOUT_SECONDS
+(a lost worker) are taken back, or marked FAILED once they used SUMMARY_MAX_ATTEMPTS.
+
+summary_claimed_at doubles as the claim's token. The batch task restarts it when it
+starts (start_summary_batch) and finishes only rows still holding its token, so a batch
+that was reclaimed while it sat in the queue is dropped by whichever task lost the claim
+instead of being summarized twice. Attempts are counted when a batch starts, not when it
+is queued.
+Newsletters and the ranking index only use articles whose summary is settled
+(models.SUMMARY_READY); the article API shows the NewsAPI description until then
+(Article.display_summary).
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Article
+
+State = Article.SummaryState
+
+# Canonical articles without an AI summary; NewsAPI's description in `summary` doesn't count
+NEEDS_AI_SUMMARY = Q(canonical__isnull=True, ai_summary__isnull=True)
+
+
+def _stale_claims():
+    stale = timezone.now() - timedelta(seconds=settings.SUMMARY_CLAIM_TIMEOUT_SECONDS)
+    return Q(summary_state=State.IN_PROGRESS, summary_claimed_at__lt=stale)
+
+
+def held_by(token):
+    """Rows still claimed under `token`, as returned by claim_summary_batch or start_summary_batch."""
+    return Q(summary_state=State.IN_PROGRESS, summary_claimed_at=datetime.fromisoformat(token))
+
+
+def _claimable():
+    return Article.objects.filter(NEEDS_AI_SUMMARY).filter(
+        Q(summary_state=State.PENDING) | (_stale_claims() & Q(summary_attempts__lt=settings.SUMMARY_MAX_ATTEMPTS))
+    )
+
+
+def fail_abandoned_claims():
+    """
+    Marks stale claims that already used SUMMARY_MAX_ATTEMPTS as FAILED, so an article
+    whose workers keep dying is given up on like one whose calls keep failing.
+    Returns the number of articles failed.
+    """
+    now = timezone.now()
+    return Article.objects.filter(_stale_claims(), summary_attempts__gte=settings.SUMMARY_MAX_ATTEMPTS).update(
+        summary_state=State.FAILED, summary_claimed_at=None, updated_at=now,
+    )
+
+
+def claim_summary_batch(size, article_ids=None):
+    """
+    Claims up to `size` articles to summarize, newest first (only among `article_ids` if
+    given). Returns (ids, claim token); pass both to summarize_articles_batch_task. Rows
+    locked by another claim are skipped rather than waited for (a no-op on SQLite, which
+    serializes writers anyway).
+    """
+    abandoned = fail_abandoned_claims()
+    if abandoned:
+        print(f"Gave up on {abandoned} articles whose summary claims expired {settings.SUMMARY_MAX_ATTEMPTS} times.")
+    candidates = _claimable() if article_ids is None else _claimable().filter(id__in=article_ids)
+    with transaction.atomic():
+        ids = list(
+            candidates.select_for_update(skip_locked=True)
+            .order_by('-published_date').values_list('id', flat=True)[:size]
+        )
+        now = timezone.now()
+        if ids:
+            # The state filter repeats the claim condition, so a row is never claimed twice
+            _claimable().filter(id__in=ids).update(
+                summary_state=State.IN_PROGRESS,
+                summary_claimed_at=now,
+                updated_at=now,
+            )
+    return ids, now.isoformat()
+
+
+def start_summary_batch(article_ids, token):
+    """
+    Takes over a claimed batch when its task starts: restarts the claim clock, counts the
+    attempt and returns the new token, or None if every row was reclaimed (or already
+    started by a redelivered copy of the task) in the meantime.
+    """
+    now = timezone.now()
+    started = Article.objects.filter(held_by(token), id__in=article_ids).update(summary_claimed_at=now, summary_attempts=F('summary_attempts') + 1, updated_at=now)
+    return now.isoformat() if started else None
+
+
+def finish_summaries(summaries, token):
+    """
+    Stores the outcome of a started batch: `summaries` maps article ids to their AI
+    summary, or to None when summarizing failed. Failures go back to PENDING until they
+    reach SUMMARY_MAX_ATTEMPTS, then FAILED. Only rows still IN_PROGRESS under `token`
+    (from start_summary_batch) are updated. Returns (done, failed) counts.
+    """
+    now = timezone.now()
+    done = failed = 0
+    with transaction.atomic():
+        articles = list(
+            Article.objects.select_for_update()
+            .filter(held_by(token), id__in=list(summaries))
+            .only('id', 'summary_attempts')
+        )
+        for article in articles:
+            article.ai_summary = summaries[article.id] or None
+            if article.ai_summary:
+                article.summary_state = State.DONE
+                done += 1
+            elif article.summary_attempts >= settings.SUMMARY_MAX_ATTEMPTS:
+                article.summary_state = State.FAILED
+                failed += 1
+            else:
+                article.summary_state = State.PENDING
+            article.summary_claimed_at = None
+            article.updated_at = now # bulk_update skips auto_now
+        Article.objects.bulk_update(articles, ['ai_summary', 'summary_state', 'summary_claimed_at', 'updated_at'])
+    return done, failed
@@ -1,55 +1,108 @@
 # backend/curation/tasks.py
-from celery import shared_task
-from .services import fetch_articles_from_newsapi, save_articles_to_db
+import time
+import uuid
+from celery import chord, group, shared_task
+from .services import fetch_articles_from_newsapi, save_articles_to_db, bulk_save_articles_to_db
 from .models import Interest, Article
 from datetime import datetime, timedelta
-from .agents import get_newsletter_generation_agent_executor, get_newsletter_generation_chain
+from .agents import get_newsletter_generation_agent_executor, get_newsletter_generation_chain, prepare_newsletter_inputs
 from django.contrib.auth.models import User
-from .models import Newsletter
+from .models import Newsletter, UserInterest
 from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.conf import settings
+from django.utils import timezone
 
 
 
 
 # backend/curation/tasks.py (add to existing imports)
-from .ai_utils import summarize_text_gemini 
+from .ai_utils import summarize_texts_gemini, summarize_texts_individually, generate_newsletter_intro_gemini
+from .rate_limit import backoff_delay
+from .summaries import NEEDS_AI_SUMMARY, claim_summary_batch, finish_summaries, held_by, start_summary_batch
+from .sections import SectionGenerationError, mark_section_failed, newsletter_fingerprint, is_unchanged_newsletter, no_new_articles_content, save_newsletter, assemble_newsletter, build_interest_section, get_sections_for_interests, interests_with_subscribers, prune_old_sections
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60) # Add retry logic for API calls
 def summarize_article_task(self, article_id):
     """
-    Celery task to summarize a single article using AI.
+    Celery task to summarize a single article on demand, e.g. from the shell or admin.
+    The article is claimed like a drained batch, so it is never summarized twice. A
+    failed call is retried with backoff; each retry claims again and counts towards
+    SUMMARY_MAX_ATTEMPTS, and if the drain claims the article first the retry stops.
     """
+    article_ids, token = claim_summary_batch(1, article_ids=[article_id])
+    if not article_ids:
+        print(f"Article {article_id} is not waiting for a summary. Skipping.")
+        return "Not pending."
+    if summarize_articles_batch_task(article_ids, token):
+        return "Summarized successfully."
+    if self.request.retries >= self.max_retries:
+        print(f"Failed to summarize article {article_id}; leaving it to the summary drain.")
+        return "Failed."
+    raise self.retry(countdown=backoff_delay(self.request.retries, base=60, cap=600))
+
+
+@shared_task
+def summarize_articles_batch_task(article_ids, token):
+    """
+    Celery task to summarize a batch of claimed articles with one packed AI call.
+    Articles whose reply could not be parsed fall back to single-article calls. Only
+    rows still holding the batch's claim `token` are touched, so a batch reclaimed while
+    it waited in the queue does nothing; outcomes are written with one bulk_update
+    (see summaries.finish_summaries).
+    """
+    token = start_summary_batch(article_ids, token)
+    if token is None:
+        print(f"Batch of {len(article_ids)} articles was reclaimed before it started. Skipping.")
+        return 0
+    articles = list(
+        Article.objects.filter(NEEDS_AI_SUMMARY, held_by(token), id__in=article_ids)
+        .only('id', 'title', 'summary', 'full_text')
+    )
+    if not articles:
+        return 0
+
+    texts = [article.full_text or article.summary or article.title for article in articles]
     try:
-        article = Article.objects.get(id=article_id)
-        if article.summary:
-            print(f"Article {article.id} already summarized. Skipping.")
-            return "Already summarized."
-
-        # Prioritize full_text if available, otherwise use existing summary/title
-        text_to_summarize = article.full_text or article.summary or article.title
-
-        if not text_to_summarize:
-            print(f"No text to summarize for article {article.id}. Skipping.")
-            return "No text available."
-
-        # Choose your AI summary function (Gemini or OpenAI)
-        summary = summarize_text_gemini(text_to_summarize, max_tokens=200)
-
-        if summary and summary != "Error generating summary.": # Basic check for valid summary
-            article.summary = summary
-            article.save(update_fields=['summary'])
-            print(f"Successfully summarized article {article.id}: {article.title}")
-            return "Summarized successfully."
-        else:
-            print(f"Failed to summarize article {article.id}.")
-            # If AI returns error, you might want to log it and retry
-            self.retry(exc=ValueError("AI summary failed."), countdown=self.request.retries * 300) # Exponential backoff
-    except Article.DoesNotExist:
-        print(f"Article with ID {article_id} not found.")
-        return "Article not found."
+        summaries = summarize_texts_gemini(texts, max_tokens=200)
+
+        # Replies that could not be parsed are retried one article per call, concurrently
+        fallback_indexes = [index for index, summary in enumerate(summaries) if summary is None]
+        fallback_summaries = summarize_texts_individually([texts[index] for index in fallback_indexes], max_tokens=200)
+        for index, summary in zip(fallback_indexes, fallback_summaries):
+            summaries[index] = summary
     except Exception as e:
-        print(f"Unhandled error summarizing article {article_id}: {e}")
-        self.retry(exc=e, countdown=self.request.retries * 300) # Retry on other errors
+        # The call itself failed, e.g. throttled: the whole batch goes back to the backlog
+        print(f"Error summarizing batch of {len(articles)} articles: {e}")
+        summaries, fallback_indexes = [None] * len(articles), []
+
+    done, failed = finish_summaries({
+        article.id: summary if summary != "Error generating summary." else None
+        for article, summary in zip(articles, summaries)
+    }, token)
+    print(f"Summarized {done} of {len(articles)} articles in batch "
+          f"({len(fallback_indexes)} single-call fallbacks, {failed} given up on).")
+    return done
+
+
+@shared_task
+def drain_summary_backlog_task():
+    """
+    Celery task to work through the AI summary backlog. Run by Celery Beat every
+    SUMMARY_DRAIN_INTERVAL_SECONDS: claims up to SUMMARY_DRAIN_MAX_BATCHES batches of
+    pending articles and queues one summarize_articles_batch_task per batch, so those
+    two settings bound summarization throughput.
+    """
+    queued = 0
+    for _ in range(settings.SUMMARY_DRAIN_MAX_BATCHES):
+        article_ids, token = claim_summary_batch(settings.SUMMARIZE_BATCH_SIZE)
+        if not article_ids:
+            break
+        summarize_articles_batch_task.delay(article_ids, token)
+        queued += len(article_ids)
+    if queued:
+        print(f"Queued {queued} articles for summarization.")
+    return queued
 
 
 @shared_task
@@ -85,8 +138,13 @@ def fetch_and_save_articles_task():
     )
 
     if fetched_articles_data:
-        saved_count = save_articles_to_db(fetched_articles_data, interests_map)
+        if settings.INGEST_BULK_MODE:
+            saved_count = bulk_save_articles_to_db(fetched_articles_data, interests_map)
+        else:
+            saved_count = save_articles_to_db(fetched_articles_data, interests_map)
         print(f"fetch_and_save_articles_task completed. Saved {saved_count} new articles.")
+        if saved_count and settings.RANKING_ENABLED:
+            build_ranking_index_task.delay()
         return saved_count
     else:
         print("No articles fetched or an error occurred.")
@@ -114,45 +172,34 @@ def generate_user_newsletter_task(user_id):
 
         # --- Option 2: Use the simpler LangChain Chain (recommended to start with) ---
         # First, gather articles relevant to the user's current interests
-        from .agent_tools import get_recent_summarized_articles_for_user_interests # Import tool here
-        relevant_articles_data = get_recent_summarized_articles_for_user_interests.invoke({
-    "user_id": user.id,
-    "days_back": 7
-})
+        try:
+            inputs = prepare_newsletter_inputs(user, days_back=7)
+        except ValueError as e:
+            print(f"Could not gather articles for {user.username}: {e}")
+            return
 
+        if is_unchanged_newsletter(user, inputs["fingerprint"]):
+            print(f"Articles for {user.username} have not changed since the last newsletter. Skipping.")
+            return
 
-        if not relevant_articles_data:
-            ai_generated_content = f"Hello {user.username},\n\nThere are no new articles relevant to your interests in the past 7 days. Please check back later or update your interests!"
+        if not inputs["article_ids"]:
+            ai_generated_content = no_new_articles_content(user.username)
             # You might want to skip saving a newsletter if no content
         else:
-            articles_summaries = [f"Title: {a['title']}\nSummary: {a['summary']}\nURL: {a['url']}" for a in relevant_articles_data]
-            user_interest_names = [ui.interest.name for ui in user.user_interests.all()] # Get actual names
-
             newsletter_chain = get_newsletter_generation_chain(user.id)
             if newsletter_chain:
-                ai_generated_content = newsletter_chain.invoke({
-                    "user_interests": user_interest_names,
-                    "articles_summaries": "\n\n---\n\n".join(articles_summaries)
-                })
+                packing = inputs["packing"]
+                print(f"Newsletter prompt for {user.username}: ~{packing['prompt_tokens']} tokens, "
+                      f"{len(packing['article_ids'])} articles ({packing['trimmed']} trimmed, {packing['dropped']} dropped).")
+                ai_generated_content = newsletter_chain.invoke(inputs["chain_input"])
             else:
                 ai_generated_content = "Failed to initialize newsletter generation chain."
 
 
         if ai_generated_content:
-            with transaction.atomic():
-                newsletter = Newsletter.objects.create(
-                    user=user,
-                    content=ai_generated_content
-                )
-                # Link the articles that were actually used
-                for article_data in relevant_articles_data:
-                    try:
-                        article_obj = Article.objects.get(url=article_data['url'])
-                        newsletter.articles_included.add(article_obj)
-                    except Article.DoesNotExist:
-                        pass # Should not happen if fetched from DB
-
-                print(f"Successfully generated and saved newsletter for {user.username}.")
+            # Link the articles that were actually used
+            save_newsletter(user, ai_generated_content, inputs["fingerprint"], inputs["article_ids"])
+            print(f"Successfully generated and saved newsletter for {user.username}.")
         else:
             print(f"No content generated for newsletter for {user.username}.")
 
@@ -162,18 +209,202 @@ def generate_user_newsletter_task(user_id):
         print(f"Error generating newsletter for user {user_id}: {e}")
         # Log the full traceback for debugging
 
+@shared_task(bind=True, max_retries=2)
+def generate_interest_section_task(self, interest_id, run_id):
+    """
+    Celery task to build one interest's shared newsletter section for a generation run.
+    A failed LLM call is retried. After the last retry the section is marked failed for
+    the run and the task returns None, so the chord still dispatches; subscribers'
+    newsletters then leave the interest out instead of generating it again.
+    """
+    try:
+        interest = Interest.objects.get(id=interest_id)
+    except Interest.DoesNotExist:
+        print(f"Interest with ID {interest_id} not found for section generation.")
+        return None
+    try:
+        section = build_interest_section(interest, run_id)
+    except SectionGenerationError as e:
+        if self.request.retries >= self.max_retries:
+            print(f"{e} Giving up for this run.")
+            mark_section_failed(interest, run_id)
+            return None
+        raise self.retry(exc=e, countdown=backoff_delay(self.request.retries, base=30, cap=300))
+    print(f"Built '{interest.name}' section for run {run_id}.")
+    return section.id
+
+
+@shared_task
+def generate_user_newsletter_from_sections_task(user_id, run_id):
+    """
+    Celery task to assemble a user's newsletter from the run's shared interest sections
+    plus a short personalized intro/outro, instead of one large per-user LLM call.
+    """
+    try:
+        user = User.objects.get(id=user_id)
+        interests = [ui.interest for ui in user.user_interests.select_related('interest').order_by('interest__name')]
+        if not interests:
+            print(f"User {user.username} has no interests. Skipping newsletter generation.")
+            return
+
+        sections = get_sections_for_interests(interests, run_id)
+        failed = [interest.name for interest, section in zip(interests, sections) if section is None]
+        if len(failed) == len(interests):
+            print(f"Every section for {user.username} failed in run {run_id}. Skipping newsletter.")
+            return
+        if failed:
+            print(f"Leaving failed sections out of {user.username}'s newsletter: {', '.join(failed)}.")
+            interests, sections = zip(*[(i, s) for i, s in zip(interests, sections) if s is not None])
+        summaries = {article.id: article.display_summary for section in sections for article in section.articles.all()}
+        article_ids = set(summaries)
+        fingerprint = newsletter_fingerprint([interest.id for interest in interests], summaries)
+        if is_unchanged_newsletter(user, fingerprint):
+            print(f"Articles for {user.username} have not changed since the last newsletter. Skipping.")
+            return
+
+        if not article_ids:
+            content = no_new_articles_content(user.username)
+        else:
+            intro, outro = generate_newsletter_intro_gemini(user.username, [interest.name for interest in interests])
+            content = assemble_newsletter(intro, interests, sections, outro)
+
+        save_newsletter(user, content, fingerprint, article_ids)
+        print(f"Successfully assembled newsletter for {user.username} from {len(sections)} shared sections.")
+
+    except User.DoesNotExist:
+        print(f"User with ID {user_id} not found for newsletter generation.")
+    except Exception as e:
+        print(f"Error assembling newsletter for user {user_id}: {e}")
+
+
+def _eligible_user_ids():
+    """Ids of active users who follow at least one interest, found in one query."""
+    return (
+        User.objects.filter(is_active=True)
+        .annotate(has_interests=Exists(UserInterest.objects.filter(user=OuterRef('pk'))))
+        .filter(has_interests=True)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+# A chunk's hard limit ends this long before the broker would redeliver it
+CHUNK_VISIBILITY_MARGIN_SECONDS = 60
+
+
+def _chunk_options(task, chunk_size):
+    """
+    Queue, priority and time limits for a chunk of `chunk_size` calls to `task`. Chunks
+    travel as celery.starmap messages, which CELERY_TASK_ROUTES and _ANNOTATIONS don't match.
+    acks_late and reject_on_worker_lost aren't message options; celery.starmap gets them
+    from its own entry in CELERY_TASK_ANNOTATIONS.
+    Limits scale with the chunk but stay under the broker's visibility_timeout, or a chunk
+    still running would be redelivered to a second worker; the soft limit keeps its share
+    of the hard one.
+    """
+    options = dict(settings.CELERY_TASK_ROUTES.get(task.name, {}))
+    annotations = settings.CELERY_TASK_ANNOTATIONS.get(task.name, {})
+    longest = annotations.get('time_limit') or annotations.get('soft_time_limit')
+    if not longest:
+        return options
+    ceiling = settings.CELERY_BROKER_TRANSPORT_OPTIONS['visibility_timeout'] - CHUNK_VISIBILITY_MARGIN_SECONDS
+    scale = min(chunk_size, ceiling / longest)
+    for limit in ('soft_time_limit', 'time_limit'):
+        if limit in annotations:
+            options[limit] = int(annotations[limit] * scale)
+    return options
+
+
+def _send_batch(task, batch, chunk_size):
+    if chunk_size > 1:
+        task.chunks(batch, chunk_size).apply_async(**_chunk_options(task, chunk_size))
+    else:
+        group(task.s(*args) for args in batch).apply_async()
+
+
+def _fan_out_to_users(task, *extra_args):
+    """
+    Streams eligible user ids and queues `task(user_id, *extra_args)` for each of them.
+    Ids are read NEWSLETTER_FANOUT_BATCH_SIZE at a time and each batch is sent as one
+    Celery group, split into `chunks` of NEWSLETTER_FANOUT_CHUNK_SIZE users per message.
+    Returns (users queued, dispatch seconds).
+    """
+    batch_size = settings.NEWSLETTER_FANOUT_BATCH_SIZE
+    chunk_size = settings.NEWSLETTER_FANOUT_CHUNK_SIZE
+    started = time.monotonic()
+    queued = 0
+
+    batch = []
+    for user_id in _eligible_user_ids().iterator(chunk_size=batch_size):
+        batch.append((user_id, *extra_args))
+        if len(batch) >= batch_size:
+            _send_batch(task, batch, chunk_size)
+            queued += len(batch)
+            batch = []
+    if batch:
+        _send_batch(task, batch, chunk_size)
+        queued += len(batch)
+
+    return queued, time.monotonic() - started
+
+
+@shared_task
+def dispatch_section_newsletters_task(run_id):
+    """
+    Celery task run once all of a run's sections are built; queues per-user assembly.
+    """
+    queued, elapsed = _fan_out_to_users(generate_user_newsletter_from_sections_task, run_id)
+    pruned = prune_old_sections()
+    print(f"Queued {queued} section-based newsletters for run {run_id} in {elapsed:.2f}s "
+          f"(pruned {pruned} old sections).")
+    return {"queued": queued, "dispatch_seconds": round(elapsed, 3)}
+
+
+@shared_task
+def build_ranking_index_task():
+    """
+    Celery task to rebuild the newsletter candidate ranking index from recent articles.
+    Queued after ingest and run by Celery Beat; skips the build when nothing changed.
+    On failure candidate selection falls back to the newest-first SQL query.
+    """
+    from .ranking import build_ranking_index # NumPy is only needed here
+
+    try:
+        started = time.monotonic()
+        manifest = build_ranking_index()
+        if manifest is None:
+            print("Ranking index is up to date. Skipping rebuild.")
+            return None
+        print(f"Built ranking index {manifest['build']} over {manifest['articles']} articles "
+              f"in {time.monotonic() - started:.2f}s.")
+        return manifest
+    except Exception as e:
+        print(f"Error building ranking index: {e}")
+        return None
+
+
 @shared_task
 def generate_all_newsletters_task():
     """
     Celery task to trigger newsletter generation for all active users.
     This will be scheduled by Celery Beat.
+    With NEWSLETTER_GENERATION_MODE = 'shared_sections', each interest's section is
+    generated once for the run and every user's newsletter is assembled from them.
     """
     print("Starting generate_all_newsletters_task...")
-    users = User.objects.filter(is_active=True) # Or filter users with interests
-    for user in users:
-        # You can add logic here to only generate if user has interests
-        if user.user_interests.exists():
-            generate_user_newsletter_task.delay(user.id) # Queue each user's newsletter generation
-        else:
-            print(f"User {user.username} has no interests. Skipping newsletter generation.")
-    print("Queued newsletter generation for active users.")
\ No newline at end of file
+    if settings.NEWSLETTER_GENERATION_MODE == 'shared_sections':
+        run_id = uuid.uuid4().hex
+        interest_ids = list(interests_with_subscribers().values_list('id', flat=True))
+        if not interest_ids:
+            print("No user has any interests. Skipping newsletter generation.")
+            return
+        chord(
+            (generate_interest_section_task.s(interest_id, run_id) for interest_id in interest_ids),
+            dispatch_section_newsletters_task.si(run_id),
+        ).apply_async()
+        print(f"Queued {len(interest_ids)} shared sections for run {run_id}.")
+        return {"sections_queued": len(interest_ids), "run_id": run_id}
+
+    queued, elapsed = _fan_out_to_users(generate_user_newsletter_task)
+    print(f"Queued newsletter generation for {queued} active users in {elapsed:.2f}s.")
+    return {"queued": queued, "dispatch_seconds": round(elapsed, 3)}
@@ -1,3 +1,1032 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import re
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.db.models.functions import Substr
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.throttling import ScopedRateThrottle
+
+from curation import agents, ai_utils, dedup, fake_llm, langchain_callbacks, llm_metrics, ranking, rate_limit, sections, services, tasks, views
+from curation.fake_llm import FakeGeminiModel, FakeStreamingChatModel
+from curation.langchain_cache import DjangoLLMCache
+from curation.management.commands import benchmark_pipeline
+from curation.prompt_packing import estimate_tokens, pack_articles
+from curation.summaries import claim_summary_batch, finish_summaries, start_summary_batch
+from curation.models import SUMMARY_READY, Article, CacheVersion, Interest, InterestSection, LLMCall, Newsletter, UserInterest
+from newsletter_agent.celery import app
+
+
+def make_article(number, **fields):
+    fields.setdefault('published_date', timezone.now() - timedelta(minutes=number))
+    return Article.objects.create(
+        title=f"Article {number}",
+        url=f"https://example.com/{number}",
+        source="Example",
+        **fields,
+    )
+
+
+@override_settings(LLM_RATE_LIMIT_ENABLED=False, LLM_CACHE_ENABLED=False, LLM_METRICS_ENABLED=False)
+class FakeGeminiTestCase(TestCase):
+    """Runs ai_utils against FakeGeminiModel, without the rate governor, cache or metrics."""
+
+    def setUp(self):
+        patcher = mock.patch.object(ai_utils, 'get_gemini_model', lambda *args: FakeGeminiModel(latency=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class SummarizeBatchTests(FakeGeminiTestCase):
+    def test_described_articles_still_get_an_ai_summary(self):
+        article = make_article(1, summary="NewsAPI description", full_text="Body text")
+
+        self.assertEqual(tasks.summarize_articles_batch_task(*claim_summary_batch(1)), 1)
+
+        article.refresh_from_db()
+        self.assertEqual(article.summary, "NewsAPI description")
+        self.assertTrue(article.ai_summary)
+        self.assertEqual(article.summary_state, Article.SummaryState.DONE)
+
+    def test_near_duplicates_are_not_summarized(self):
+        original = make_article(1, full_text="Body text")
+        copy = make_article(2, full_text="Body text", canonical=original)
+
+        self.assertEqual(claim_summary_batch(5)[0], [original.id])
+        copy.refresh_from_db()
+        self.assertIsNone(copy.ai_summary)
+
+
+class ResourceExhausted(Exception):
+    """Named like google.api_core's 429 error, which rate_limit.is_rate_limit_error recognizes."""
+
+
+class ThrottledGeminiModel(FakeGeminiModel):
+    def generate_content(self, prompt, generation_config=None):
+        raise ResourceExhausted("429 Quota exceeded")
+
+
+class PartialReplyGeminiModel(FakeGeminiModel):
+    """Answers a batch prompt for article 0 only, with a bracket in the trailing chatter."""
+
+    def generate_content(self, prompt, generation_config=None):
+        return fake_llm._fake_gemini_response('[{"id": 0, "summary": "First."}]\nSee [1] for details.')
+
+
+class BatchFallbackTests(FakeGeminiTestCase):
+    def summarize_batch(self, model, count=2):
+        for number in range(1, count + 1):
+            make_article(number, full_text=f"Body {number}")
+        with mock.patch.object(ai_utils, 'get_gemini_model', lambda *args: model), \
+                mock.patch.object(tasks, 'summarize_texts_individually', return_value=["Second."]) as individually:
+            done = tasks.summarize_articles_batch_task(*claim_summary_batch(count))
+        return done, individually
+
+    def test_throttled_batch_goes_back_to_the_backlog_without_single_calls(self):
+        done, individually = self.summarize_batch(ThrottledGeminiModel(latency=0))
+
+        self.assertEqual(done, 0)
+        individually.assert_not_called()
+        self.assertEqual(set(Article.objects.values_list('summary_state', flat=True)), {Article.SummaryState.PENDING})
+
+    def test_only_unparsed_items_fall_back_to_single_calls(self):
+        done, individually = self.summarize_batch(PartialReplyGeminiModel(latency=0))
+
+        self.assertEqual(done, 2)
+        individually.assert_called_once_with(["Body 2"], max_tokens=200)
+
+    def test_batch_reply_parsing_tolerates_surrounding_text(self):
+        reply = 'Here you go:\n```json\n[{"id": 1, "summary": "B [+200 chars]"}, {"id": 0, "summary": "A"}]\n```\nNote [2].'
+
+        self.assertEqual(ai_utils._parse_batch_summaries(reply, 3), ["A", "B [+200 chars]", None])
+        self.assertEqual(ai_utils._parse_batch_summaries("No JSON here [", 1), [None])
+
+
+def finish_claimed(summaries):
+    """Claims and starts the given articles, then finishes them with `summaries`."""
+    article_ids, token = claim_summary_batch(len(summaries), article_ids=list(summaries))
+    return finish_summaries(summaries, start_summary_batch(article_ids, token))
+
+
+@override_settings(SUMMARY_MAX_ATTEMPTS=2, SUMMARY_CLAIM_TIMEOUT_SECONDS=60)
+class SummaryClaimTests(FakeGeminiTestCase):
+    def states(self):
+        return dict(Article.objects.values_list('id', 'summary_state'))
+
+    def test_claims_take_the_newest_pending_articles_once(self):
+        newest, older = make_article(1), make_article(2)
+        make_article(3, summary_state=Article.SummaryState.DONE, ai_summary="Done")
+        make_article(4, canonical=newest)
+
+        self.assertEqual(claim_summary_batch(1)[0], [newest.id])
+        self.assertEqual(claim_summary_batch(5)[0], [older.id])
+        self.assertEqual(claim_summary_batch(5)[0], [])
+        self.assertEqual(Article.objects.filter(summary_state=Article.SummaryState.IN_PROGRESS).count(), 2)
+
+    def test_attempts_count_when_a_batch_starts(self):
+        article = make_article(1)
+
+        article_ids, token = claim_summary_batch(1)
+        self.assertEqual(Article.objects.get(id=article.id).summary_attempts, 0)
+        start_summary_batch(article_ids, token)
+        self.assertEqual(Article.objects.get(id=article.id).summary_attempts, 1)
+
+    def test_failures_return_to_pending_until_the_last_attempt(self):
+        article = make_article(1)
+
+        self.assertEqual(finish_claimed({article.id: None}), (0, 0))
+        self.assertEqual(self.states()[article.id], Article.SummaryState.PENDING)
+
+        self.assertEqual(finish_claimed({article.id: None}), (0, 1))
+        self.assertEqual(self.states()[article.id], Article.SummaryState.FAILED)
+        self.assertEqual(claim_summary_batch(1)[0], [])
+
+    def test_finishing_ignores_articles_no_longer_claimed(self):
+        article = make_article(1)
+        article_ids, token = claim_summary_batch(1)
+        token = start_summary_batch(article_ids, token)
+        Article.objects.filter(id=article.id).update(summary_state=Article.SummaryState.PENDING)
+
+        self.assertEqual(finish_summaries({article.id: "Late summary"}, token), (0, 0))
+        article.refresh_from_db()
+        self.assertIsNone(article.ai_summary)
+
+    def test_batch_reclaimed_while_queued_is_summarized_once(self):
+        article = make_article(1, full_text="Body text")
+        stale_ids, stale_token = claim_summary_batch(1)
+        # The batch sits in the queue past the claim timeout and the drain claims it again
+        Article.objects.filter(id=article.id).update(summary_claimed_at=timezone.now() - timedelta(minutes=5))
+        fresh_ids, fresh_token = claim_summary_batch(1)
+        self.assertEqual(fresh_ids, stale_ids)
+
+        with mock.patch.object(tasks, 'summarize_texts_gemini', wraps=ai_utils.summarize_texts_gemini) as summarize:
+            self.assertEqual(tasks.summarize_articles_batch_task(stale_ids, stale_token), 0)
+            self.assertEqual(tasks.summarize_articles_batch_task(fresh_ids, fresh_token), 1)
+            self.assertEqual(tasks.summarize_articles_batch_task(fresh_ids, fresh_token), 0) # Redelivered copy
+
+        self.assertEqual(summarize.call_count, 1)
+        article.refresh_from_db()
+        self.assertEqual((article.summary_state, article.summary_attempts), (Article.SummaryState.DONE, 1))
+
+    def test_stale_claims_are_reclaimed_until_the_attempts_run_out(self):
+        expired = timezone.now() - timedelta(minutes=5)
+        retried = make_article(1, summary_state=Article.SummaryState.IN_PROGRESS, summary_claimed_at=expired, summary_attempts=1)
+        exhausted = make_article(2, summary_state=Article.SummaryState.IN_PROGRESS, summary_claimed_at=expired, summary_attempts=2)
+        fresh = make_article(3, summary_state=Article.SummaryState.IN_PROGRESS, summary_claimed_at=timezone.now(), summary_attempts=2)
+
+        self.assertEqual(claim_summary_batch(5)[0], [retried.id])
+        states = self.states()
+        self.assertEqual(states[exhausted.id], Article.SummaryState.FAILED)
+        self.assertEqual(states[fresh.id], Article.SummaryState.IN_PROGRESS)
+
+    def test_on_demand_summaries_retry_then_give_up(self):
+        article = make_article(1, full_text="Body text")
+
+        with mock.patch.object(tasks, 'summarize_texts_gemini', side_effect=RuntimeError("quota")):
+            tasks.summarize_article_task.apply(args=(article.id,)).get() # Eager retries run inline
+
+        article.refresh_from_db()
+        self.assertEqual((article.summary_state, article.summary_attempts), (Article.SummaryState.FAILED, 2))
+
+
+class InterestSectionTests(FakeGeminiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.interest = Interest.objects.create(name="Quantum")
+        make_article(1, summary="Qubits", ai_summary="Qubits, summarized", summary_state=Article.SummaryState.DONE).topics.add(self.interest)
+
+    def test_section_is_stored_and_shared(self):
+        section = sections.build_interest_section(self.interest, "run-1")
+
+        self.assertTrue(section.content)
+        self.assertEqual(sections.build_interest_section(self.interest, "run-1"), section)
+
+    def test_failed_call_stores_no_section_text(self):
+        with mock.patch.object(sections, 'generate_newsletter_section_gemini', return_value=None):
+            with self.assertRaises(sections.SectionGenerationError):
+                sections.build_interest_section(self.interest, "run-1")
+
+        self.assertFalse(InterestSection.objects.exists())
+        self.assertTrue(sections.build_interest_section(self.interest, "run-1").content)
+
+    def test_section_that_gave_up_is_not_regenerated_by_subscribers(self):
+        other = Interest.objects.create(name="Robots")
+        make_article(2, ai_summary="Robots, summarized", summary_state=Article.SummaryState.DONE).topics.add(other)
+        users = [User.objects.create(username=f"reader-{i}") for i in range(3)]
+        for user in users:
+            UserInterest.objects.create(user=user, interest=self.interest)
+            UserInterest.objects.create(user=user, interest=other)
+        sections.build_interest_section(other, "run-1")
+
+        with mock.patch.object(sections, 'generate_newsletter_section_gemini', return_value=None) as generate:
+            self.assertIsNone(tasks.generate_interest_section_task.apply(args=(self.interest.id, "run-1")).get())
+            calls_by_task = generate.call_count
+            for user in users:
+                tasks.generate_user_newsletter_from_sections_task(user.id, "run-1")
+
+        self.assertEqual(generate.call_count, calls_by_task) # Assembly made no further attempts
+        self.assertTrue(InterestSection.objects.get(run_id="run-1", interest=self.interest).failed)
+        newsletters = Newsletter.objects.filter(user__in=users)
+        self.assertEqual(newsletters.count(), 3)
+        self.assertTrue(all("## Robots" in n.content and "## Quantum" not in n.content for n in newsletters))
+
+    def test_user_whose_sections_all_failed_gets_no_newsletter(self):
+        user = User.objects.create(username="reader")
+        UserInterest.objects.create(user=user, interest=self.interest)
+        sections.mark_section_failed(self.interest, "run-1")
+
+        tasks.generate_user_newsletter_from_sections_task(user.id, "run-1")
+
+        self.assertFalse(Newsletter.objects.exists())
+
+
+class ArticleListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for number in range(3):
+            make_article(number, summary=f"Description {number}")
+
+    def test_cursor_pages_newest_first(self):
+        first = self.client.get(reverse('article-list'), {'page_size': 2}).json()
+        second = self.client.get(first['next']).json()
+
+        self.assertEqual([a['title'] for a in first['results']], ["Article 0", "Article 1"])
+        self.assertEqual([a['title'] for a in second['results']], ["Article 2"])
+        self.assertIsNone(second['next'])
+
+    def test_repeat_poll_gets_304_until_articles_change(self):
+        response = self.client.get(reverse('article-list'))
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            repeat = self.client.get(reverse('article-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['ETag'], etag)
+
+        make_article(3)
+        changed = self.client.get(reverse('article-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+        # Deleting an older article leaves both maximums where they were
+        Article.objects.order_by('id').first().delete()
+        deleted = self.client.get(reverse('article-list'), HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(deleted.status_code, 200)
+        self.assertNotEqual(deleted['ETag'], changed['ETag'])
+        self.assertEqual(len(deleted.json()['results']), 3)
+
+    def test_each_page_has_its_own_etag(self):
+        first = self.client.get(reverse('article-list'), {'page_size': 2})
+        second = self.client.get(first.json()['next'])
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+
+class UserInterestReplaceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("reader")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.a, self.b, self.c = (Interest.objects.create(name=name) for name in ("A", "B", "C"))
+        UserInterest.objects.create(user=self.user, interest=self.a)
+        UserInterest.objects.create(user=self.user, interest=self.b)
+
+    def _interest_ids(self):
+        return set(UserInterest.objects.filter(user=self.user).values_list('interest_id', flat=True))
+
+    def test_put_adds_and_removes_only_the_difference(self):
+        kept = UserInterest.objects.get(user=self.user, interest=self.b)
+
+        response = self.client.put(reverse('user-interest'), {'interest_ids': [self.b.id, self.c.id]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], "Successfully added 1 interests and removed 1 interests.")
+        self.assertEqual(self._interest_ids(), {self.b.id, self.c.id})
+        self.assertTrue(UserInterest.objects.filter(pk=kept.pk).exists()) # Unchanged rows are not rewritten
+
+    def test_put_is_idempotent(self):
+        body = {'interest_ids': [self.a.id, self.b.id]}
+
+        response = self.client.put(reverse('user-interest'), body, format='json')
+
+        self.assertEqual(response.json()['message'], "Successfully added 0 interests and removed 0 interests.")
+        self.assertEqual(self._interest_ids(), {self.a.id, self.b.id})
+
+    def test_put_with_unknown_interest_changes_nothing(self):
+        response = self.client.put(reverse('user-interest'), {'interest_ids': [self.c.id, 999]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._interest_ids(), {self.a.id, self.b.id})
+
+    def test_put_empty_list_clears_interests(self):
+        self.client.put(reverse('user-interest'), {'interest_ids': []}, format='json')
+
+        self.assertEqual(self._interest_ids(), set())
+
+
+class InterestCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.interest = Interest.objects.create(name="Quantum")
+
+    def test_revalidation_is_one_version_lookup(self):
+        etag = self.client.get(reverse('interest-list'))['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('interest-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_bump_from_another_process_invalidates_this_one(self):
+        etag = self.client.get(reverse('interest-list'))['ETag'] # Caches the payload in this process
+
+        # Another worker saves an interest: the row and the version change, this process's cache does not
+        Interest.objects.bulk_create([Interest(name="Robotics")])
+        CacheVersion.objects.update(version=F('version') + 1)
+        response = self.client.get(reverse('interest-list'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({i['name'] for i in response.json()}, {"Quantum", "Robotics"})
+
+
+WATCHED_TABLES = ('curation_article', 'curation_article_topics', 'curation_newsletter')
+
+
+def full_scans(plan):
+    """Returns the watched tables an EXPLAIN plan reads with a full table scan."""
+    if connection.vendor == 'postgresql':
+        pattern = r'Seq Scan on (\w+)'
+    else:
+        # "SCAN t USING [COVERING] INDEX i" is an index walk; a bare "SCAN t" is not
+        pattern = r'SCAN (\w+)(?! USING)(?:\s|$)'
+    return [table for table in re.findall(pattern, plan, flags=re.MULTILINE) if table in WATCHED_TABLES]
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAINs the article/newsletter hot-path queries over seeded data; none may scan a whole table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(42)
+        now = timezone.now()
+        Interest.objects.bulk_create([Interest(name=f"Interest {i}") for i in range(30)])
+        interests = list(Interest.objects.all())
+        Article.objects.bulk_create(
+            [
+                Article(
+                    title=f"Article {i}",
+                    url=f"https://query-plan.invalid/{i}",
+                    source="seed",
+                    published_date=now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+                    summary=f"Summary {i}" if rng.random() < 0.8 else None,
+                    summary_state=rng.choice(list(Article.SummaryState)),
+                )
+                for i in range(3000)
+            ],
+            batch_size=1000,
+        )
+        Through = Article.topics.through
+        Through.objects.bulk_create(
+            [
+                Through(article_id=article_id, interest_id=interest.id)
+                for article_id in Article.objects.values_list('id', flat=True)
+                for interest in rng.sample(interests, k=2)
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        User.objects.bulk_create([User(username=f"reader-{i}") for i in range(30)])
+        users = list(User.objects.all())
+        UserInterest.objects.bulk_create(
+            [UserInterest(user=user, interest=interest) for user in users for interest in rng.sample(interests, k=3)],
+        )
+        Newsletter.objects.bulk_create([Newsletter(user=user, content="seed") for user in users for _ in range(20)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user, cls.interest = users[0], interests[0]
+
+    def hot_queries(self):
+        interest_ids = list(UserInterest.objects.filter(user=self.user).values_list('interest_id', flat=True))
+        cutoff_date = timezone.now() - timedelta(days=7)
+        return {
+            # agent_tools.get_recent_summarized_articles_for_user_interests
+            'user candidate articles': Article.objects.filter(
+                SUMMARY_READY,
+                topics__id__in=interest_ids,
+                published_date__gte=cutoff_date,
+                canonical__isnull=True,
+            ).distinct().order_by('-published_date')[:10],
+            # sections.get_recent_articles_for_interest
+            'interest section articles': Article.objects.filter(
+                SUMMARY_READY,
+                topics=self.interest,
+                published_date__gte=cutoff_date,
+                canonical__isnull=True,
+            ).only('id', 'title', 'summary', 'ai_summary', 'url').order_by('-published_date')[:5],
+            # sections.is_unchanged_newsletter
+            'latest newsletter fingerprint': Newsletter.objects.filter(user=self.user)
+                .order_by('-generation_date').values_list('fingerprint', flat=True)[:1],
+            # ArticleListView first page
+            'article list page': Article.objects.defer('full_text').order_by('-published_date', '-id')[:50],
+            # UserNewsletterListView page
+            'newsletter list page': Newsletter.objects.filter(user=self.user).defer('content')
+                .annotate(preview=Substr('content', 1, 280), article_count=Count('articles_included'))
+                .order_by('-generation_date')[:20],
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(full_scans(plan), [], plan)
+
+    def test_candidate_queries_start_from_the_topics_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Index names in the plan are checked on SQLite")
+        queries = self.hot_queries()
+        for name in ('user candidate articles', 'interest section articles'):
+            with self.subTest(name):
+                self.assertIn('article_topics_interest_idx', queries[name].explain())
+
+
+class SummaryReadyTests(FakeGeminiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="reader")
+        interest = Interest.objects.create(name="Quantum")
+        UserInterest.objects.create(user=self.user, interest=interest)
+        self.described = make_article(1, summary="Qubits", summary_state=Article.SummaryState.FAILED)
+        self.pending = make_article(2, summary="More qubits")
+        self.undescribed = make_article(3, summary=None, summary_state=Article.SummaryState.FAILED)
+        for article in (self.described, self.pending, self.undescribed):
+            article.topics.add(interest)
+
+    def test_only_articles_with_a_settled_summary_are_candidates(self):
+        self.assertEqual(list(Article.objects.filter(SUMMARY_READY)), [self.described])
+
+    def test_an_ai_summary_replacing_the_description_changes_the_fingerprint(self):
+        before = agents.prepare_newsletter_inputs(self.user)
+        Article.objects.filter(id=self.described.id).update(
+            ai_summary="Qubits, summarized", summary_state=Article.SummaryState.DONE
+        )
+        after = agents.prepare_newsletter_inputs(self.user)
+
+        self.assertEqual(before['article_ids'], after['article_ids'])
+        self.assertNotEqual(before['fingerprint'], after['fingerprint'])
+        self.assertEqual(after['fingerprint'], agents.prepare_newsletter_inputs(self.user)['fingerprint'])
+
+
+class SummaryStateMigrationTests(TestCase):
+    def setUp(self):
+        self.recent = make_article(1, summary="Fresh description")
+        self.old = make_article(2, summary="Old description", published_date=timezone.now() - timedelta(days=30))
+        self.duplicate = make_article(3, summary="Fresh description", canonical=self.recent)
+        self.undescribed = make_article(4, summary=None, published_date=timezone.now() - timedelta(days=30))
+
+    def _migrate(self, module, function):
+        getattr(importlib.import_module(f'curation.migrations.{module}'), function)(django_apps, None)
+
+    def _states(self):
+        return {
+            article: Article.objects.get(id=article.id).summary_state
+            for article in (self.recent, self.old, self.duplicate, self.undescribed)
+        }
+
+    def test_recent_canonical_articles_are_left_for_the_drain(self):
+        self._migrate('0011_article_summary_state', 'skip_existing_articles')
+
+        self.assertEqual(self._states(), {
+            self.recent: Article.SummaryState.PENDING,
+            self.old: Article.SummaryState.SKIPPED,
+            self.duplicate: Article.SummaryState.SKIPPED,
+            self.undescribed: Article.SummaryState.PENDING,
+        })
+
+    def test_databases_migrated_before_the_window_get_recent_articles_back(self):
+        Article.objects.filter(id__in=[self.recent.id, self.old.id, self.duplicate.id]).update(
+            summary_state=Article.SummaryState.SKIPPED
+        )
+
+        self._migrate('0016_article_summary_state_recent', 'pend_recent_articles')
+
+        self.assertEqual(self._states()[self.recent], Article.SummaryState.PENDING)
+        self.assertEqual(self._states()[self.old], Article.SummaryState.SKIPPED)
+        self.assertEqual(self._states()[self.duplicate], Article.SummaryState.SKIPPED)
+
+
+class SearchFallbackTests(TestCase):
+    def test_databases_without_a_full_text_index_fall_back_to_icontains(self):
+        make_article(1, summary="Quantum computers ship", full_text="Body")
+        make_article(2, summary="Robots everywhere", ai_summary="Quantum robots", full_text="Body")
+        make_article(3, summary="Weather", full_text="Quantum in the body only")
+
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            response = APIClient().get(reverse('article-search'), {'q': 'quantum'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual([a['title'] for a in response.json()['results']], ["Article 1", "Article 2"])
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), "Needs the native full-text index")
+class SearchIndexTests(TestCase):
+    # The test database is built by running every migration, so this covers the index they leave behind
+
+    def search(self, query):
+        return [a['title'] for a in APIClient().get(reverse('article-search'), {'q': query}).json()['results']]
+
+    def test_new_articles_are_searchable(self):
+        make_article(1, summary="Quantum computers ship", full_text="Body")
+        make_article(2, summary="Weather", full_text="Body")
+
+        self.assertEqual(self.search('quantum'), ["Article 1"])
+
+    def test_ai_summaries_are_searchable(self):
+        article = make_article(1, summary=None, full_text="Body")
+        finish_claimed({article.id: "Quantum robots arrive"})
+
+        self.assertEqual(self.search('quantum'), ["Article 1"])
+
+    def test_edited_and_deleted_articles_leave_the_index(self):
+        edited, deleted = make_article(1, summary="Quantum computers ship"), make_article(2, summary="Quantum again")
+        Article.objects.filter(id=edited.id).update(summary="Weather")
+        deleted.delete()
+
+        self.assertEqual(self.search('quantum'), [])
+        self.assertEqual(self.search('weather'), ["Article 1"])
+
+
+STORIES = [
+    (
+        "Fed holds interest rates steady, signals two cuts later this year",
+        "The Federal Reserve left its benchmark rate unchanged on Wednesday and penciled in two "
+        "quarter-point cuts before the end of the year, citing cooling inflation.",
+        "WASHINGTON (Reuters) - The Federal Reserve held interest rates steady on Wednesday but signaled "
+        "it still expects to cut borrowing costs twice this year as inflation continues to ease toward "
+        "the central bank's 2% target, while",
+    ),
+    (
+        "Fed's Powell says rate cuts depend on inflation data",
+        "Federal Reserve Chair Jerome Powell said Tuesday the central bank needs more confidence that "
+        "inflation is falling before it cuts interest rates.",
+        "Federal Reserve Chair Jerome Powell told lawmakers on Tuesday that the central bank is not yet "
+        "ready to lower interest rates, saying officials need to see more evidence that inflation is moving",
+    ),
+]
+PUBLISHERS = ["Reuters", "Yahoo Finance", "MarketWatch", "CNBC", "Business Insider"]
+
+
+def newsapi_article(story, publisher, copy_number):
+    """A NewsAPI payload as a syndicating publisher returns it: own title tag, own truncation count."""
+    title, description, content = story
+    return {
+        "source": {"id": None, "name": publisher},
+        "title": f"{title} - {publisher}",
+        "description": description,
+        "url": f"https://{publisher.lower().replace(' ', '-')}.example/{'-'.join(title.lower().split()[:4])}",
+        "publishedAt": timezone.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "content": f"{content}\u2026 [+{1000 + 731 * copy_number} chars]",
+    }
+
+
+class NearDuplicateTests(TestCase):
+    def test_publisher_tags_and_truncation_markers_do_not_change_the_fingerprint(self):
+        copies = [services._build_article(newsapi_article(STORIES[0], publisher, n)) for n, publisher in enumerate(PUBLISHERS)]
+
+        self.assertEqual({dedup.article_fingerprint(article) for article in copies}, {dedup.article_fingerprint(copies[0])})
+
+    def test_distinct_stories_on_the_same_topic_stay_apart(self):
+        fed, powell = (dedup.article_fingerprint(services._build_article(newsapi_article(story, "Reuters", 0))) for story in STORIES)
+
+        self.assertGreater((fed ^ powell).bit_count(), 2 * dedup.SimHashIndex().max_distance)
+
+    def test_syndicated_copies_cluster_under_one_canonical_article(self):
+        for save in (services.bulk_save_articles_to_db, services.save_articles_to_db):
+            with self.subTest(save.__name__):
+                Article.objects.all().delete()
+                payloads = [newsapi_article(story, publisher, n) for story in STORIES for n, publisher in enumerate(PUBLISHERS)]
+
+                save(payloads, interests_map={})
+
+                originals = Article.objects.filter(canonical__isnull=True)
+                self.assertEqual(originals.count(), 2)
+                for original in originals:
+                    self.assertEqual(original.duplicates.count(), len(PUBLISHERS) - 1)
+                    self.assertEqual(original.summary_state, Article.SummaryState.PENDING)
+                self.assertFalse(Article.objects.filter(canonical__isnull=False).exclude(summary_state=Article.SummaryState.SKIPPED).exists())
+
+
+class RankingIndexBuildTests(TestCase):
+    def setUp(self):
+        overrides = override_settings(RANKING_ENABLED=True, RANKING_INDEX_DIR=tempfile.mkdtemp())
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.interest = Interest.objects.create(name="Quantum")
+        make_article(1, summary="Quantum computing news", summary_state=Article.SummaryState.SKIPPED).topics.add(self.interest)
+
+    def test_unchanged_articles_skip_the_rebuild(self):
+        first = ranking.build_ranking_index()
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(ranking.build_ranking_index())
+        self.assertNotEqual(ranking.build_ranking_index(force=True)["build"], first["build"])
+
+    def test_articles_are_indexed_once_their_summary_is_ready(self):
+        ranking.build_ranking_index()
+        article = make_article(2, summary="More quantum news")
+        self.assertIsNone(ranking.build_ranking_index()) # Still pending
+
+        finish_claimed({article.id: "An AI summary"})
+        self.assertIsNotNone(ranking.build_ranking_index())
+
+    def test_newsletter_runs_do_not_build_the_index(self):
+        with mock.patch.object(ranking, 'build_ranking_index') as build:
+            tasks.generate_all_newsletters_task()
+        build.assert_not_called()
+
+    def test_missing_index_falls_back_to_sql(self):
+        self.assertIsNone(ranking.rank_articles_for_users({1: [self.interest.id]}))
+
+
+def candidate(number, words):
+    return {'id': number, 'title': f"Title {number}", 'summary': " ".join(["word"] * words), 'url': f"https://example.com/{number}"}
+
+
+@override_settings(NEWSLETTER_PROMPT_ITEM_MAX_TOKENS=50, NEWSLETTER_PROMPT_ITEM_MIN_TOKENS=10)
+class PackArticlesTests(SimpleTestCase):
+    # A 30-word candidate is a 49-token entry; entries are joined by a 3-token separator
+
+    def test_each_interest_gets_its_share_before_leftovers(self):
+        articles = [candidate(number, 30) for number in range(1, 7)]
+        interests = {1: 'A', 2: 'A', 3: 'A', 4: 'A', 5: 'A', 6: 'B'}
+
+        packing = pack_articles(articles, interests, budget=200)
+
+        # B's only article makes it in although five of A's outrank it; output stays in rank order
+        self.assertEqual(packing['article_ids'], [1, 2, 3, 6])
+        self.assertLessEqual(packing['tokens'], 200)
+        self.assertEqual(packing['dropped'], 2)
+
+    def test_leftover_budget_trims_the_next_article_to_fit(self):
+        articles = [candidate(number, 30) for number in range(1, 7)]
+        interests = {1: 'A', 2: 'A', 3: 'A', 4: 'A', 5: 'A', 6: 'B'}
+
+        packing = pack_articles(articles, interests, budget=200)
+
+        self.assertEqual(packing['trimmed'], 1)
+        self.assertTrue(packing['entries'][2].startswith("Title: Title 3"))
+        self.assertIn("\u2026", packing['entries'][2])
+
+    def test_article_that_would_be_cut_too_short_is_dropped(self):
+        packing = pack_articles([candidate(1, 30), candidate(2, 30)], {1: 'A', 2: 'A'}, budget=60)
+
+        self.assertEqual(packing['article_ids'], [1])
+        self.assertEqual((packing['trimmed'], packing['dropped']), (0, 1))
+
+    def test_long_summaries_are_capped_per_item(self):
+        packing = pack_articles([candidate(1, 100)], {1: 'A'}, budget=1000)
+
+        self.assertEqual(packing['trimmed'], 1)
+        summary = packing['entries'][0].split("Summary: ", 1)[1].split("\n", 1)[0]
+        self.assertLessEqual(estimate_tokens(summary), 50)
+
+    def test_no_candidates(self):
+        packing = pack_articles([], {}, budget=100)
+
+        self.assertEqual((packing['text'], packing['article_ids'], packing['tokens']), ("", [], 0))
+
+
+class UnreachableRedis:
+    """Stands in for a Redis client whose server went away after startup."""
+
+    def register_script(self, script):
+        def run(keys, args):
+            import redis
+
+            raise redis.ConnectionError("Connection refused")
+        return run
+
+
+@override_settings(LLM_RATE_LIMIT_ENABLED=True, LLM_RATE_LIMIT_MAX_WAIT=5)
+class RateLimitRedisOutageTests(SimpleTestCase):
+    def test_bucket_falls_back_to_a_local_one(self):
+        bucket = rate_limit.RedisTokenBucket(UnreachableRedis(), rate=10, capacity=2)
+
+        self.assertEqual(bucket.take(), 0.0)
+        self.assertEqual(bucket.take(), 0.0)
+        self.assertGreater(bucket.take(), 0.0) # The local bucket still limits
+        self.assertEqual(bucket.adjust('decrease', 0.2, 1, 10), 5)
+
+    def test_governed_calls_succeed_while_redis_is_down(self):
+        governor = rate_limit.RateGovernor(rate_limit.RedisTokenBucket(UnreachableRedis(), rate=10, capacity=5))
+
+        with mock.patch.object(rate_limit, '_governor', governor):
+            self.assertEqual(rate_limit.governed_call(lambda: "ok"), "ok")
+
+
+class BenchmarkPipelineTests(TestCase):
+    def run_pipeline(self, *args):
+        command = benchmark_pipeline.Command(stdout=io.StringIO())
+        command.verbosity = 0
+        options = vars(command.create_parser('manage.py', 'benchmark_pipeline').parse_args(args))
+        with command.fakes(options):
+            command._seed(options)
+            return command._run(options)
+
+    def test_queries_per_stage_stay_flat(self):
+        results = self.run_pipeline(
+            '--articles', '60', '--users', '30', '--interests', '6', '--newsapi-latency', '0', '--newsapi-rate', '0',
+        )
+        ingest, summarize, newsletters = (
+            results['fetch_and_save_articles'], results['summarize'], results['generate_all_newsletters'],
+        )
+
+        self.assertEqual((ingest['items'], summarize['items'], newsletters['items']), (60, 60, 30))
+        # Bulk ingest costs a few queries per keyword, not per article
+        self.assertLessEqual(ingest['queries'], 25)
+        # Summaries are claimed, generated and stored per batch
+        self.assertLess(summarize['queries'], summarize['items'])
+        self.assertLessEqual(summarize['llm_calls'], 3)
+        self.assertLessEqual(newsletters['queries'], 15 * newsletters['items'])
+
+
+
+class SlowGovernor:
+    """Records what the LangChain rate limiter and callback ask of the governor."""
+
+    def __init__(self, wait=0.0):
+        self.wait = wait
+        self.tokens = 0
+        self.latencies = []
+
+    def acquire(self):
+        time.sleep(self.wait)
+        self.tokens += 1
+
+    async def acquire_async(self):
+        await asyncio.sleep(self.wait)
+        self.tokens += 1
+
+    def record(self, latency=None, throttled=False):
+        self.latencies.append(latency)
+
+
+@override_settings(LLM_CACHE_ENABLED=True, LLM_METRICS_ENABLED=False)
+class LangChainRateLimitTests(TestCase):
+    def setUp(self):
+        self.governor = SlowGovernor(wait=0.2)
+        for target in (langchain_callbacks, rate_limit):
+            patcher = mock.patch.object(target, 'get_governor', lambda: self.governor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.model = FakeStreamingChatModel(
+            latency=0, cache=DjangoLLMCache(),
+            rate_limiter=langchain_callbacks.GovernedRateLimiter(), callbacks=[langchain_callbacks.RateGovernorCallback()],
+        )
+
+    def test_cached_replies_take_no_token(self):
+        self.model.invoke("Write the newsletter")
+        self.model.invoke("Write the newsletter")
+
+        self.assertEqual(self.governor.tokens, 1)
+        self.assertEqual(len(self.governor.latencies), 1)
+
+    def test_latency_excludes_the_wait_for_a_token(self):
+        self.model.invoke("Write the newsletter")
+
+        self.assertLess(self.governor.latencies[0], 0.1)
+
+    def test_streams_report_time_to_first_token_once(self):
+        async def stream():
+            return [chunk async for chunk in self.model.astream("Write the newsletter")]
+
+        async_to_sync(stream)()
+
+        self.assertEqual(self.governor.tokens, 1)
+        self.assertEqual(len(self.governor.latencies), 1)
+        self.assertLess(self.governor.latencies[0], 0.1)
+
+
+class FailingChatModel(FakeStreamingChatModel):
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise RuntimeError("Gemini unavailable")
+
+
+@override_settings(LLM_METRICS_ENABLED=True, LLM_PRICE_PER_MILLION_PROMPT_TOKENS=1.0,
+                   LLM_PRICE_PER_MILLION_COMPLETION_TOKENS=2.0)
+class LLMMetricsTests(FakeGeminiTestCase):
+    def test_histogram_bucket_edges_are_inclusive(self):
+        histogram = llm_metrics._histogram([100, 101, 250, 60000, 60001, 90000])
+
+        self.assertEqual(
+            (histogram['le_100'], histogram['le_250'], histogram['le_60000'], histogram['le_inf']), (1, 2, 1, 2)
+        )
+        self.assertEqual(sum(histogram.values()), 6)
+        self.assertEqual(llm_metrics._histogram([]), {**{f"le_{b}": 0 for b in llm_metrics.LATENCY_BUCKETS_MS}, "le_inf": 0})
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(llm_metrics._percentile(values, 0.50), 51)
+        self.assertEqual(llm_metrics._percentile(values, 0.99), 100)
+        self.assertEqual(llm_metrics._percentile([7], 0.95), 7)
+        self.assertIsNone(llm_metrics._percentile([], 0.5))
+
+    def test_totals_and_cost(self):
+        llm_metrics.record_call('summary', 'gemini', "prompt", 0.2, prompt_tokens=600_000, completion_tokens=100_000)
+        llm_metrics.record_call('summary', 'gemini', "prompt", 0.4, prompt_tokens=400_000, completion_tokens=150_000,
+                                error=RuntimeError("boom"))
+        llm_metrics.record_cache_hits('summary', 'gemini', ["prompt"])
+
+        stats = llm_metrics.get_stats()
+        overall = stats['overall']
+
+        self.assertEqual((overall['calls'], overall['failures'], overall['cache_hits']), (3, 1, 1))
+        self.assertEqual((overall['prompt_tokens'], overall['completion_tokens']), (1_000_000, 250_000))
+        self.assertEqual(overall['cost_usd'], 1.5)
+        site = stats['call_sites'][0]
+        self.assertEqual((site['latency_ms']['p50'], site['latency_ms']['max']), (400, 400)) # Cache hits have no latency
+        self.assertEqual(sum(site['latency_ms']['histogram'].values()), 2)
+
+    def test_tracked_call_records_failures_and_attempts(self):
+        outcomes = iter([ResourceExhausted("429"), RuntimeError("Gemini unavailable")])
+
+        def flaky():
+            raise next(outcomes)
+
+        with self.assertRaises(RuntimeError):
+            with llm_metrics.TrackedCall('section', 'gemini', "Write a section") as call:
+                for _ in range(2):
+                    try:
+                        call.timed(flaky)()
+                    except ResourceExhausted:
+                        continue
+
+        row = LLMCall.objects.get()
+        self.assertEqual((row.call_site, row.attempts), ('section', 2))
+        self.assertEqual(row.error, "RuntimeError: Gemini unavailable")
+        self.assertTrue(row.tokens_estimated)
+
+    @override_settings(LLM_CACHE_ENABLED=True)
+    def test_gemini_calls_and_cache_hits_are_recorded(self):
+        ai_utils.summarize_text_gemini("Quantum computers ship")
+        ai_utils.summarize_text_gemini("Quantum computers ship")
+
+        miss, hit = LLMCall.objects.order_by('id')
+        self.assertEqual((miss.call_site, miss.cache_hit, hit.cache_hit), ('summary', False, True))
+        self.assertGreater(miss.prompt_tokens, 0)
+        self.assertEqual((hit.prompt_tokens, hit.completion_tokens, hit.latency_ms), (0, 0, 0))
+
+    @override_settings(LLM_CACHE_ENABLED=True)
+    def test_langchain_calls_are_recorded_with_their_call_site(self):
+        model = FakeStreamingChatModel(latency=0, cache=DjangoLLMCache(), callbacks=[langchain_callbacks.LLMMetricsCallback()])
+        labelled = model.with_config(metadata={"llm_call_site": "newsletter"})
+        labelled.invoke("Write the newsletter")
+        labelled.invoke("Write the newsletter")
+        with self.assertRaises(RuntimeError):
+            FailingChatModel(callbacks=[langchain_callbacks.LLMMetricsCallback()]).invoke("Write the newsletter")
+
+        first, cached, failed = LLMCall.objects.order_by('id')
+        self.assertEqual((first.call_site, first.cache_hit, first.error), ('newsletter', False, ""))
+        self.assertTrue(cached.cache_hit)
+        self.assertEqual((failed.call_site, failed.error), ('chain', "RuntimeError: Gemini unavailable"))
+
+    def test_metrics_endpoint_is_staff_only(self):
+        llm_metrics.record_call('summary', 'gemini', "prompt", 0.2)
+        client = APIClient()
+        url = reverse('llm-metrics')
+
+        self.assertEqual(client.get(url).status_code, 401)
+        client.force_authenticate(User.objects.create(username="reader"))
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        response = client.get(url, {'hours': 1, 'call_site': 'summary'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['overall']['calls'], 1)
+        self.assertEqual(client.get(url, {'hours': 'soon'}).status_code, 400)
+
+    def test_command_compares_against_a_saved_baseline(self):
+        llm_metrics.record_call('summary', 'gemini', "prompt", 0.2, prompt_tokens=100, completion_tokens=10)
+        baseline = io.StringIO()
+        call_command('llm_metrics', '--json', stdout=baseline)
+        LLMCall.objects.update(latency_ms=100)
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            f.write(baseline.getvalue())
+        self.addCleanup(os.remove, f.name)
+
+        output = io.StringIO()
+        call_command('llm_metrics', '--compare', f.name, stdout=output)
+
+        self.assertEqual(json.loads(baseline.getvalue())['overall']['calls'], 1)
+        self.assertIn("p50 -50.0%", output.getvalue())
+
+
+def read_stream(response):
+    """The body of a (possibly async) streaming response, or of a plain one."""
+    if not response.streaming:
+        if hasattr(response, 'render'):
+            response.render() # DRF error responses
+        return response.content.decode()
+    if response.is_async:
+        async def collect():
+            return [part async for part in response.streaming_content]
+        return b"".join(async_to_sync(collect)()).decode()
+    return b"".join(response.streaming_content).decode()
+
+
+@override_settings(LLM_RATE_LIMIT_ENABLED=False, LLM_CACHE_ENABLED=False, LLM_METRICS_ENABLED=False)
+class NewsletterStreamTests(TestCase):
+    view_class = views.UserNewsletterStreamView
+
+    def setUp(self):
+        cache.clear() # Throttle history
+        previous = agents.set_llm(FakeStreamingChatModel(latency=0))
+        self.addCleanup(agents.set_llm, previous)
+        self.user = User.objects.create_user("reader")
+        self.token = Token.objects.create(user=self.user)
+        interest = Interest.objects.create(name="Quantum")
+        UserInterest.objects.create(user=self.user, interest=interest)
+        make_article(1, summary="Qubits", ai_summary="Qubits, summarized", summary_state=Article.SummaryState.DONE).topics.add(interest)
+
+    def _post(self, token=None):
+        headers = {'HTTP_ACCEPT': 'text/event-stream'}
+        if token is not None:
+            headers['HTTP_AUTHORIZATION'] = f"Token {token.key}"
+        request = RequestFactory().post(reverse('user-newsletter-stream'), **headers)
+        view = self.view_class.as_view()
+        response = async_to_sync(view)(request) if self.view_class.view_is_async else view(request)
+        return response, read_stream(response)
+
+    def test_requests_without_a_token_are_rejected(self):
+        response, body = self._post()
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("event: error", body)
+
+    def test_streams_articles_then_tokens_then_done(self):
+        response, body = self._post(self.token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = re.findall(r"^event: (\w+)$", body, re.MULTILINE)
+        self.assertEqual(events[0], 'articles')
+        self.assertGreater(len(events), 2)
+        self.assertEqual(set(events[1:-1]), {'token'})
+        self.assertEqual(events[-1], 'done')
+        done = json.loads(body.rsplit("data: ", 1)[1])
+        self.assertEqual(Newsletter.objects.get(user=self.user).id, done['id'])
+
+    def test_generations_past_the_rate_are_throttled(self):
+        with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', {'newsletter_stream': '1/hour'}):
+            first, _ = self._post(self.token)
+            throttled, body = self._post(self.token)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(throttled.status_code, 429)
+        self.assertGreater(int(throttled['Retry-After']), 0)
+        self.assertIn("event: error", body)
+
+
+class AsyncNewsletterStreamTests(NewsletterStreamTests):
+    view_class = views.AsyncUserNewsletterStreamView
+
+
+class FanOutChunkTests(SimpleTestCase):
+    def test_chunks_keep_the_queue_and_scale_time_limits(self):
+        options = tasks._chunk_options(tasks.generate_user_newsletter_task, 10)
+
+        self.assertEqual(options['queue'], 'newsletter')
+        self.assertEqual((options['soft_time_limit'], options['time_limit']), (2400, 3000))
+
+    def test_large_chunks_finish_before_the_broker_redelivers_them(self):
+        visibility_timeout = settings.CELERY_BROKER_TRANSPORT_OPTIONS['visibility_timeout']
+
+        options = tasks._chunk_options(tasks.generate_user_newsletter_task, 20)
+
+        self.assertLess(options['time_limit'], visibility_timeout)
+        self.assertLess(options['soft_time_limit'], options['time_limit'])
+
+    def test_chunks_are_acknowledged_late(self):
+        starmap = app.tasks['celery.starmap']
+
+        self.assertTrue(starmap.acks_late)
+        self.assertTrue(starmap.reject_on_worker_lost)
@@ -1,10 +1,18 @@
 # backend/curation/urls.py
+from django.conf import settings
 from django.urls import path
-from .views import InterestListView, UserInterestView, ArticleListView, UserNewsletterListView
+from .views import InterestListView, UserInterestView, ArticleListView, ArticleSearchView, UserNewsletterListView, UserNewsletterDetailView, UserNewsletterStreamView, AsyncUserNewsletterStreamView, LLMMetricsView
+
+# Under an ASGI server the LLM-bound stream is served by the native async view
+NewsletterStreamView = AsyncUserNewsletterStreamView if settings.ASYNC_LLM_VIEWS else UserNewsletterStreamView
 
 urlpatterns = [
     path('interests/', InterestListView.as_view(), name='interest-list'),
     path('user-interests/', UserInterestView.as_view(), name='user-interest'),
     path('articles/', ArticleListView.as_view(), name='article-list'),
+    path('articles/search/', ArticleSearchView.as_view(), name='article-search'),
     path('user-newsletters/', UserNewsletterListView.as_view(), name='user-newsletter-list'),
+    path('user-newsletters/stream/', NewsletterStreamView.as_view(), name='user-newsletter-stream'),
+    path('user-newsletters/<int:pk>/', UserNewsletterDetailView.as_view(), name='user-newsletter-detail'),
+    path('llm-metrics/', LLMMetricsView.as_view(), name='llm-metrics'),
 ]
\ No newline at end of file
@@ -1,23 +1,101 @@
 # backend/curation/views.py
-from rest_framework import generics, permissions, status
+import hashlib
+from asgiref.sync import sync_to_async
+from rest_framework import exceptions, generics, permissions, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 from django.db import transaction
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch
+from django.db.models.functions import Substr
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from .models import Interest, UserInterest, Article, Newsletter
-from .serializers import InterestSerializer, UserInterestSerializer, UserInterestsUpdateSerializer, NewsletterSerializer
+from .serializers import InterestSerializer, UserInterestSerializer, UserInterestsUpdateSerializer, UserInterestsReplaceSerializer, NewsletterSerializer, NewsletterListSerializer
 from .serializers import ArticleSerializer
+from .pagination import ArticleCursorPagination, ArticleSearchPagination, NewsletterPagination
+from .search import ArticleSearchResults
+from .ai_utils import llm_concurrency_limit
+from .caching import get_interest_catalog, get_interest_catalog_version
+from .llm_metrics import get_stats as get_llm_stats
+from .renderers import EventStreamRenderer, sse_event
+from .sections import is_unchanged_newsletter, no_new_articles_content, save_newsletter
 class InterestListView(generics.ListAPIView):
     queryset = Interest.objects.all()
     serializer_class = InterestSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly] # Allow anyone to see available interests
 
+    def list(self, request, *args, **kwargs):
+        # The catalog is cached per version (bumped by signals on Interest changes), so
+        # both revalidation and a full response cost one version lookup, not the catalog query.
+        version = get_interest_catalog_version()
+        etag = f'"interest-catalog-{version}"'
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        payload = get_interest_catalog(
+            version, lambda: list(self.get_serializer(self.get_queryset(), many=True).data)
+        )
+        response = Response(payload)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
 from rest_framework.views import APIView  # Use this instead for full flexibility
 
 class UserInterestView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    def _current_interests(self, user):
+        return UserInterest.objects.filter(user=user).select_related('interest')
+
+    def _missing_interest_response(self, requested_ids):
+        """Validates every requested id in one query; returns a 400 response if any are unknown."""
+        found_ids = set(Interest.objects.filter(id__in=requested_ids).values_list('id', flat=True))
+        missing_ids = sorted(set(requested_ids) - found_ids)
+        if missing_ids:
+            return Response(
+                {"error": f"Interest with ID {', '.join(map(str, missing_ids))} not found."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return None
+
+    def _current_interest_ids(self, user):
+        return set(UserInterest.objects.filter(user=user).values_list('interest_id', flat=True))
+
+    def _apply_changes(self, user, current_ids, add_ids, remove_ids):
+        """
+        Moves the user from `current_ids` to (current + add - remove) with one bulk
+        insert and one filtered delete, computing the diff in memory.
+        """
+        to_add = set(add_ids) - current_ids - set(remove_ids)
+        to_remove = set(remove_ids) & current_ids
+
+        with transaction.atomic():
+            UserInterest.objects.bulk_create(
+                [UserInterest(user=user, interest_id=interest_id) for interest_id in to_add],
+                ignore_conflicts=True,
+            )
+            removed_count = 0
+            if to_remove:
+                removed_count, _ = UserInterest.objects.filter(user=user, interest_id__in=to_remove).delete()
+
+        return Response({
+            "message": f"Successfully added {len(to_add)} interests and removed {removed_count} interests.",
+            "current_interests": UserInterestSerializer(self._current_interests(user), many=True).data
+        }, status=status.HTTP_200_OK)
+
     def get(self, request, *args, **kwargs):
-        interests = UserInterest.objects.filter(user=request.user)
-        serializer = UserInterestSerializer(interests, many=True)
+        serializer = UserInterestSerializer(self._current_interests(request.user), many=True)
         return Response(serializer.data)
 
     def post(self, request, *args, **kwargs):
@@ -26,47 +104,245 @@ class UserInterestView(APIView):
         add_interests_ids = serializer.validated_data.get('add_interests', [])
         remove_interests_ids = serializer.validated_data.get('remove_interests', [])
 
-        user = request.user
-        added_count = 0
-        removed_count = 0
+        error_response = self._missing_interest_response(set(add_interests_ids) | set(remove_interests_ids))
+        if error_response is not None:
+            return error_response
+        current_ids = self._current_interest_ids(request.user)
+        return self._apply_changes(request.user, current_ids, add_interests_ids, remove_interests_ids)
 
-        with transaction.atomic():
-            for interest_id in add_interests_ids:
-                try:
-                    interest = Interest.objects.get(id=interest_id)
-                    user_interest, created = UserInterest.objects.get_or_create(user=user, interest=interest)
-                    if created:
-                        added_count += 1
-                except Interest.DoesNotExist:
-                    return Response({"error": f"Interest with ID {interest_id} not found."}, status=status.HTTP_400_BAD_REQUEST)
-
-            for interest_id in remove_interests_ids:
-                try:
-                    interest = Interest.objects.get(id=interest_id)
-                    deleted_count, _ = UserInterest.objects.filter(user=user, interest=interest).delete()
-                    removed_count += deleted_count
-                except Interest.DoesNotExist:
-                    return Response({"error": f"Interest with ID {interest_id} not found."}, status=status.HTTP_400_BAD_REQUEST)
-
-        current = UserInterest.objects.filter(user=request.user)
-        return Response({
-            "message": f"Successfully added {added_count} interests and removed {removed_count} interests.",
-            "current_interests": UserInterestSerializer(current, many=True).data
-        }, status=status.HTTP_200_OK)
+    def put(self, request, *args, **kwargs):
+        """Idempotently replaces the user's interests with exactly `interest_ids`."""
+        serializer = UserInterestsReplaceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        interest_ids = set(serializer.validated_data['interest_ids'])
+
+        error_response = self._missing_interest_response(interest_ids)
+        if error_response is not None:
+            return error_response
+
+        current_ids = self._current_interest_ids(request.user)
+        return self._apply_changes(request.user, current_ids, interest_ids, current_ids - interest_ids)
 
 # backend/curation/views.py (add to existing) Define this next
 
 class ArticleListView(generics.ListAPIView):
-    queryset = Article.objects.all()
+    queryset = Article.objects.defer('full_text') # ArticleSerializer never returns full_text
     serializer_class = ArticleSerializer
+    pagination_class = ArticleCursorPagination
     permission_classes = [permissions.AllowAny] # Only admin can see all raw articles
     # For debugging during development, you might set this to permissions.IsAuthenticated,
     # but revert for production if not intended for end users.
 
+    def get(self, request, *args, **kwargs):
+        # Validators come from indexed aggregates, so a repeat poll is answered
+        # with a 304 without loading or serializing any rows. The count catches
+        # deletes, which move neither maximum unless they remove the newest row.
+        state = Article.objects.aggregate(
+            last_modified=Max('updated_at'), last_id=Max('id'), count=Count('id'),
+        )
+        last_modified = state['last_modified']
+        etag = quote_etag(hashlib.md5(
+            f"{state['last_id']}:{state['count']}:{last_modified}:{request.get_full_path()}".encode()
+        ).hexdigest())
+        last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified_ts is not None:
+            response['Last-Modified'] = http_date(last_modified_ts)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+class ArticleSearchView(generics.ListAPIView):
+    """Full-text article search: /api/articles/search/?q=<terms>, best matches first."""
+    serializer_class = ArticleSerializer
+    pagination_class = ArticleSearchPagination
+    permission_classes = [permissions.AllowAny] # Same audience as ArticleListView
+
+    def get_queryset(self):
+        return ArticleSearchResults(self.request.query_params.get('q', ''))
+
 class UserNewsletterListView(generics.ListAPIView):
+    serializer_class = NewsletterListSerializer
+    pagination_class = NewsletterPagination
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        # Only show newsletters for the logged-in user; full content lives on the detail endpoint
+        return (
+            Newsletter.objects.filter(user=self.request.user)
+            .defer('content')
+            .annotate(
+                preview=Substr('content', 1, settings.NEWSLETTER_PREVIEW_CHARS),
+                article_count=Count('articles_included'),
+            )
+            .order_by('-generation_date')
+        )
+
+class UserNewsletterDetailView(generics.RetrieveAPIView):
     serializer_class = NewsletterSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        # Only show newsletters for the logged-in user
-        return Newsletter.objects.filter(user=self.request.user).order_by('-generation_date')
\ No newline at end of file
+        return Newsletter.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('articles_included', queryset=Article.objects.defer('full_text'))
+        )
+
+
+class LLMMetricsView(APIView):
+    """
+    Staff-only LLM call metrics: /api/llm-metrics/?hours=24&call_site=summary&slowest=10.
+    Latency percentiles and histograms, tokens, cache hits, failures and cost, see llm_metrics.py.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            hours = float(request.query_params.get('hours', 24))
+            slowest = min(int(request.query_params.get('slowest', 10)), 100)
+        except ValueError:
+            raise exceptions.ValidationError({"detail": "'hours' and 'slowest' must be numbers."})
+        return Response(get_llm_stats(hours=hours, call_site=request.query_params.get('call_site'), slowest=slowest))
+
+
+def _begin_newsletter_stream(user):
+    """
+    The database side of an on-demand generation, shared by the sync and async stream views.
+    Returns (events to send first, inputs, chain to stream); chain is None when the stream
+    ends after those events.
+    """
+    from langchain_core.runnables import RunnableLambda
+    from .agents import get_newsletter_generation_chain, prepare_newsletter_inputs # Keeps the LLM client out of URL loading
+
+    try:
+        inputs = prepare_newsletter_inputs(user)
+    except ValueError as e:
+        return [sse_event('error', {"detail": str(e)})], None, None
+
+    if is_unchanged_newsletter(user, inputs["fingerprint"]):
+        latest_id = (
+            Newsletter.objects.filter(user=user).order_by('-generation_date').values_list('id', flat=True).first()
+        )
+        return [sse_event('done', {"id": latest_id, "unchanged": True})], None, None
+
+    events = [sse_event('articles', {
+        "article_ids": inputs["article_ids"],
+        "prompt_tokens": inputs["packing"]["prompt_tokens"],
+    })]
+    if not inputs["article_ids"]:
+        return events, inputs, RunnableLambda(lambda _: no_new_articles_content(user.username))
+    chain = get_newsletter_generation_chain(user.id)
+    if chain is None:
+        events.append(sse_event('error', {"detail": "Follow at least one interest to get a newsletter."}))
+    return events, inputs, chain
+
+
+def _finish_newsletter_stream(user, inputs, parts):
+    newsletter = save_newsletter(user, "".join(parts), inputs["fingerprint"], inputs["article_ids"])
+    return sse_event('done', {"id": newsletter.id, "unchanged": False})
+
+
+STREAM_FAILED_EVENT = sse_event('error', {"detail": "Newsletter generation failed. Please try again."})
+
+
+def _event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Keep nginx from buffering the stream
+    return response
+
+
+class UserNewsletterStreamView(APIView):
+    """
+    Generates a newsletter for the logged-in user on demand and streams it as Server-Sent
+    Events while the LLM writes it: `articles` (the candidate ids), `token` (text chunks),
+    then `done` with the saved newsletter's id, or `error`.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'newsletter_stream'
+
+    def post(self, request, *args, **kwargs):
+        return _event_stream_response(self._events(request.user))
+
+    def _events(self, user):
+        yield ": generating\n\n" # Sent before any work so the client sees the stream open at once
+        events, inputs, chain = _begin_newsletter_stream(user)
+        yield from events
+        if chain is None:
+            return
+
+        parts = []
+        try:
+            for chunk in chain.stream(inputs["chain_input"]):
+                parts.append(chunk)
+                yield sse_event('token', {"text": chunk})
+        except Exception as e:
+            print(f"Error streaming newsletter for user {user.id}: {e}")
+            yield STREAM_FAILED_EVENT
+            return
+        yield _finish_newsletter_stream(user, inputs, parts)
+
+
+@method_decorator(csrf_exempt, name='dispatch') # Token auth only, like DRF's APIView
+class AsyncUserNewsletterStreamView(View):
+    """
+    Native async UserNewsletterStreamView for ASGI servers (ASYNC_LLM_VIEWS). The LLM
+    stream is awaited on the event loop instead of holding a thread for its whole length,
+    so one process can keep hundreds of generations in flight. At most
+    LLM_MAX_CONCURRENCY of them call the model at once; the rest wait their turn.
+    Database work runs in sync_to_async; authentication and throttling match the sync view.
+    """
+    throttle_scope = 'newsletter_stream'
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            user = await sync_to_async(self._authenticate)(request)
+        except exceptions.APIException as e:
+            return _event_stream_error(e)
+        return _event_stream_response(self._events(user))
+
+    def _authenticate(self, request):
+        authenticated = TokenAuthentication().authenticate(request)
+        if authenticated is None:
+            raise exceptions.NotAuthenticated()
+        request.user = authenticated[0]
+        throttle = ScopedRateThrottle()
+        if not throttle.allow_request(request, self):
+            raise exceptions.Throttled(throttle.wait())
+        return request.user
+
+    async def _events(self, user):
+        yield ": generating\n\n"
+        events, inputs, chain = await sync_to_async(_begin_newsletter_stream)(user)
+        for event in events:
+            yield event
+        if chain is None:
+            return
+
+        parts = []
+        try:
+            async with llm_concurrency_limit():
+                async for chunk in chain.astream(inputs["chain_input"]):
+                    parts.append(chunk)
+                    yield sse_event('token', {"text": chunk})
+        except Exception as e:
+            print(f"Error streaming newsletter for user {user.id}: {e}")
+            yield STREAM_FAILED_EVENT
+            return
+        yield await sync_to_async(_finish_newsletter_stream)(user, inputs, parts)
+
+
+def _event_stream_error(exc):
+    response = HttpResponse(
+        sse_event('error', {"detail": str(exc.detail)}), status=exc.status_code, content_type='text/event-stream'
+    )
+    if isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+        response['Retry-After'] = str(int(exc.wait))
+    return response
@@ -2,6 +2,28 @@ from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
 
+# Worker profiles. Tasks are routed to three queues (CELERY_TASK_ROUTES in settings.py); run
+# one worker pool per queue so LLM-bound and database-bound work scale independently:
+#
+#   newsletter: LLM-bound, mostly waiting on Gemini, so many processes per host
+#     celery -A newsletter_agent worker -Q newsletter -n newsletter@%h -c 16
+#   summarize: LLM-bound backlog work; the shared rate governor (curation/rate_limit.py) caps
+#   the cluster's call rate, so more processes only help while it has headroom
+#     celery -A newsletter_agent worker -Q summarize -n summarize@%h -c 8
+#   ingest: NewsAPI fetch, bulk inserts and the NumPy ranking build; CPU and database bound
+#     celery -A newsletter_agent worker -Q ingest,default -n ingest@%h -c 2
+#
+# Keep the default prefork pool. The threads pool (-P threads) ignores soft_time_limit and
+# time_limit (CELERY_TASK_ANNOTATIONS), so a hung Gemini call would hold its slot and its
+# acks_late message forever. gevent enforces them, but only once gevent is installed and
+# the Gemini client is patched for it.
+#
+# A single worker can serve everything, newsletters first:
+#     celery -A newsletter_agent worker -Q newsletter,summarize,ingest,default -c 4
+#
+# CELERY_WORKER_PREFETCH_MULTIPLIER = 1 keeps each worker from reserving more messages than
+# it has slots, so a long summarize backlog stays in Redis where any idle worker can take it.
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'newsletter_agent.settings')
 
 app = Celery('newsletter_agent')
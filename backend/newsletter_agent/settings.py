@@ -28,6 +28,80 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 NEWS_API_KEY = env('NEWS_API_KEY')
 GOOGLE_API_KEY= env('GOOGLE_API_KEY')
 
+# NewsAPI fetch tuning
+NEWS_API_FETCH_WORKERS = env.int('NEWS_API_FETCH_WORKERS', default=8) # Keywords fetched concurrently
+NEWS_API_RATE_LIMIT_PER_SECOND = env.float('NEWS_API_RATE_LIMIT_PER_SECOND', default=5.0) # Per host, 0 disables the limit
+NEWS_API_TIMEOUT = env.int('NEWS_API_TIMEOUT', default=15) # Seconds per request
+
+# Article ingest tuning
+INGEST_BULK_MODE = env.bool('INGEST_BULK_MODE', default=True) # Set-based ingest instead of row-by-row saves
+INGEST_BULK_BATCH_SIZE = env.int('INGEST_BULK_BATCH_SIZE', default=500) # Rows per bulk query
+SUMMARIZE_BATCH_SIZE = env.int('SUMMARIZE_BATCH_SIZE', default=20) # Articles per summarization task
+
+# AI summary backlog drain (see curation/summaries.py)
+SUMMARY_DRAIN_INTERVAL_SECONDS = env.int('SUMMARY_DRAIN_INTERVAL_SECONDS', default=60) # How often beat runs the drain
+SUMMARY_DRAIN_MAX_BATCHES = env.int('SUMMARY_DRAIN_MAX_BATCHES', default=10) # Batches claimed per drain; caps summaries per interval
+SUMMARY_MAX_ATTEMPTS = env.int('SUMMARY_MAX_ATTEMPTS', default=3) # Started batches before an article is marked failed
+SUMMARY_CLAIM_TIMEOUT_SECONDS = env.int('SUMMARY_CLAIM_TIMEOUT_SECONDS', default=900) # Claims older than this are taken back (worker lost)
+
+# Near-duplicate detection at ingest (see curation/dedup.py)
+NEAR_DUPLICATE_DETECTION = env.bool('NEAR_DUPLICATE_DETECTION', default=True)
+NEAR_DUPLICATE_MAX_DISTANCE = env.int('NEAR_DUPLICATE_MAX_DISTANCE', default=8) # SimHash bits that may differ; copies land within ~7, distinct stories 20+
+NEAR_DUPLICATE_WINDOW_DAYS = env.int('NEAR_DUPLICATE_WINDOW_DAYS', default=3) # How far back to look for the original
+
+# LLM response cache (see curation/llm_cache.py)
+LLM_CACHE_ENABLED = env.bool('LLM_CACHE_ENABLED', default=True)
+LLM_CACHE_TTL_SECONDS = env.int('LLM_CACHE_TTL_SECONDS', default=7 * 24 * 3600)
+LLM_CACHE_MAX_ENTRIES = env.int('LLM_CACHE_MAX_ENTRIES', default=50000)
+LLM_CACHE_PRUNE_INTERVAL = env.int('LLM_CACHE_PRUNE_INTERVAL', default=200) # Writes between evictions
+
+# Async LLM calls (ASGI: uvicorn newsletter_agent.asgi:application)
+ASYNC_LLM_VIEWS = env.bool('ASYNC_LLM_VIEWS', default=False) # Serve LLM-bound endpoints as async views; enable under ASGI only
+LLM_MAX_CONCURRENCY = env.int('LLM_MAX_CONCURRENCY', default=32) # In-flight async LLM calls per process
+
+# Gemini rate governor shared by all processes (see curation/rate_limit.py)
+LLM_RATE_LIMIT_ENABLED = env.bool('LLM_RATE_LIMIT_ENABLED', default=True)
+LLM_RATE_LIMIT_REDIS_URL = env('LLM_RATE_LIMIT_REDIS_URL', default=os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')) # Empty limits per process
+LLM_RATE_LIMIT_PER_SECOND = env.float('LLM_RATE_LIMIT_PER_SECOND', default=4.0) # Provider quota; the adaptive rate never exceeds it
+LLM_RATE_LIMIT_MIN_PER_SECOND = env.float('LLM_RATE_LIMIT_MIN_PER_SECOND', default=0.2) # Floor when backing off
+LLM_RATE_LIMIT_BURST = env.int('LLM_RATE_LIMIT_BURST', default=5) # Calls that may start back to back
+LLM_RATE_LIMIT_LATENCY_TARGET = env.float('LLM_RATE_LIMIT_LATENCY_TARGET', default=30.0) # Slower calls (or first tokens) count as congestion
+LLM_RATE_LIMIT_MAX_WAIT = env.float('LLM_RATE_LIMIT_MAX_WAIT', default=120.0) # Seconds a call may wait for a slot
+LLM_RATE_LIMIT_RETRIES = env.int('LLM_RATE_LIMIT_RETRIES', default=3) # Retries of a throttled call, with jittered backoff
+
+# LLM call metrics (see curation/llm_metrics.py; `manage.py llm_metrics`, GET /api/llm-metrics/ for staff)
+LLM_METRICS_ENABLED = env.bool('LLM_METRICS_ENABLED', default=True)
+LLM_METRICS_RETENTION_DAYS = env.int('LLM_METRICS_RETENTION_DAYS', default=30)
+LLM_PRICE_PER_MILLION_PROMPT_TOKENS = env.float('LLM_PRICE_PER_MILLION_PROMPT_TOKENS', default=0.075) # USD, gemini-1.5-flash list price
+LLM_PRICE_PER_MILLION_COMPLETION_TOKENS = env.float('LLM_PRICE_PER_MILLION_COMPLETION_TOKENS', default=0.30)
+
+# Newsletter generation
+# 'per_user': one full LLM call per user.
+# 'shared_sections': one section per interest per run, plus a short personalized intro/outro per user.
+NEWSLETTER_GENERATION_MODE = env('NEWSLETTER_GENERATION_MODE', default='per_user')
+NEWSLETTER_SECTION_ARTICLES = env.int('NEWSLETTER_SECTION_ARTICLES', default=5) # Articles per shared section
+NEWSLETTER_PREVIEW_CHARS = env.int('NEWSLETTER_PREVIEW_CHARS', default=280) # Length of the preview in newsletter lists
+NEWSLETTER_SKIP_UNCHANGED = env.bool('NEWSLETTER_SKIP_UNCHANGED', default=True) # Skip users whose interests and articles are unchanged
+NEWSLETTER_PROMPT_TOKEN_BUDGET = env.int('NEWSLETTER_PROMPT_TOKEN_BUDGET', default=3000) # Estimated tokens of articles per prompt, see prompt_packing.py
+NEWSLETTER_PROMPT_ITEM_MAX_TOKENS = env.int('NEWSLETTER_PROMPT_ITEM_MAX_TOKENS', default=200) # Longer summaries are trimmed
+NEWSLETTER_PROMPT_ITEM_MIN_TOKENS = env.int('NEWSLETTER_PROMPT_ITEM_MIN_TOKENS', default=40) # Articles that would be cut shorter are dropped
+NEWSLETTER_MAX_OUTPUT_TOKENS = env.int('NEWSLETTER_MAX_OUTPUT_TOKENS', default=1024) # Caps the generated newsletter
+NEWSLETTER_FANOUT_BATCH_SIZE = env.int('NEWSLETTER_FANOUT_BATCH_SIZE', default=500) # User ids read and dispatched per group
+NEWSLETTER_FANOUT_CHUNK_SIZE = env.int('NEWSLETTER_FANOUT_CHUNK_SIZE', default=10) # Users per task message, 1 sends one message per user; a chunk's time limit is capped under the broker's visibility_timeout
+
+# Newsletter candidate ranking (see curation/ranking.py); falls back to newest-first SQL when no fresh index exists
+RANKING_ENABLED = env.bool('RANKING_ENABLED', default=True)
+# Written by the ingest workers (build_ranking_index_task) and memory-mapped by every process that
+# ranks candidates (web and newsletter workers). It must be on storage all of them share, e.g. one
+# host or a shared volume; where it isn't, ranking logs a warning and falls back to SQL.
+RANKING_INDEX_DIR = env('RANKING_INDEX_DIR', default=str(BASE_DIR / 'ranking_index'))
+RANKING_INDEX_REBUILD_SECONDS = env.int('RANKING_INDEX_REBUILD_SECONDS', default=900) # Beat check; unchanged articles skip the build
+RANKING_VECTOR_DIM = env.int('RANKING_VECTOR_DIM', default=512) # Hashed TF-IDF buckets per article
+RANKING_WINDOW_DAYS = env.int('RANKING_WINDOW_DAYS', default=14) # Articles kept in the index
+RANKING_RECENCY_WEIGHT = env.float('RANKING_RECENCY_WEIGHT', default=0.3) # 0 ranks by relevance only, 1 by recency only
+RANKING_RECENCY_HALF_LIFE_HOURS = env.float('RANKING_RECENCY_HALF_LIFE_HOURS', default=24)
+RANKING_INDEX_MAX_AGE_SECONDS = env.int('RANKING_INDEX_MAX_AGE_SECONDS', default=24 * 3600) # Older builds are ignored
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -42,7 +116,10 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'newsletter_stream': env('NEWSLETTER_STREAM_RATE', default='10/hour'), # On-demand generations per user
+    },
 }
 
 ALLOWED_HOSTS = []
@@ -109,6 +186,15 @@ DATABASES = {
     'default': env.db(),
 }
 
+# Cache
+# Local memory by default, which is per process: each web worker keeps its own copy of cached
+# payloads. Invalidation still reaches every worker because the versions they are keyed by live
+# in the database (see curation/caching.py). Set CACHE_URL (e.g. redis://localhost:6379/1) to share the payloads too.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,6 +246,49 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC' # Or your local timezone 'Asia/Kolkata'
 
+# Task queues: one per kind of work, so a summarize backlog can't hold up newsletters and
+# the rare ingest run doesn't take LLM worker slots. Worker profiles: newsletter_agent/celery.py
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_TASK_ROUTES = { # Priority 0 is served first within a queue
+    'curation.tasks.fetch_and_save_articles_task': {'queue': 'ingest'},
+    'curation.tasks.build_ranking_index_task': {'queue': 'ingest'},
+    'curation.tasks.drain_summary_backlog_task': {'queue': 'summarize', 'priority': 0},
+    'curation.tasks.summarize_articles_batch_task': {'queue': 'summarize', 'priority': 4},
+    'curation.tasks.summarize_article_task': {'queue': 'summarize', 'priority': 6}, # On-demand single articles
+    'curation.tasks.generate_all_newsletters_task': {'queue': 'newsletter', 'priority': 0},
+    'curation.tasks.dispatch_section_newsletters_task': {'queue': 'newsletter', 'priority': 0},
+    'curation.tasks.generate_interest_section_task': {'queue': 'newsletter', 'priority': 1}, # Gate the run's fan-out
+    'curation.tasks.generate_user_newsletter_from_sections_task': {'queue': 'newsletter', 'priority': 3},
+    'curation.tasks.generate_user_newsletter_task': {'queue': 'newsletter', 'priority': 3},
+}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)), # Redis emulates priorities with one list per step
+    'sep': ':',
+    'queue_order_strategy': 'priority', # A worker on several queues drains them in -Q order
+    'visibility_timeout': 3600, # Unacked (acks_late) tasks are redelivered after this; must exceed the longest time limit
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = env.int('CELERY_WORKER_PREFETCH_MULTIPLIER', default=1) # LLM tasks take seconds; don't reserve a queue's backlog on one worker
+
+# Per task limits. LLM tasks are idempotent (summaries and newsletters are skipped when already
+# done), so they are acknowledged after running and redelivered if their worker dies.
+_LLM_TASK = {'acks_late': True, 'reject_on_worker_lost': True}
+CELERY_TASK_ANNOTATIONS = { # Time limits in seconds; the soft limit raises SoftTimeLimitExceeded in the task
+    'curation.tasks.fetch_and_save_articles_task': {'soft_time_limit': 600, 'time_limit': 900},
+    'curation.tasks.build_ranking_index_task': {'soft_time_limit': 600, 'time_limit': 900},
+    'curation.tasks.drain_summary_backlog_task': {'soft_time_limit': 60, 'time_limit': 90},
+    'curation.tasks.summarize_article_task': {**_LLM_TASK, 'soft_time_limit': 180, 'time_limit': 240}, # Rate limit wait + one call
+    'curation.tasks.summarize_articles_batch_task': {**_LLM_TASK, 'soft_time_limit': 420, 'time_limit': 480},
+    'curation.tasks.generate_interest_section_task': {**_LLM_TASK, 'soft_time_limit': 240, 'time_limit': 300},
+    'curation.tasks.generate_user_newsletter_task': {**_LLM_TASK, 'soft_time_limit': 240, 'time_limit': 300},
+    'curation.tasks.generate_user_newsletter_from_sections_task': {**_LLM_TASK, 'soft_time_limit': 180, 'time_limit': 240},
+    'curation.tasks.dispatch_section_newsletters_task': {'soft_time_limit': 600, 'time_limit': 900},
+    'curation.tasks.generate_all_newsletters_task': {'soft_time_limit': 600, 'time_limit': 900},
+    # Fan-out chunks of the tasks above run inside celery.starmap; acks_late is read from the
+    # task class on the worker, so it has to be set here rather than per message
+    'celery.starmap': _LLM_TASK,
+}
+
 # Optional: Celery Beat settings for periodic tasks
 # Celery Beat settings (add to existing)
 # CELERY_BEAT_SCHEDULE = {
@@ -175,6 +304,14 @@ CELERY_TIMEZONE = 'UTC' # Or your local timezone 'Asia/Kolkata'
 # }
 
 CELERY_BEAT_SCHEDULE = {
+    'rebuild-ranking-index': {
+        'task': 'curation.tasks.build_ranking_index_task',
+        'schedule': timedelta(seconds=RANKING_INDEX_REBUILD_SECONDS),
+    },
+    'drain-summary-backlog': {
+        'task': 'curation.tasks.drain_summary_backlog_task',
+        'schedule': timedelta(seconds=SUMMARY_DRAIN_INTERVAL_SECONDS),
+    },
     'generate-newsletters-daily': {
         'task': 'curation.tasks.generate_all_newsletters_task',
         'schedule': timedelta(minutes=2),
@@ -64,20 +64,12 @@ function DashboardPage() {
   const handleSaveInterests = async () => {
     setError('');
     setMessage('');
-    const currentServerInterestIds = new Set((await axios.get('http://localhost:8000/api/user-interests/', { headers: { Authorization: `Token ${token}` } })).data.map(ui => ui.interest.id));
-
-    const addInterests = availableInterests
-      .filter(interest => selectedInterestIds.has(interest.id) && !currentServerInterestIds.has(interest.id))
-      .map(interest => interest.id);
-
-    const removeInterests = availableInterests
-      .filter(interest => !selectedInterestIds.has(interest.id) && currentServerInterestIds.has(interest.id))
-      .map(interest => interest.id);
 
     try {
-      const response = await axios.post(
+      // PUT replaces the whole set server-side, so no need to re-fetch current interests first
+      const response = await axios.put(
   'http://localhost:8000/api/user-interests/',
-  { add_interests: addInterests, remove_interests: removeInterests },
+  { interest_ids: Array.from(selectedInterestIds) },
   { headers: { Authorization: `Token ${token}` } }
 );
       setMessage(response.data.message);
@@ -1,11 +1,13 @@
 // frontend/src/pages/MyArticlesPage.js
 import React, { useEffect, useState } from 'react';
-import { Box, Typography, Card, CardContent, CircularProgress, Alert } from '@mui/material';
+import { Box, Typography, Card, CardContent, CircularProgress, Alert, Button } from '@mui/material';
 import axios from 'axios';
 
 function MyArticlesPage() {
   const [articles, setArticles] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null); // Cursor link to the next (older) page
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
 
   useEffect(() => {
@@ -13,7 +15,8 @@ function MyArticlesPage() {
       setLoading(true);
       try {
         const response = await axios.get('http://localhost:8000/api/articles/');
-        setArticles(response.data);
+        setArticles(response.data.results);
+        setNextUrl(response.data.next);
       } catch (err) {
         console.error(err);
         setError('Failed to load articles');
@@ -25,6 +28,20 @@ function MyArticlesPage() {
     fetchArticles(); // Always fetch without checking token
   }, []);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(nextUrl);
+      setArticles(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (err) {
+      console.error(err);
+      setError('Failed to load more articles');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) return <CircularProgress />;
   if (error) return <Alert severity="error">{error}</Alert>;
 
@@ -47,6 +64,11 @@ function MyArticlesPage() {
           </Card>
         ))
       )}
+      {nextUrl && (
+        <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </Button>
+      )}
     </Box>
   );
 }
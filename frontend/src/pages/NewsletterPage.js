@@ -1,14 +1,18 @@
 // frontend/src/pages/NewsletterPage.js (example)
 import React, { useState, useEffect } from 'react';
-import { Box, Typography, Card, CardContent, Link as MuiLink } from '@mui/material';
+import { Box, Typography, Card, CardContent, Button, Link as MuiLink } from '@mui/material';
 import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import ReactMarkdown from 'react-markdown';
 
 function NewsletterPage() {
   const [newsletters, setNewsletters] = useState([]);
+  const [details, setDetails] = useState({}); // Full newsletters fetched on demand, keyed by id
+  const [nextUrl, setNextUrl] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [streaming, setStreaming] = useState(false);
+  const [liveContent, setLiveContent] = useState(''); // Text of the newsletter being generated on demand
   const navigate = useNavigate();
 
   const token = localStorage.getItem('token');
@@ -26,7 +30,8 @@ function NewsletterPage() {
         const response = await axios.get('http://localhost:8000/api/user-newsletters/', {
           headers: { Authorization: `Token ${token}` }
         });
-        setNewsletters(response.data);
+        setNewsletters(response.data.results);
+        setNextUrl(response.data.next);
       } catch (err) {
         console.error('Error fetching newsletters:', err.response ? err.response.data : err.message);
         setError('Failed to load newsletters. Please try again.');
@@ -38,29 +43,121 @@ function NewsletterPage() {
     fetchNewsletters();
   }, [token, navigate]);
 
+  const handleLoadMore = async () => {
+    try {
+      const response = await axios.get(nextUrl, {
+        headers: { Authorization: `Token ${token}` }
+      });
+      setNewsletters(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (err) {
+      console.error('Error fetching newsletters:', err.response ? err.response.data : err.message);
+      setError('Failed to load more newsletters.');
+    }
+  };
+
+  // Reads the Server-Sent Events stream from the on-demand endpoint; EventSource can't POST or send the token
+  const handleGenerateNow = async () => {
+    setStreaming(true);
+    setLiveContent('');
+    setError('');
+    try {
+      const response = await fetch('http://localhost:8000/api/user-newsletters/stream/', {
+        method: 'POST',
+        headers: { Authorization: `Token ${token}`, Accept: 'text/event-stream' }
+      });
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let finished = null;
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          const eventLine = raw.split('\n').find(line => line.startsWith('event: '));
+          const dataLine = raw.split('\n').find(line => line.startsWith('data: '));
+          if (!eventLine || !dataLine) continue; // Comments keep the connection alive
+          const data = JSON.parse(dataLine.slice(6));
+          const event = eventLine.slice(7);
+          if (event === 'token') setLiveContent(prev => prev + data.text);
+          else if (event === 'error') setError(data.detail || 'Failed to generate the newsletter.');
+          else if (event === 'done') finished = data;
+        }
+      }
+      if (finished && finished.id) {
+        const listResponse = await axios.get('http://localhost:8000/api/user-newsletters/', {
+          headers: { Authorization: `Token ${token}` }
+        });
+        setNewsletters(listResponse.data.results);
+        setNextUrl(listResponse.data.next);
+        setLiveContent('');
+      }
+    } catch (err) {
+      console.error('Error streaming newsletter:', err.message);
+      setError('Failed to generate the newsletter. Please try again.');
+    } finally {
+      setStreaming(false);
+    }
+  };
+
+  const handleToggle = async (id) => {
+    if (details[id]) {
+      setDetails(prev => {
+        const next = { ...prev };
+        delete next[id];
+        return next;
+      });
+      return;
+    }
+    try {
+      const response = await axios.get(`http://localhost:8000/api/user-newsletters/${id}/`, {
+        headers: { Authorization: `Token ${token}` }
+      });
+      setDetails(prev => ({ ...prev, [id]: response.data }));
+    } catch (err) {
+      console.error('Error fetching newsletter:', err.response ? err.response.data : err.message);
+      setError('Failed to load the newsletter.');
+    }
+  };
+
   if (loading) return <Typography>Loading newsletters...</Typography>;
-  if (error) return <Typography color="error">{error}</Typography>;
-  if (newsletters.length === 0) return <Typography>No newsletters generated yet.</Typography>;
 
   return (
     <Box sx={{ mt: 3 }}>
       <Typography variant="h4" component="h1" gutterBottom>Your Newsletters</Typography>
-      {newsletters.map((nl) => (
-        <Card key={nl.id} sx={{ mb: 3 }}>
+      <Button variant="contained" onClick={handleGenerateNow} disabled={streaming} sx={{ mb: 3 }}>
+        {streaming ? 'Generating...' : 'Generate now'}
+      </Button>
+      {error && <Typography color="error">{error}</Typography>}
+      {liveContent && (
+        <Card sx={{ mb: 3 }}>
           <CardContent>
-            <Typography variant="h6" gutterBottom>
-              Newsletter - {new Date(nl.generation_date).toLocaleDateString()}
-            </Typography>
-            <ReactMarkdown sx={{ whiteSpace: 'pre-wrap', fontFamily: 'monospace', mb: 2 }}>
-              {nl.content}
-            </ReactMarkdown>
-            {nl.articles_included && nl.articles_included.length > 0 && (
+            <ReactMarkdown>{liveContent}</ReactMarkdown>
+          </CardContent>
+        </Card>
+      )}
+      {newsletters.length === 0 && !liveContent && <Typography>No newsletters generated yet.</Typography>}
+      {newsletters.map((nl) => {
+        const detail = details[nl.id];
+        return (
+          <Card key={nl.id} sx={{ mb: 3 }}>
+            <CardContent>
+              <Typography variant="h6" gutterBottom>
+                Newsletter - {new Date(nl.generation_date).toLocaleDateString()}
+              </Typography>
+              <ReactMarkdown sx={{ whiteSpace: 'pre-wrap', fontFamily: 'monospace', mb: 2 }}>
+                {detail ? detail.content : `${nl.preview}…`}
+              </ReactMarkdown>
+              {detail && detail.articles_included.length > 0 && (
   <Box>
     <Typography variant="body2" sx={{ fontWeight: 'bold' }}>
       Articles Included:
     </Typography>
     <ul>
-      {nl.articles_included.map((article) => (
+      {detail.articles_included.map((article) => (
         <li key={article.id}>
           <MuiLink href={article.url} target="_blank" rel="noopener noreferrer">
             {article.title}
@@ -70,11 +167,18 @@ function NewsletterPage() {
     </ul>
   </Box>
 )}
-          </CardContent>
-        </Card>
-      ))}
+              <Button size="small" onClick={() => handleToggle(nl.id)}>
+                {detail ? 'Show less' : `Read full newsletter (${nl.article_count} articles)`}
+              </Button>
+            </CardContent>
+          </Card>
+        );
+      })}
+      {nextUrl && (
+        <Button variant="outlined" onClick={handleLoadMore}>Load more</Button>
+      )}
     </Box>
   );
 }
 
-export default NewsletterPage;
\ No newline at end of file
+export default NewsletterPage;